@@ -0,0 +1,433 @@
+"""
+SherlockAI Command Benchmark
+Drives scripted command sequences through GameCLI.process_command against
+stub Ollama and graph backends with configurable latency, and
+reports p50/p95/p99 per command and per pipeline stage (llm, graph, rendering).
+No CLI command queries the vector store, so retrieval is not a stage here; the
+int8 ONNX check below measures it on its own. Results are saved as JSON so
+runs can be compared for regressions.
+
+Usage:
+    python benchmark.py --iterations 20 --output bench_results.json
+    python benchmark.py --compare bench_results.json --threshold 0.2
+    python benchmark.py --prefix-ttft gemma2     # live Ollama: TTFT with/without prefix reuse
+    python benchmark.py --onnx-check sentence-transformers/all-MiniLM-L6-v2   # int8 ONNX vs PyTorch
+"""
+import argparse
+import builtins
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List
+
+import main
+from game_engine import DetectiveGame
+from memory_graph import InMemoryDetectiveDatabase
+from ollama import DetectiveAgent
+from story_generator import MysteryGenerator
+
+STAGES = ("llm", "graph", "rendering")
+
+STUB_REPLY = ("Efendim, o gece konağın koridorlarında dolaşan gölgeyi ben de gördüm; "
+              "fakat kimin olduğunu söylemeye dilim varmaz.")
+
+
+class StageTimer:
+    """Accumulates time spent per pipeline stage for the command being measured."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def begin(self):
+        self._local.stages = {stage: 0.0 for stage in STAGES}
+
+    def end(self) -> Dict[str, float]:
+        return self._local.stages
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = getattr(self._local, "stages", None)
+            if stages is not None:
+                stages[name] += time.perf_counter() - started
+
+
+class StubLLM:
+    """Stands in for langchain's Ollama: fixed reply, configurable latency."""
+
+    def __init__(self, timer: StageTimer, ttft: float, per_token: float, reply: str = STUB_REPLY):
+        self.timer = timer
+        self.ttft = ttft
+        self.per_token = per_token
+        self.tokens = reply.split(" ")
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        with self.timer.stage("llm"):
+            time.sleep(self.ttft + self.per_token * len(self.tokens))
+            return " ".join(self.tokens)
+
+    def generate(self, prompts, **kwargs):
+        text = self.invoke(prompts[0])
+        info = {"prompt_eval_count": len(prompts[0]) // 4, "eval_count": len(self.tokens)}
+        return _StubResult([[_StubGeneration(text, info)]])
+
+    def stream(self, prompt: str, **kwargs):
+        with self.timer.stage("llm"):
+            time.sleep(self.ttft)
+        for index, token in enumerate(self.tokens):
+            with self.timer.stage("llm"):
+                time.sleep(self.per_token)
+            yield token if index == 0 else " " + token
+
+
+class _StubGeneration:
+    def __init__(self, text: str, generation_info: Dict):
+        self.text = text
+        self.generation_info = generation_info
+
+
+class _StubResult:
+    def __init__(self, generations):
+        self.generations = generations
+
+
+class TimedDatabase:
+    """Wraps a graph backend so every method call counts as 'graph' time plus a fixed latency."""
+
+    def __init__(self, database, timer: StageTimer, latency: float):
+        self._database = database
+        self._timer = timer
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._database, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            with self._timer.stage("graph"):
+                time.sleep(self._latency)
+                return attr(*args, **kwargs)
+        return timed
+
+
+class _NullWriter:
+    """Swallows rendered output; writing still costs the formatting work."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class _NoSleepTime:
+    """time module stand-in for main.py with the cosmetic UI pauses removed."""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+DEFAULT_SCENARIO = [
+    {"command": "ara {location}"},
+    {"command": "konuş {suspect}", "inputs": ["O gece neredeydiniz?", "Kurbanı en son ne zaman gördünüz?", "çık"]},
+    {"command": "sor Şüpheliler kim ve nerede bulundular?"},
+    {"command": "kanıtlar"},
+    {"command": "ipucu"},
+    {"command": "suçla {suspect}", "inputs": ["evet"]},
+]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile, in milliseconds."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank] * 1000, 3)
+
+
+def _summary(samples: List[float]) -> Dict:
+    return {
+        "count": len(samples),
+        "p50_ms": _percentile(samples, 50),
+        "p95_ms": _percentile(samples, 95),
+        "p99_ms": _percentile(samples, 99),
+    }
+
+
+def _load_mystery(generator: MysteryGenerator) -> Dict:
+    """Benchmark case: debug_mystery.json if present, otherwise the built-in fallback."""
+    if os.path.exists("debug_mystery.json"):
+        with open("debug_mystery.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    case = generator._get_fallback_case()
+    return {
+        "case": case,
+        "clues": generator._get_fallback_clues(case["locations"]),
+        "alibis": generator.generate_alibis(case),
+        "relationships": generator.generate_relationships(case),
+    }
+
+
+def run_benchmark(scenario: List[Dict], iterations: int, llm_ttft: float, llm_per_token: float,
+                  graph_latency: float, ui_delays: bool = False) -> Dict:
+    """Runs the scenario `iterations` times and returns per-command latency summaries."""
+    timer = StageTimer()
+    database = TimedDatabase(InMemoryDetectiveDatabase(graph_name="Benchmark"), timer, graph_latency)
+
+    agent = DetectiveAgent(model_name="stub", use_cache=False, database=database)
+    agent.llm = StubLLM(timer, llm_ttft, llm_per_token)
+    generator = MysteryGenerator(model_name="stub")
+    generator.llm = agent.llm
+    mystery = _load_mystery(generator)
+    case = mystery["case"]
+    fill = {"location": case["locations"][0], "suspect": case["suspects"][0]["name"]}
+
+    totals: Dict[str, List[float]] = {}
+    stages: Dict[str, Dict[str, List[float]]] = {}
+    real_input, real_stdout, real_time = builtins.input, sys.stdout, main.time
+    if not ui_delays:
+        main.time = _NoSleepTime()
+    try:
+        for _ in range(iterations):
+            database.load_case(mystery)
+            agent.reset_memory()
+            cli = main.GameCLI(game=DetectiveGame(database=database), agent=agent,
+                               generator=generator, use_pool=False, warm_up=False)
+            cli.mystery_data = mystery
+            cli.game.start_game()
+
+            for step in scenario:
+                command = step["command"].format(**fill)
+                label = command.split()[0]
+                answers = iter(step.get("inputs", []))
+                builtins.input = lambda prompt="": next(answers, "çık")
+
+                sys.stdout = _NullWriter()
+                timer.begin()
+                started = time.perf_counter()
+                try:
+                    cli.process_command(command)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    sys.stdout = real_stdout
+
+                spent = timer.end()
+                spent["rendering"] = max(0.0, elapsed - spent["llm"] - spent["graph"])
+                totals.setdefault(label, []).append(elapsed)
+                for stage, seconds in spent.items():
+                    stages.setdefault(label, {}).setdefault(stage, []).append(seconds)
+    finally:
+        builtins.input, sys.stdout, main.time = real_input, real_stdout, real_time
+
+    return {
+        "config": {
+            "iterations": iterations,
+            "llm_ttft": llm_ttft,
+            "llm_per_token": llm_per_token,
+            "graph_latency": graph_latency,
+            "ui_delays": ui_delays,
+        },
+        "commands": {
+            label: {**_summary(samples), "stages": {s: _summary(v) for s, v in stages[label].items()}}
+            for label, samples in totals.items()
+        },
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Commands whose p95 grew by more than `threshold` (fraction) over the baseline."""
+    regressions = []
+    for label, current in results["commands"].items():
+        previous = baseline.get("commands", {}).get(label)
+        if not previous or not previous["p95_ms"]:
+            continue
+        growth = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"]
+        if growth > threshold:
+            regressions.append(f"{label}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms (+{growth:.0%})")
+    return regressions
+
+
+PREFIX_QUESTIONS = [
+    "O gece saat onda neredeydiniz?",
+    "Kurbanla en son ne zaman konuştunuz?",
+    "Bahçede kimi gördünüz?",
+    "Neden kütüphanenin kapısı kilitliydi?",
+    "Bu mektubu daha önce gördünüz mü?",
+]
+
+
+def measure_prefix_reuse(model_name: str, questions: List[str] = PREFIX_QUESTIONS) -> Dict:
+    """
+    Live Ollama check of KV-cache prefix reuse for an interrogation. The same
+    questions are streamed twice: once with a random line prepended to every
+    prompt (the cached prefix can never match, i.e. the old behaviour), and
+    once as-is (system prompt + character card stay byte-identical). Reports
+    time-to-first-token for both.
+    """
+    agent = DetectiveAgent(model_name=model_name, use_cache=False)
+    character = dict(character_name="Feride Hanım", character_trait="Sinirli ve ketum",
+                     relationships=[], is_killer=False, role="Suspect", victim_name="Emine Hanım")
+
+    def ttft(prompt: str) -> float:
+        started = time.perf_counter()
+        stream = agent.llm.stream(prompt)
+        try:
+            next(stream, None)
+            return time.perf_counter() - started
+        finally:
+            stream.close()
+
+    # Model yüklemesi ölçüme karışmasın
+    ttft(agent.system_prompt)
+    results = {}
+    for mode in ("cold", "warm"):
+        samples = []
+        for question in questions:
+            prompt = agent._response_prompt(question=question, **character)
+            if mode == "cold":
+                prompt = f"[{uuid.uuid4().hex}]\n{prompt}"
+            samples.append(ttft(prompt))
+        results[mode] = _summary(samples)
+    return {"model": model_name, "ttft": results}
+
+
+ONNX_CHECK_QUERIES = PREFIX_QUESTIONS + [
+    "zehirli çay fincanı",
+    "kütüphanede bulunan kanlı mendil",
+    "the butler was seen near the garden at midnight",
+    "Sherlock Holmes ayak izlerini inceledi",
+    "a letter written in a trembling hand",
+]
+ONNX_MIN_RECALL = 0.9
+ONNX_MIN_COSINE = 0.98
+
+
+def measure_onnx_fidelity(model_name: str, persist_directory: str = "./chroma_db",
+                          queries: List[str] = ONNX_CHECK_QUERIES, k: int = 4) -> Dict:
+    """
+    Compares the int8 ONNX backend with the PyTorch model on real retrievals:
+    top-k overlap against the model's persisted Chroma collection, query-vector cosine
+    similarity, per-query latency and memory (RSS growth while loading,
+    on-disk model size).
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from onnx_embeddings import OnnxEmbeddings, model_file_sizes
+    from resources import _rss_kb
+    from vector_collections import open_collection
+
+    rss_growth = {}
+    rss_before = _rss_kb()
+    onnx = OnnxEmbeddings(model_name)
+    onnx.embed_query("warm-up")
+    rss_growth["int8"] = round((_rss_kb() - rss_before) / 1024, 1)
+    rss_before = _rss_kb()
+    torch = HuggingFaceEmbeddings(model_name=model_name)
+    torch.embed_query("warm-up")
+    rss_growth["fp32"] = round((_rss_kb() - rss_before) / 1024, 1)
+
+    store = open_collection(model_name, torch, persist_directory)
+    latency = {"fp32": [], "int8": []}
+    overlaps, cosines = [], []
+    for query in queries:
+        vectors = {}
+        for label, model in (("fp32", torch), ("int8", onnx)):
+            started = time.perf_counter()
+            vectors[label] = model.embed_query(query)
+            latency[label].append(time.perf_counter() - started)
+        a, b = vectors["fp32"], vectors["int8"]
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        cosines.append(sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0)
+        hits = {label: [doc.page_content for doc in store.similarity_search_by_vector(vector, k=k)]
+                for label, vector in vectors.items()}
+        if hits["fp32"]:
+            overlaps.append(len(set(hits["fp32"]) & set(hits["int8"])) / len(hits["fp32"]))
+
+    recall = round(sum(overlaps) / len(overlaps), 3) if overlaps else None
+    return {
+        "model": model_name,
+        "recall_at_k": recall,
+        "k": k,
+        "min_cosine": round(min(cosines), 4),
+        "latency": {label: _summary(samples) for label, samples in latency.items()},
+        "rss_growth_mb": rss_growth,
+        "model_file_mb": model_file_sizes(model_name),
+        "passed": min(cosines) >= ONNX_MIN_COSINE and (recall is None or recall >= ONNX_MIN_RECALL),
+    }
+
+
+def print_report(results: Dict):
+    print(f"{'komut':<12}{'p50':>10}{'p95':>10}{'p99':>10}   " + "  ".join(f"{s} p95" for s in STAGES))
+    for label, data in results["commands"].items():
+        stage_cols = "  ".join(f"{data['stages'][s]['p95_ms']:>{len(s) + 4}}" for s in STAGES)
+        print(f"{label:<12}{data['p50_ms']:>10}{data['p95_ms']:>10}{data['p99_ms']:>10}   {stage_cols}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SherlockAI komut gecikme ölçümü (çevrimdışı)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--scenario", help="Komut listesi içeren JSON dosyası")
+    parser.add_argument("--llm-ttft", type=float, default=0.05, help="İlk token gecikmesi (s)")
+    parser.add_argument("--llm-per-token", type=float, default=0.002, help="Token başına gecikme (s)")
+    parser.add_argument("--graph-latency", type=float, default=0.002)
+    parser.add_argument("--ui-delays", action="store_true", help="main.py'deki time.sleep beklemelerini koru")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--threshold", type=float, default=0.2, help="İzin verilen p95 artışı (oran)")
+    parser.add_argument("--prefix-ttft", metavar="MODEL",
+                        help="Canlı Ollama ile ön ek (KV önbelleği) yeniden kullanımının TTFT etkisini ölç")
+    parser.add_argument("--onnx-check", metavar="MODEL",
+                        help="int8 ONNX gömme modelini PyTorch ile karşılaştır (geri getirme, gecikme, bellek)")
+    args = parser.parse_args()
+
+    if args.prefix_ttft:
+        report = measure_prefix_reuse(args.prefix_ttft)
+        for mode, data in report["ttft"].items():
+            print(f"{mode:<6} TTFT p50 {data['p50_ms']}ms  p95 {data['p95_ms']}ms")
+        sys.exit(0)
+
+    if args.onnx_check:
+        report = measure_onnx_fidelity(args.onnx_check)
+        for label, data in report["latency"].items():
+            print(f"{label:<5} sorgu p50 {data['p50_ms']}ms  p95 {data['p95_ms']}ms  "
+                  f"RSS +{report['rss_growth_mb'][label]} MB  dosya {report['model_file_mb'].get(label, '-')} MB")
+        print(f"recall@{report['k']}: {report['recall_at_k']}  min kosinüs: {report['min_cosine']}")
+        print("Doğruluk kontrolü " + ("geçti." if report["passed"] else "BAŞARISIZ!"))
+        sys.exit(0 if report["passed"] else 1)
+
+    scenario = DEFAULT_SCENARIO
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+
+    results = run_benchmark(scenario, args.iterations, args.llm_ttft, args.llm_per_token,
+                            args.graph_latency, args.ui_delays)
+    print_report(results)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nSonuçlar '{args.output}' dosyasına kaydedildi.")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nGERİLEME TESPİT EDİLDİ:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nGerileme yok.")
@@ -0,0 +1,159 @@
+"""
+Conversation Memory
+Per-character interrogation history with a token budget.
+
+Recent question/answer turns are kept verbatim. Once they outgrow the budget,
+the oldest turns are folded into a short running summary by a background
+worker, so the prompt for the next question stays about the same size however
+long the interrogation runs, and summarizing never delays a reply.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+Turn = Tuple[str, str]  # (question, answer)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def _turn_tokens(turns: List[Turn]) -> int:
+    return sum(estimate_tokens(question) + estimate_tokens(answer) for question, answer in turns)
+
+
+class _Dialogue:
+    """Memory for one character: running summary plus the verbatim recent turns."""
+
+    __slots__ = ("summary", "turns", "pending")
+
+    def __init__(self):
+        self.summary = ""
+        self.turns: List[Turn] = []
+        self.pending = 0  # Number of oldest turns currently being summarized
+
+
+class ConversationMemory:
+    """
+    Bounded dialogue memory keyed by character name.
+
+    `summarize(character, previous_summary, turns)` must return the new
+    summary text; it runs on a single background thread. If it fails, the
+    turns it was given are dropped so the memory still stays bounded.
+    """
+
+    def __init__(self, summarize: Callable[[str, str, List[Turn]], str], max_tokens: int = 600,
+                 keep_recent: int = 2, max_summary_tokens: int = 150):
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.max_summary_tokens = max_summary_tokens
+        self.summaries = 0
+        self.failures = 0
+        self._dialogues: Dict[str, _Dialogue] = {}
+        self._generation = 0  # Bumped by clear(); late summaries of an old case are ignored
+        self._held = 0  # While > 0 no new summaries start (see hold())
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dialogue-summary")
+
+    def add_turn(self, character: str, question: str, answer: str):
+        """Records one exchange and schedules compaction if the budget is exceeded."""
+        with self._lock:
+            dialogue = self._dialogues.setdefault(character, _Dialogue())
+            dialogue.turns.append((question, answer))
+            self._maybe_compact(character, dialogue)
+
+    def _maybe_compact(self, character: str, dialogue: _Dialogue):
+        """Caller holds the lock."""
+        if self._held or dialogue.pending or len(dialogue.turns) <= self.keep_recent:
+            return
+        if _turn_tokens(dialogue.turns) + estimate_tokens(dialogue.summary) <= self.max_tokens:
+            return
+        dialogue.pending = len(dialogue.turns) - self.keep_recent
+        self._executor.submit(self._compact, character, dialogue, dialogue.summary,
+                              dialogue.turns[:dialogue.pending], self._generation)
+
+    def _compact(self, character: str, dialogue: _Dialogue, summary: str, turns: List[Turn], generation: int):
+        try:
+            new_summary = (self.summarize(character, summary, turns) or "").strip()
+        except Exception as e:
+            print(f" Konuşma özeti çıkarılamadı ({character}): {e}")
+            new_summary = ""
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            if new_summary:
+                dialogue.summary = new_summary[:self.max_summary_tokens * 4]
+                self.summaries += 1
+            else:
+                self.failures += 1
+            del dialogue.turns[:len(turns)]
+            dialogue.pending = 0
+            # More turns may have arrived while we were summarizing
+            self._maybe_compact(character, dialogue)
+
+    @contextmanager
+    def hold(self):
+        """
+        Defers new summaries until the block exits, e.g. while an interrogation
+        keeps its prompt prefix cached on the same model. Turns keep being
+        recorded and context() still trims them to the budget; a summary that
+        is already running finishes.
+        """
+        with self._lock:
+            self._held += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._held -= 1
+                if not self._held:
+                    for character, dialogue in self._dialogues.items():
+                        self._maybe_compact(character, dialogue)
+
+    def context(self, character: str) -> str:
+        """
+        Prompt section with the summary and the newest turns that fit in the
+        budget. Turns waiting to be summarized are trimmed here too, so the
+        prompt stays bounded even when the summarizer falls behind.
+        """
+        with self._lock:
+            dialogue = self._dialogues.get(character)
+            if dialogue is None:
+                return ""
+            summary, turns = dialogue.summary, list(dialogue.turns)
+
+        budget = self.max_tokens - (estimate_tokens(summary) if summary else 0)
+        recent: List[Turn] = []
+        for turn in reversed(turns):
+            budget -= _turn_tokens([turn])
+            if budget < 0:
+                break
+            recent.insert(0, turn)
+
+        sections = []
+        if summary:
+            sections.append(f"ÖNCEKİ KONUŞMALARIN ÖZETİ: {summary}")
+        if recent:
+            lines = "\n".join(f"Dedektif: {question}\nSen: {answer}" for question, answer in recent)
+            sections.append(f"SON KONUŞMALAR:\n{lines}")
+        return "\n\n".join(sections)
+
+    def clear(self):
+        """Forgets every dialogue (new case); summaries still in flight are discarded."""
+        with self._lock:
+            self._generation += 1
+            self._dialogues.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "characters": len(self._dialogues),
+                "turns": sum(len(d.turns) for d in self._dialogues.values()),
+                "pending": sum(1 for d in self._dialogues.values() if d.pending),
+                "summaries": self.summaries,
+                "failures": self.failures,
+            }
@@ -0,0 +1,127 @@
+"""
+Query Embedding Cache
+Memoizes query vectors in front of an embedding model so repeated retrievals
+(fixed story themes, players asking the same thing again) skip the
+transformer forward pass. Documents are always embedded by the wrapped model.
+"""
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text: str) -> str:
+    """
+    Collapses whitespace; used both as the text to embed and as the cache key,
+    so a cached vector is always the vector of exactly its key. Case is kept:
+    cased models embed "Feride" and "feride" differently.
+    """
+    return " ".join(text.split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a bounded LRU cache for embed_query, keyed per model.
+    If `persist_path` is given, vectors are also stored in SQLite and survive
+    restarts; the in-memory LRU sits in front of it. On disk the model is
+    recorded together with `backend` ("torch", "onnx-int8", ...), since the
+    backends produce slightly different vectors for the same text.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, max_entries: int = 2048,
+                 persist_path: Optional[str] = None, backend: str = "torch"):
+        self.base = base
+        self.model_name = model_name
+        self.backend = backend
+        self._disk_model = f"{backend}:{model_name}"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if persist_path:
+            self._conn = sqlite3.connect(persist_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_vectors (
+                    model TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, key)
+                )
+            """)
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            vector = self._load(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return list(vector)
+            self.misses += 1
+
+        vector = self.base.embed_query(key)
+        with self._lock:
+            self._remember(key, vector)
+            self._store(key, vector)
+        return list(vector)
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[List[float]]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT vector FROM query_vectors WHERE model = ? AND key = ?",
+                (self._disk_model, key)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return array("f", row[0]).tolist()
+
+    def _store(self, key: str, vector: List[float]):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_vectors (model, key, vector) VALUES (?, ?, ?)",
+                (self._disk_model, key, array("f", vector).tobytes()))
+            # Keep the on-disk table bounded as well (oldest rows go first)
+            self._conn.execute("""
+                DELETE FROM query_vectors WHERE model = ? AND rowid NOT IN (
+                    SELECT rowid FROM query_vectors WHERE model = ? ORDER BY rowid DESC LIMIT ?
+                )
+            """, (self._disk_model, self._disk_model, self.max_entries * 4))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f" Sorgu vektörü önbelleğe yazılamadı: {e}")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current in-memory size."""
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
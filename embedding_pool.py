@@ -0,0 +1,187 @@
+"""
+Embedding Pool
+Document embedding for ingest, on whatever device the box has.
+
+On a GPU (or Apple MPS) one in-process model is fastest. On CPU-only boxes a
+single sentence-transformers encoder leaves most cores idle, so texts are cut
+into fixed-size slices and sharded across worker processes, each holding its
+own model copy. Several models (one per collection) share one WorkerPool, so
+an ingest never runs more processes than cores. Both paths encode exactly the
+same slices with the same batch size and concatenate the results in input
+order, so the vectors do not depend on the number of workers.
+"""
+import multiprocessing
+import os
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+EMBED_DEVICE = os.getenv("SHERLOCK_EMBED_DEVICE")  # Boşsa otomatik seçilir
+EMBED_BATCH_SIZE = 32  # Tek bir encode çağrısındaki metin sayısı
+
+_worker_models = {}  # Her işçi sürecindeki model kopyaları, (model, batch) başına
+
+
+def detect_device() -> str:
+    """'cuda', 'mps' or 'cpu'; SHERLOCK_EMBED_DEVICE overrides the detection."""
+    if EMBED_DEVICE:
+        return EMBED_DEVICE
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def default_workers() -> int:
+    """One worker per two cores (each encoder already uses a couple of threads)."""
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def _load_model(model_name: str, device: str, batch_size: int) -> HuggingFaceEmbeddings:
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': device},
+        encode_kwargs={'batch_size': batch_size}
+    )
+
+
+def _init_worker(threads: int):
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _embed_slice(task) -> List[List[float]]:
+    model_name, batch_size, texts = task
+    model = _worker_models.get((model_name, batch_size))
+    if model is None:
+        # Model, işçinin bu modelle ilk işinde yüklenir
+        model = _worker_models[(model_name, batch_size)] = _load_model(model_name, "cpu", batch_size)
+    return model.embed_documents(texts)
+
+
+class WorkerPool:
+    """
+    CPU worker processes shared by every PooledEmbeddings of an ingest.
+    Models are embedded one after another, so one pool sized to the cores
+    serves them all; a pool per model would start (and thread) a full set of
+    processes for each. Spawned on first use, closed when its last user
+    releases it.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        # İşçi başına torch iş parçacığı: toplam çekirdek sayısını aşmasın
+        self.threads = max(1, (os.cpu_count() or 1) // workers)
+        self._pool = None
+        self._users = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> "WorkerPool":
+        with self._lock:
+            self._users += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users > 0 or self._pool is None:
+                return
+            pool, self._pool = self._pool, None
+        pool.close()
+        pool.join()
+
+    def map(self, tasks: list) -> list:
+        with self._lock:
+            if self._pool is None:
+                # fork + torch thread pools can deadlock; spawn gives each worker a clean interpreter
+                context = multiprocessing.get_context("spawn")
+                self._pool = context.Pool(self.workers, initializer=_init_worker, initargs=(self.threads,))
+            pool = self._pool
+        return pool.map(_embed_slice, tasks, chunksize=1)
+
+
+class PooledEmbeddings(Embeddings):
+    """
+    Embeddings for bulk ingest. `workers > 1` on CPU embeds in a process
+    pool: `pool` if given (shared with other models), otherwise a private one
+    (spawned lazily on first use). close() releases it; otherwise the model
+    runs in this process. Queries always use the in-process model.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None, workers: int = 1,
+                 batch_size: int = EMBED_BATCH_SIZE, pool: Optional[WorkerPool] = None):
+        self.model_name = model_name
+        self.device = device or detect_device()
+        self.batch_size = batch_size
+        # GPU'da birden fazla süreç aynı kartı paylaşır, hızlanma olmaz
+        if self.device != "cpu":
+            workers, pool = 1, None
+        self.workers = pool.workers if pool is not None else workers
+        self._model = None
+        self._pool = pool.acquire() if pool is not None and self.workers > 1 else None
+
+    def _local_model(self) -> HuggingFaceEmbeddings:
+        if self._model is None:
+            self._model = _load_model(self.model_name, self.device, self.batch_size)
+        return self._model
+
+    def _get_pool(self) -> WorkerPool:
+        if self._pool is None:
+            self._pool = WorkerPool(self.workers).acquire()
+        return self._pool
+
+    def _slices(self, texts: List[str]) -> List[List[str]]:
+        return [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+
+    def _tasks(self, slices: List[List[str]]) -> list:
+        return [(self.model_name, self.batch_size, piece) for piece in slices]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        slices = self._slices(list(texts))
+        if self.workers > 1:
+            results = self._get_pool().map(self._tasks(slices))
+        else:
+            model = self._local_model()
+            results = [model.embed_documents(piece) for piece in slices]
+        return [vector for piece in results for vector in piece]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._local_model().embed_query(text)
+
+    def warm_up(self) -> int:
+        """
+        Loads the model(s) up front so they do not count towards throughput.
+        Returns the vector dimension.
+        """
+        if self.workers > 1:
+            # İşçiler modeli başlarken yükler; işçi başına küçük bir iş bitene kadar bekle
+            vectors = self._get_pool().map(self._tasks([["warm-up"]] * self.workers))[0]
+        else:
+            vectors = self._local_model().embed_documents(["warm-up"])
+        return len(vectors[0])
+
+    def describe(self) -> str:
+        mode = f"{self.workers} süreç" if self.workers > 1 else "tek süreç"
+        return f"{self.model_name} ({self.device}, {mode}, batch {self.batch_size})"
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
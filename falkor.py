@@ -4,39 +4,287 @@ Handles interactions with FalkorDB to store and retrieve game state data
 (Suspects, Locations, Clues, and Relationships) for SherlockAI.
 """
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from falkordb import FalkorDB
+from redis import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from graph_rows import case_rows, relationship_type
 
 # Load environment variables
 load_dotenv()
 
+# (label, property) pairs that the game's MATCH/MERGE clauses filter on
+SCHEMA_INDEXES = [
+    ("Person", "name"),
+    ("Person", "role"),
+    ("Location", "name"),
+    ("Item", "name"),
+]
+
+# Representative lookups used to check that the indexes are picked up
+INDEXED_LOOKUPS = {
+    "person_by_name": ("MATCH (p:Person {name: $value}) RETURN p", {'value': ''}),
+    "person_by_role": ("MATCH (p:Person {role: $value}) RETURN p", {'value': 'Killer'}),
+    "location_by_name": ("MATCH (l:Location {name: $value}) RETURN l", {'value': ''}),
+    "item_by_name": ("MATCH (i:Item {name: $value}) RETURN i", {'value': ''}),
+}
+
+
+class PoolExhausted(RedisConnectionError):
+    """
+    Every pooled connection stayed checked out for the whole pool timeout.
+    The server is fine, just busy: callers should not treat this as an outage.
+    """
+
+
+class _BoundedConnectionPool(BlockingConnectionPool):
+    """BlockingConnectionPool that reports an empty pool as PoolExhausted."""
+
+    def get_connection(self, *args, **kwargs):
+        try:
+            return super().get_connection(*args, **kwargs)
+        except RedisConnectionError as e:
+            # redis-py raises a plain ConnectionError for an empty pool too
+            if str(e).startswith("No connection available"):
+                raise PoolExhausted(str(e)) from e
+            raise
+
+
+def _release_pool(pool):
+    """
+    Closes the idle connections of a replaced pool. Connections still checked
+    out by running queries are left alone; they finish on the old pool and are
+    closed when it is garbage-collected.
+    """
+    try:
+        pool.disconnect(inuse_connections=False)
+    except TypeError:
+        pass  # redis-py < 4.1 can only disconnect everything; leave it to GC
+    except Exception:
+        pass
+
+
+class FalkorConnectionManager:
+    """
+    Shared, thread-safe access to FalkorDB.
+
+    Keeps one bounded redis connection pool (threads block for a free
+    connection instead of opening unlimited sockets), checks server health
+    periodically, and reconnects with exponential backoff after failures, so
+    a FalkorDB restart only pauses running games instead of ending them.
+    """
+
+    def __init__(self, host: str = None, port: int = None, max_connections: int = None,
+                 socket_timeout: float = 5.0, connect_timeout: float = 2.0,
+                 query_timeout_ms: int = 5000, health_check_interval: float = 30.0,
+                 backoff_initial: float = 0.5, backoff_max: float = 30.0):
+        self.host = host or os.getenv("FALKORDB_HOST", "localhost")
+        self.port = int(port or os.getenv("FALKORDB_PORT", "6379"))
+        # Should be at least the number of threads querying at once (server.py passes its worker count)
+        self.max_connections = int(max_connections or os.getenv("FALKORDB_MAX_CONNECTIONS", "16"))
+        self.socket_timeout = socket_timeout
+        self.connect_timeout = connect_timeout
+        self.query_timeout_ms = query_timeout_ms
+        self.health_check_interval = health_check_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self.client = None
+        self.connected = False
+        self.epoch = 0  # Incremented on every successful (re)connect
+        self._graphs = {}
+        self._lock = threading.Lock()
+        self._backoff = backoff_initial
+        self._next_retry = 0.0
+        self._last_check = 0.0
+
+    def connect(self) -> bool:
+        """(Re)creates the pool and verifies the server answers. Returns True on success."""
+        with self._lock:
+            return self._connect_locked()
+
+    def _connect_locked(self) -> bool:
+        try:
+            pool = _BoundedConnectionPool(
+                host=self.host, port=self.port,
+                max_connections=self.max_connections,
+                timeout=self.socket_timeout,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.connect_timeout,
+                health_check_interval=self.health_check_interval,
+            )
+            client = FalkorDB(connection_pool=pool)
+            client.connection.ping()
+        except Exception as e:
+            self.connected = False
+            self._next_retry = time.monotonic() + self._backoff
+            print(f"FalkorDB Connection Failed: {e} (retrying in {self._backoff:.1f}s)")
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+            return False
+
+        if self.client is not None:
+            _release_pool(self.client.connection.connection_pool)
+        self.client = client
+        self._graphs = {}
+        self.connected = True
+        self.epoch += 1
+        self._backoff = self.backoff_initial
+        self._last_check = time.monotonic()
+        return True
+
+    def is_available(self) -> bool:
+        """
+        True if FalkorDB is usable right now. Reconnects when the backoff delay
+        has passed, and pings the server at most every health_check_interval.
+        """
+        now = time.monotonic()
+        if self.connected and now - self._last_check < self.health_check_interval:
+            return True
+        with self._lock:
+            if self.connected:
+                try:
+                    self.client.connection.ping()
+                    self._last_check = time.monotonic()
+                    return True
+                except PoolExhausted:
+                    return True  # Every connection is busy, so the server is answering
+                except Exception as e:
+                    self._mark_failed_locked(e)
+            if now < self._next_retry:
+                return False
+            return self._connect_locked()
+
+    def mark_failed(self, error: Exception):
+        """Called when a query hits a connection error; the next use triggers a reconnect."""
+        with self._lock:
+            self._mark_failed_locked(error)
+
+    def _mark_failed_locked(self, error: Exception):
+        if self.connected:
+            print(f"FalkorDB connection lost: {error}")
+        self.connected = False
+        self._next_retry = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.backoff_max)
+
+    def select_graph(self, graph_name: str):
+        """Graph handle on the pooled client (cached per name)."""
+        graph = self._graphs.get(graph_name)
+        if graph is None:
+            graph = self._graphs[graph_name] = self.client.select_graph(graph_name)
+        return graph
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager(max_connections: int = None) -> FalkorConnectionManager:
+    """
+    Process-wide connection manager shared by every DetectiveDatabase.
+    `max_connections` sizes the pool; on an existing manager it can only grow
+    it, and takes effect on the next (re)connect.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = FalkorConnectionManager(max_connections=max_connections)
+        elif max_connections and max_connections > _manager.max_connections:
+            _manager.max_connections = max_connections
+        return _manager
+
 
 class DetectiveDatabase:
     """
     Manages the Knowledge Graph for the detective game.
     """
 
-    def __init__(self):
+    def __init__(self, graph_name: str = "SherlockCase", manager: FalkorConnectionManager = None):
         """Initialize connection to FalkorDB."""
-        self.host = "localhost"
-        self.port = 6379
-        self.client = None
-        self.graph = None
-        self.is_active = False
+        self.graph_name = graph_name
+        self.manager = manager or get_connection_manager()
+        self._indexed_epoch = 0
+        # Bumped on every write; readers use it to invalidate cached query results
+        self.version = 0
         self._connect()
 
+    @property
+    def host(self):
+        return self.manager.host
+
+    @property
+    def port(self):
+        return self.manager.port
+
+    @property
+    def client(self):
+        return self.manager.client
+
+    @property
+    def graph(self):
+        """Graph handle for this database on the shared pooled client."""
+        if not self.manager.connected:
+            return None
+        return self.manager.select_graph(self.graph_name)
+
+    @property
+    def is_active(self) -> bool:
+        """True when FalkorDB is reachable; transparently reconnects after outages."""
+        if not self.manager.is_available():
+            return False
+        if self._indexed_epoch != self.manager.epoch:
+            # First use on this connection (or after a reconnect): make sure the schema exists.
+            # The server may have restarted in between, so cached reads are no longer trusted.
+            self._indexed_epoch = self.manager.epoch
+            self.version += 1
+            self.ensure_indexes()
+        return True
+
     def _connect(self):
-        """Establish connection to the FalkorDB Docker container."""
-        try:
-            self.client = FalkorDB(host=self.host, port=self.port)
-            self.graph = self.client.select_graph("SherlockCase")
-            self.is_active = True
-            print("Connected to FalkorDB (Graph: SherlockCase)")
-        except Exception as e:
-            print(f"FalkorDB Connection Failed: {e}")
+        """
+        Establish connection to the FalkorDB Docker container. Goes through the
+        manager's availability check, so a recently failed server is not
+        retried before its backoff delay has passed.
+        """
+        if self.manager.is_available():
+            print(f"Connected to FalkorDB (Graph: {self.graph_name})")
+            self._indexed_epoch = self.manager.epoch
+            self.ensure_indexes()
+        else:
             print(
                 "  Make sure Docker is running: 'docker run -p 6379:6379 falkordb/falkordb'")
-            self.is_active = False
+
+    def _query(self, query: str, params: dict = None, timeout: int = None, explain: bool = False):
+        """
+        Runs a query with the per-query timeout (or, with `explain`, asks for
+        its execution plan). Connection failures mark the pool unhealthy (so
+        later calls back off and reconnect) and re-raise. An exhausted pool is
+        only re-raised: the server is up, the process is just busy.
+        """
+        graph = self.graph
+        if graph is None:
+            raise RedisConnectionError("FalkorDB is not connected")
+        try:
+            if explain:
+                return graph.explain(query, params)
+            return graph.query(query, params, timeout=timeout or self.manager.query_timeout_ms)
+        except PoolExhausted:
+            raise
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            self.manager.mark_failed(e)
+            raise
+
+    def _write(self, query: str, params: dict = None):
+        """
+        Runs a mutating query and bumps `version` once it has finished (or
+        failed), so results read before the write are never cached as current.
+        """
+        try:
+            return self._query(query, params)
+        finally:
+            self.version += 1
 
     def reset_game(self):
         """
@@ -46,10 +294,66 @@ class DetectiveDatabase:
             return
 
         try:
-            self.graph.query("MATCH (n) DETACH DELETE n")
+            self._write("MATCH (n) DETACH DELETE n")
             print(" Game board cleared. Ready for a new mystery.")
         except Exception as e:
             print(f"Error resetting game: {e}")
+        self.ensure_indexes()
+
+    def drop_graph(self):
+        """Deletes this graph key entirely (used when a session ends)."""
+        if not self.is_active:
+            return
+
+        try:
+            self.graph.delete()
+        except Exception as e:
+            print(f"Error deleting graph {self.graph_name}: {e}")
+        finally:
+            self.version += 1
+
+    def ensure_indexes(self):
+        """
+        Creates the schema indexes in SCHEMA_INDEXES if they are missing.
+        Safe to call repeatedly; existing indexes are left untouched.
+        """
+        if not self.is_active:
+            return
+
+        for label, prop in self.missing_indexes():
+            try:
+                self._query(f"CREATE INDEX FOR (n:{label}) ON (n.{prop})")
+            except Exception as e:
+                # Another process may have created it in the meantime
+                if "already indexed" not in str(e).lower():
+                    print(f"Could not create index on :{label}({prop}): {e}")
+
+    def missing_indexes(self) -> list:
+        """Returns the (label, property) pairs from SCHEMA_INDEXES that do not exist yet."""
+        if not self.is_active:
+            return list(SCHEMA_INDEXES)
+
+        try:
+            result = self._query("CALL db.indexes() YIELD label, properties RETURN label, properties")
+        except Exception as e:
+            print(f"Could not list indexes: {e}")
+            return list(SCHEMA_INDEXES)
+
+        existing = {(label, prop) for label, properties in result.result_set for prop in properties}
+        return [pair for pair in SCHEMA_INDEXES if pair not in existing]
+
+    def explain(self, query: str, params: dict = None) -> str:
+        """Returns the execution plan FalkorDB would use for a query."""
+        if not self.is_active:
+            return ""
+        return str(self._query(query, params, explain=True))
+
+    def query_plans(self) -> dict:
+        """
+        Execution plans for the indexed lookups, keyed by name. A plan that
+        still contains 'Label Scan' means the matching index is not used.
+        """
+        return {name: self.explain(query, params) for name, (query, params) in INDEXED_LOOKUPS.items()}
 
     def add_person(self, name: str, role: str, trait: str):
         """
@@ -66,7 +370,7 @@ class DetectiveDatabase:
         RETURN p
         """
         params = {'name': name, 'role': role, 'trait': trait}
-        self.graph.query(query, params)
+        self._write(query, params)
 
     def add_location_record(self, person_name: str, name: str, time: str):
         """
@@ -82,7 +386,9 @@ class DetectiveDatabase:
         MERGE (p)-[:SEEN_AT {time: $time}]->(l)
         """
         params = {'person_name': person_name, 'location_name': name, 'time': time}
-        self.graph.query(query, params)
+        self._write(query, params)
+
+    _relationship_type = staticmethod(relationship_type)
 
     def add_relationship(self, person1: str, person2: str, relation_type: str, detail: str):
         """
@@ -91,15 +397,15 @@ class DetectiveDatabase:
         if not self.is_active:
             return
 
-        rel_type = relation_type.upper().replace(" ", "_")
+        rel_type = self._relationship_type(relation_type)
 
         query = f"""
         MATCH (p1:Person {{name: $person1}})
         MATCH (p2:Person {{name: $person2}})
-        MERGE (p1)-[r:{rel_type} {{detail: $detail}}]->(p2)
+        MERGE (p1)-[r:`{rel_type}` {{detail: $detail}}]->(p2)
         """
         params = {'person1': person1, 'person2': person2, 'detail': detail}
-        self.graph.query(query, params)
+        self._write(query, params)
 
     def add_clue(self, item_name: str, location_name: str, description: str):
         """
@@ -115,8 +421,184 @@ class DetectiveDatabase:
         MERGE (i)-[:FOUND_IN]->(l)
         """
         params = {'item_name': item_name, 'location_name': location_name, 'description': description}
-        self.graph.query(query, params)
+        self._write(query, params)
+
+    def load_case(self, mystery: dict, reset: bool = True) -> bool:
+        """
+        Writes a whole generated mystery (people, clues, alibis, relationships)
+        in one round trip.
+
+        Facts are grouped by label and relationship type into parameterised
+        UNWIND statements, which are chained into a single GRAPH.QUERY so the
+        case is loaded atomically: either all of it lands or none of it does.
+        Returns True on success.
+        """
+        if not self.is_active:
+            return False
+
+        people, clues, alibis, relationships = case_rows(mystery)
+
+        # Relationship types cannot be parameterised, so group rows per type
+        relationships_by_type = {}
+        for rel in relationships:
+            relationships_by_type.setdefault(rel['type'], []).append(rel)
+
+        statements = []
+        params = {'people': people, 'clues': clues, 'alibis': alibis}
+        if reset:
+            statements.append("MATCH (n) DETACH DELETE n")
+        statements.append("""
+        UNWIND $people AS row
+        MERGE (p:Person {name: row.name})
+        SET p.role = row.role,
+            p.trait = row.trait""")
+        statements.append("""
+        UNWIND $clues AS row
+        MERGE (i:Item {name: row.item_name, description: row.description})
+        MERGE (l:Location {name: row.location})
+        MERGE (i)-[:FOUND_IN]->(l)""")
+        statements.append("""
+        UNWIND $alibis AS row
+        MATCH (p:Person {name: row.person})
+        MERGE (l:Location {name: row.location})
+        MERGE (p)-[:SEEN_AT {time: row.time}]->(l)""")
+        for index, (rel_type, rows) in enumerate(sorted(relationships_by_type.items())):
+            params[f'rels_{index}'] = rows
+            statements.append(f"""
+        UNWIND $rels_{index} AS row
+        MATCH (p1:Person {{name: row.person1}})
+        MATCH (p2:Person {{name: row.person2}})
+        MERGE (p1)-[:`{rel_type}` {{detail: row.detail}}]->(p2)""")
+
+        # count(*) always yields one row, so each step runs even if the previous one matched nothing
+        query = "\n        WITH count(*) AS _\n".join(statements)
+        try:
+            self._write(query, params)
+            return True
+        except Exception as e:
+            print(f"Error loading case: {e}")
+            return False
+
+    def find_items(self, location_name: str) -> list:
+        """Items found in a location: [{'name', 'description'}]."""
+        if not self.is_active:
+            return []
+
+        query = """
+        MATCH (i:Item)-[:FOUND_IN]->(l:Location {name: $location_name})
+        RETURN i.name AS item, i.description AS description
+        """
+        result = self._query(query, {'location_name': location_name})
+        return [{'name': r[0], 'description': r[1]} for r in result.result_set]
+
+    def find_witnesses(self, location: str, time: str) -> list:
+        """People seen at a location at a given time: [{'name', 'role', 'time'}]."""
+        if not self.is_active:
+            return []
+
+        query = """
+        MATCH (p:Person)-[r:SEEN_AT]->(l:Location {name: $location})
+        WHERE r.time = $time
+        RETURN p.name AS person, p.role AS role, r.time AS time
+        """
+        result = self._query(query, {'location': location, 'time': time})
+        return [{'name': r[0], 'role': r[1], 'time': r[2]} for r in result.result_set]
+
+    def find_relationships(self, person_name: str) -> list:
+        """Outgoing relationships to other people: [{'type', 'target', 'detail'}]."""
+        if not self.is_active:
+            return []
+
+        query = """
+        MATCH (p1:Person {name: $person_name})-[r]->(p2:Person)
+        RETURN type(r) AS relationship, p2.name AS target, r.detail AS detail
+        """
+        result = self._query(query, {'person_name': person_name})
+        return [{'type': r[0], 'target': r[1], 'detail': r[2]} for r in result.result_set]
+
+    def find_killer(self):
+        """Name of the person with the Killer role, or None."""
+        if not self.is_active:
+            return None
+
+        query = """
+        MATCH (k:Person {role: 'Killer'})
+        RETURN k.name AS killer
+        """
+        result = self._query(query)
+        return result.result_set[0][0] if result.result_set else None
+
+    def list_people(self, limit: int = 5) -> list:
+        """First people in the graph: [{'name', 'role', 'trait'}]."""
+        if not self.is_active:
+            return []
+
+        query = "MATCH (p:Person) RETURN p.name, p.role, p.trait LIMIT $limit"
+        result = self._query(query, {'limit': limit})
+        return [{'name': r[0], 'role': r[1], 'trait': r[2]} for r in result.result_set]
+
+    def list_locations(self, limit: int = 5) -> list:
+        """First location names in the graph."""
+        if not self.is_active:
+            return []
+
+        query = "MATCH (l:Location) RETURN l.name LIMIT $limit"
+        result = self._query(query, {'limit': limit})
+        return [r[0] for r in result.result_set]
+
+
+def create_database(backend: str = None, graph_name: str = "SherlockCase"):
+    """
+    Builds the graph backend selected by `backend` or SHERLOCK_GRAPH_BACKEND:
+      - "falkordb": FalkorDB server (default). If it is down, the database
+                    reconnects with backoff once the server is back.
+      - "memory":   in-process graph, no server needed (single-player / tests)
+      - "auto":     FalkorDB if reachable right now, otherwise the in-process
+                    graph for the lifetime of this database (opt-in offline mode)
+    `graph_name` selects the graph key, so concurrent sessions can each use their own.
+    """
+    backend = (backend or os.getenv("SHERLOCK_GRAPH_BACKEND", "falkordb")).lower()
+    if backend == "memory":
+        from memory_graph import InMemoryDetectiveDatabase
+        return InMemoryDetectiveDatabase(graph_name)
+
+    database = DetectiveDatabase(graph_name)
+    if backend == "auto" and not database.is_active:
+        from memory_graph import InMemoryDetectiveDatabase
+        manager = database.manager
+        print("=" * 60)
+        print(f"  WARNING: FalkorDB at {manager.host}:{manager.port} is unreachable.")
+        print(f"  Graph '{graph_name}' uses the in-process backend (offline mode) and")
+        print("  will NOT move to FalkorDB when it comes back. Unset")
+        print("  SHERLOCK_GRAPH_BACKEND=auto to wait for the server instead.")
+        print("=" * 60)
+        return InMemoryDetectiveDatabase(graph_name)
+    return database
+
+
+class LazyDatabase:
+    """
+    Stands in for the database returned by create_database() and builds it on
+    first attribute access, so importing this module does not connect (or wait
+    for a connect timeout). main.py touches it from a warm-up thread.
+    """
+
+    def __init__(self, factory=create_database):
+        self._factory = factory
+        self._database = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """The underlying database, created on the first call."""
+        if self._database is None:
+            with self._lock:
+                if self._database is None:
+                    self._database = self._factory()
+        return self._database
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
 
 
-# Create a global instance
-db = DetectiveDatabase()
\ No newline at end of file
+# Create a global instance (connected on first use)
+db = LazyDatabase()
\ No newline at end of file
@@ -6,30 +6,45 @@ import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from falkor import db
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+from resources import registry, BOOK_EMBEDDING_MODEL
+from session_state import SessionState, encode_snapshot, decode_snapshot
+from telemetry import telemetry
+
+
+def _state_attribute(name: str) -> property:
+    """Exposes a SessionState slot as a DetectiveGame attribute."""
+    return property(lambda self: getattr(self.state, name),
+                    lambda self, value: setattr(self.state, name, value))
+
 
 class DetectiveGame:
     """Main game controller for the detective mystery."""
+
+    # Per-session fields live in self.state so they can be snapshotted as one unit
+    time_limit = _state_attribute("time_limit")
+    start_time = _state_attribute("start_time")
+    game_active = _state_attribute("game_active")
+    current_location = _state_attribute("current_location")
+    case_title = _state_attribute("case_title")
+    victim_name = _state_attribute("victim_name")
+    discovered_evidence = _state_attribute("discovered_evidence")
+    visited_locations = _state_attribute("visited_locations")
+    interviewed_people = _state_attribute("interviewed_people")
     
-    def __init__(self, time_limit_minutes: int = 30):
-        self.time_limit = time_limit_minutes * 60
-        self.start_time = None
-        self.game_active = False
-        self.discovered_evidence = []
-        self.visited_locations = []
-        self.interviewed_people = []
-        self.current_location = "Crime Scene"
-        self.case_title = "Unknown Case"
-        self.victim_name = "Unknown Victim"
-        
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        self.vector_db = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=self.embeddings
-        )
+    def __init__(self, time_limit_minutes: int = 30, database=None):
+        # Graph backend (FalkorDB or in-process); defaults to the shared global instance
+        self.db = database or db
+        self.state = SessionState(time_limit_minutes * 60)
+        # Read-through cache for case lookups, valid while db.version is unchanged
+        self._case_cache: Dict[tuple, object] = {}
+        self._case_cache_version = None
+        self.case_cache_hits = 0
+        self.case_cache_misses = 0
+        
+    @property
+    def vector_db(self):
+        """Shared Sherlock book retriever (BM25 + vector), opened on first use."""
+        return registry.get_retriever(BOOK_EMBEDDING_MODEL)
         
     def initialize_mystery(self, use_ai_generator: bool = True, mystery_data: dict = None):
         """
@@ -44,26 +59,26 @@ class DetectiveGame:
             self.case_title = case['title']
             self.victim_name = case['victim']['name']
         else:
-            db.reset_game()
+            self.db.reset_game()
             
-            db.add_person("Hasan Efendi", "Victim", "Zengin tüccar")
-            db.add_person("Ayşe Hanım", "Suspect", "Eşi, miras alacak")
-            db.add_person("Mehmet Ağa", "Suspect", "Uşak, işten çıkarıldı")
-            db.add_person("Fatma Hanım", "Suspect", "Hizmetçi")
-            db.add_person("Ali Ağa", "Killer", "Bahçıvan")
+            self.db.add_person("Hasan Efendi", "Victim", "Zengin tüccar")
+            self.db.add_person("Ayşe Hanım", "Suspect", "Eşi, miras alacak")
+            self.db.add_person("Mehmet Ağa", "Suspect", "Uşak, işten çıkarıldı")
+            self.db.add_person("Fatma Hanım", "Suspect", "Hizmetçi")
+            self.db.add_person("Ali Ağa", "Killer", "Bahçıvan")
             
-            db.add_location_record("Ayşe Hanım", "Yatak Odası", "Saat 22:00")
-            db.add_location_record("Mehmet Ağa", "Mutfak", "Saat 22:15")
-            db.add_location_record("Ali Ağa", "Bahçe", "Saat 22:00")
-            db.add_location_record("Hasan Efendi", "Bahçe", "Saat 22:00")
+            self.db.add_location_record("Ayşe Hanım", "Yatak Odası", "Saat 22:00")
+            self.db.add_location_record("Mehmet Ağa", "Mutfak", "Saat 22:15")
+            self.db.add_location_record("Ali Ağa", "Bahçe", "Saat 22:00")
+            self.db.add_location_record("Hasan Efendi", "Bahçe", "Saat 22:00")
             
-            db.add_relationship("Ayşe Hanım", "Hasan Efendi", "RESENTS", 
+            self.db.add_relationship("Ayşe Hanım", "Hasan Efendi", "RESENTS", 
                               "Kocasına kızgın")
-            db.add_relationship("Ali Ağa", "Ayşe Hanım", "LOVES", 
+            self.db.add_relationship("Ali Ağa", "Ayşe Hanım", "LOVES", 
                               "Gizli aşk")
             
-            db.add_clue("Kanlı Hançer", "Bahçe", "Mutfak hançeri, parmak izleriyle")
-            db.add_clue("Aşk Mektubu", "Çalışma Odası", "İmzasız mektup")
+            self.db.add_clue("Kanlı Hançer", "Bahçe", "Mutfak hançeri, parmak izleriyle")
+            self.db.add_clue("Aşk Mektubu", "Çalışma Odası", "İmzasız mektup")
             
             print(" Mystery initialized: 'Köşkte Gizem'")
             print(f"Victim: Hasan Efendi found dead in Bahçe at 22:00")
@@ -89,94 +104,94 @@ class DetectiveGame:
         """Check if time has expired."""
         return self.get_remaining_time() <= 0
     
+    def _cached_lookup(self, method: str, *args):
+        """
+        Calls self.db.<method>(*args) once per graph version. The case graph is
+        read-only after loading, so repeat lookups are served from memory; any
+        write through the database bumps its version and empties the cache.
+        Callers get copies, so they can't alter the cached rows.
+        """
+        version = self.db.version
+        if version != self._case_cache_version:
+            self._case_cache.clear()
+            self._case_cache_version = version
+
+        key = (method,) + args
+        if key in self._case_cache:
+            self.case_cache_hits += 1
+            result = self._case_cache[key]
+        else:
+            self.case_cache_misses += 1
+            with telemetry.span(f"graph.{method}") as span:
+                result = getattr(self.db, method)(*args)
+                if isinstance(result, list):
+                    span["result_items"] = len(result)
+            # A write that finished while we were reading makes this result stale
+            if self.db.version == version:
+                self._case_cache[key] = result
+
+        if isinstance(result, list):
+            return [dict(row) if isinstance(row, dict) else row for row in result]
+        return result
+
+    def case_cache_stats(self) -> Dict:
+        """Hit/miss counters for the case lookup cache."""
+        return {
+            "entries": len(self._case_cache),
+            "hits": self.case_cache_hits,
+            "misses": self.case_cache_misses,
+        }
+
     def search_location(self, location_name: str) -> List[Dict]:
-        """Search a location for clues using FalkorDB - PARAMETRELİ."""
-        if not db.is_active:
+        """Search a location for clues using the case graph."""
+        if not self.db.is_active:
             return []
         
-        # Parametreli sorgu
-        query = """
-        MATCH (i:Item)-[:FOUND_IN]->(l:Location {name: $location_name})
-        RETURN i.name AS item, i.description AS description
-        """
-        params = {'location_name': location_name}
-        result = db.graph.query(query, params)
+        records = self._cached_lookup("find_items", location_name)
         
         found_items = []
-        for record in result.result_set:
+        for record in records:
             item_data = {
-                "name": record[0],
-                "description": record[1],
+                "name": record["name"],
+                "description": record["description"],
                 "location": location_name
             }
             found_items.append(item_data)
             
-            if item_data not in self.discovered_evidence:
-                self.discovered_evidence.append(item_data)
+            if self.discovered_evidence.add(item_data):
                 print(f" NEW EVIDENCE: {item_data['name']}")
         
-        if location_name not in self.visited_locations:
-            self.visited_locations.append(location_name)
+        self.visited_locations.add(location_name)
             
         return found_items
     
     def query_witnesses(self, location: str, time: str) -> List[Dict]:
-        """Find who was at a location at a specific time - PARAMETRELİ."""
-        if not db.is_active:
+        """Find who was at a location at a specific time."""
+        if not self.db.is_active:
             return []
         
-        query = """
-        MATCH (p:Person)-[r:SEEN_AT]->(l:Location {name: $location})
-        WHERE r.time = $time
-        RETURN p.name AS person, p.role AS role, r.time AS time
-        """
-        params = {'location': location, 'time': time}
-        result = db.graph.query(query, params)
-        
-        witnesses = []
-        for record in result.result_set:
-            person_name = record[0]
-            witnesses.append({
-                "name": person_name,
-                "role": record[1],
-                "time": record[2]
-            })
-            
-            if person_name not in self.interviewed_people:
-                self.interviewed_people.append(person_name)
+        witnesses = self._cached_lookup("find_witnesses", location, time)
+        for witness in witnesses:
+            self.interviewed_people.add(witness["name"])
         
         return witnesses
     
     def mark_as_interviewed(self, person_name: str):
         """Mark a person as interviewed."""
-        if person_name not in self.interviewed_people:
-            self.interviewed_people.append(person_name)
+        self.interviewed_people.add(person_name)
     
     def get_relationships(self, person_name: str) -> List[Dict]:
-        """Get all relationships for a person - PARAMETRELİ."""
-        if not db.is_active:
+        """Get all relationships for a person."""
+        if not self.db.is_active:
             return []
         
-        query = """
-        MATCH (p1:Person {name: $person_name})-[r]->(p2:Person)
-        RETURN type(r) AS relationship, p2.name AS target, r.detail AS detail
-        """
-        params = {'person_name': person_name}
-        result = db.graph.query(query, params)
-        
-        relationships = []
-        for record in result.result_set:
-            relationships.append({
-                "type": record[0],
-                "target": record[1],
-                "detail": record[2]
-            })
-        
-        return relationships
+        return self._cached_lookup("find_relationships", person_name)
     
     def consult_sherlock(self, question: str) -> str:
         """Use RAG to get detective advice from Sherlock Holmes books."""
-        docs = self.vector_db.similarity_search(question, k=3)
+        with telemetry.span("retrieval.similarity_search", source="sherlock", k=3) as span:
+            docs = self.vector_db.similarity_search(question, k=3)
+            span["result_items"] = len(docs)
         
         context = "\n\n".join([doc.page_content for doc in docs])
         
@@ -192,21 +207,17 @@ Provide a brief, atmospheric response in the style of Sherlock Holmes."""
     
     def make_accusation(self, suspect_name: str) -> Dict:
         """Submit final accusation and check if correct."""
-        if not db.is_active:
+        if not self.db.is_active:
             return {"correct": False, "message": "Database not active"}
         
-        query = """
-        MATCH (k:Person {role: 'Killer'})
-        RETURN k.name AS killer
-        """
-        result = db.graph.query(query)
+        actual_killer = self._cached_lookup("find_killer")
         
-        if not result.result_set:
+        if not actual_killer:
             return {"correct": False, "message": "No killer defined"}
         
-        actual_killer = result.result_set[0][0]
-        
         is_correct = (suspect_name.lower() == actual_killer.lower())
+        # An accusation is final: the investigation is closed and can no longer be resumed
+        self.game_active = False
         
         return {
             "correct": is_correct,
@@ -223,6 +234,21 @@ Provide a brief, atmospheric response in the style of Sherlock Holmes."""
             "time_remaining": self.get_remaining_time(),
             "current_location": self.current_location,
             "evidence_count": len(self.discovered_evidence),
-            "visited_locations": self.visited_locations,
-            "interviewed": self.interviewed_people
-        }
\ No newline at end of file
+            "visited_locations": self.visited_locations.to_list(),
+            "interviewed": self.interviewed_people.to_list()
+        }
+
+    def snapshot(self, mystery: dict = None) -> bytes:
+        """Compact binary snapshot of the session state, timer and (optionally) the mystery."""
+        return encode_snapshot(self.state, mystery)
+
+    def restore(self, data: bytes) -> Optional[Dict]:
+        """
+        Restores a snapshot made by snapshot(). The mystery stored with it is
+        reloaded into the graph and returned. Raises SnapshotError on bad data.
+        """
+        state, mystery = decode_snapshot(data)
+        if mystery and not self.db.load_case(mystery):
+            raise ConnectionError("Case could not be loaded into the graph")
+        self.state = state
+        return mystery
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Case Graph Rows
+Backend-neutral helpers shared by the FalkorDB backend (falkor.py) and the
+in-process backend (memory_graph.py). Kept in their own module so neither
+backend has to import the other.
+"""
+
+
+def relationship_type(relation_type: str) -> str:
+    """Normalizes a relationship label (e.g. 'allies with' -> ALLIES_WITH)."""
+    return relation_type.upper().replace(" ", "_").replace("`", "")
+
+
+def case_rows(mystery: dict):
+    """
+    Normalizes a generated mystery into flat rows for bulk loading.
+    Returns (people, clues, alibis, relationships); missing keys get the same
+    defaults the one-by-one loaders have always used.
+    """
+    case = mystery['case']
+
+    people = [{'name': case['victim']['name'], 'role': 'Victim', 'trait': case['victim']['background']}]
+    for suspect in case['suspects']:
+        role = 'Killer' if suspect.get('is_killer') else 'Suspect'
+        people.append({'name': suspect['name'], 'role': role, 'trait': suspect['trait']})
+
+    clues = []
+    for clue in mystery.get('clues', []):
+        clues.append({
+            'item_name': clue.get('item_name') or clue.get('name') or clue.get('item') or "Bilinmeyen Kanıt",
+            'location': clue.get('location') or clue.get('location_name') or "Bilinmeyen Yer",
+            'description': clue.get('description') or clue.get('desc') or "Detay yok",
+        })
+
+    alibis = []
+    for alibi in mystery.get('alibis', []):
+        alibis.append({
+            'person': alibi.get('person') or alibi.get('name') or "Bilinmeyen",
+            'location': alibi.get('location') or "Bilinmeyen Yer",
+            'time': alibi.get('time') or "Bilinmeyen Saat",
+        })
+
+    relationships = []
+    for rel in mystery.get('relationships', []):
+        relationships.append({
+            'type': relationship_type(rel.get('type') or "KNOWS"),
+            'person1': rel.get('person1') or rel.get('from') or "Bilinmeyen1",
+            'person2': rel.get('person2') or rel.get('to') or "Bilinmeyen2",
+            'detail': rel.get('detail') or "İlişki detayı yok",
+        })
+
+    return people, clues, alibis, relationships
@@ -1,95 +1,481 @@
 import os
 import json
 import shutil
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+import hashlib
+import time
+import argparse
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
+from embedding_pool import EMBED_BATCH_SIZE, PooledEmbeddings, WorkerPool, default_workers
+from keyword_index import KEYWORD_INDEX_FILE, KeywordIndex
+from resources import BOOK_EMBEDDING_MODEL, DIALOGUE_EMBEDDING_MODEL
+from vector_collections import INGEST_VERSION, collection_name, create_collection, delete_ids
+
 # Klasör yolları
 DATA_PATH = "./data"
 DB_PATH = "./chroma_db"
+MANIFEST_PATH = os.path.join(DB_PATH, "ingest_manifest.json")
+MANIFEST_VERSION = f"{INGEST_VERSION}.2"  # <ingest sürümü>.<manifest düzeni>; 2: parça kimlikleri ayrı dosyalarda
+CHUNK_IDS_DIR = os.path.join(DB_PATH, "ingest_chunks")
+KEYWORD_INDEX_PATH = os.path.join(DB_PATH, KEYWORD_INDEX_FILE)
+# Her model için ayrı koleksiyon; oyunun sorguladığı modellerin hepsi burada olmalı
+EMBEDDING_MODELS = [BOOK_EMBEDDING_MODEL, DIALOGUE_EMBEDDING_MODEL]
+WRITE_BATCH_SIZE = 1000
+INGEST_BATCH_SIZE = 256  # Tek seferde gömülüp yazılan parça sayısı (tepe bellek bununla sınırlı)
+READ_BLOCK_CHARS = 1 << 20  # Metin dosyaları bu boyutta bloklar halinde okunur
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+# Bölücünün ayraçları (en kabadan en inceye); blok sınırı da bunlara göre seçilir
+SPLIT_SEPARATORS = ["\n\n", "\n", " ", ""]
 
-def load_json_files(directory):
-    """JSON formatındaki diyalog dosyalarını okur."""
+def _load_json_file(file_path, filename):
+    """Tek bir JSON diyalog dosyasını belgelere dönüştürür."""
     documents = []
-    if not os.path.exists(directory):
-        return documents
-        
-    for filename in os.listdir(directory):
-        if filename.endswith(".json"):
-            file_path = os.path.join(directory, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # JSON liste mi sözlük mü kontrol et
-                    if isinstance(data, list):
-                        items = data
-                    else:
-                        items = [data] # Tek objeyse listeye çevir
-
-                    for item in items:
-                        # İçerik oluştur
-                        content = f"Rol: {item.get('rol', 'Bilinmiyor')}\n"
-                        content += f"Karakteristik: {item.get('karakteristik', '')}\n"
-                        content += "Örnek Konuşma Tarzı:\n"
-                        if 'ornek_cumleler' in item:
-                            for ornek in item['ornek_cumleler']:
-                                content += f"- {ornek}\n"
-                        
-                        # Belgeye dönüştür
-                        documents.append(Document(page_content=content, metadata={"source": filename, "type": "dialogue_style"}))
-            except Exception as e:
-                print(f" {filename} okunurken hata: {e}")
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            # JSON liste mi sözlük mü kontrol et
+            if isinstance(data, list):
+                items = data
+            else:
+                items = [data] # Tek objeyse listeye çevir
+
+            for item in items:
+                # İçerik oluştur
+                content = f"Rol: {item.get('rol', 'Bilinmiyor')}\n"
+                content += f"Karakteristik: {item.get('karakteristik', '')}\n"
+                content += "Örnek Konuşma Tarzı:\n"
+                if 'ornek_cumleler' in item:
+                    for ornek in item['ornek_cumleler']:
+                        content += f"- {ornek}\n"
+
+                # Belgeye dönüştür
+                documents.append(Document(page_content=content, metadata={"source": filename, "type": "dialogue_style"}))
+    except Exception as e:
+        print(f" {filename} okunurken hata: {e}")
     return documents
 
-def create_vector_db():
+def _settled_pieces(text, pieces, text_splitter):
+    """
+    Blok sonundaki ayraç parçası (ör. yarım paragraf) bir sonraki blokta
+    devam edebilir ve bölücü parçaları açgözlü birleştirdiği için önceki
+    parçanın sınırlarını da etkiler. Kesinleşen parça sayısını ve metnin bir
+    sonraki blokla birlikte yeniden bölüneceği ham konumu döndürür; konum ham
+    metne göredir, böylece parçaların kırptığı boşluk kaybolmaz.
+    """
+    separator = next((sep for sep in SPLIT_SEPARATORS if sep and sep in text), None)
+    tail = text.rfind(separator) if separator else -1
+    if tail > 0:
+        rest = text[tail:]
+        if not rest.strip():
+            open_pieces = 0
+        elif len(rest) < CHUNK_SIZE:
+            open_pieces = 1  # Kısa son paragraf yalnızca son parçaya girer
+        else:
+            open_pieces = len(text_splitter.split_text(rest))
+        settled = len(pieces) - open_pieces
+        if settled > 0:
+            start = text.rfind(pieces[settled - 1], 0, tail)
+            split_start = max(text.rfind(separator, 0, start), 0)
+            if not text[split_start:start].strip():
+                # Paragraf başında: bu parça da oradan, aynı biçimde yeniden üretilir
+                return settled - 1, split_start
+            # Tek başına bölünen uzun paragrafın içi: paragraf tamam, sonrası temiz başlar
+            return settled, text.find(separator, start)
+    if len(text) <= READ_BLOCK_CHARS or not pieces:
+        return 0, 0
+    # Bloktan uzun tek bir paragraf: sınırsız beklemek yerine son parçadan,
+    # önündeki boşlukla birlikte devam et (kelimeler yapışmaz, sınır yaklaşık olur)
+    start = text.rfind(pieces[-1])
+    while start and text[start - 1].isspace():
+        start -= 1
+    return len(pieces) - 1, start
+
+def _iter_text_chunks(file_path, text_splitter):
+    """
+    Metin dosyasını blok blok okuyup parçaları tek tek üretir; dosyanın tamamı
+    hiçbir zaman belleğe alınmaz. Blok sınırına değen parçalar bir sonraki
+    blokla birlikte ham metinden yeniden bölünür; sonuç, paragraflar bloktan
+    kısa olduğu sürece tüm metni tek seferde bölmekle aynıdır.
+    """
+    carry = ""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_CHARS), ""):
+            text = carry + block
+            pieces = text_splitter.split_text(text)
+            count, resume = _settled_pieces(text, pieces, text_splitter)
+            yield from pieces[:count]
+            carry = text[resume:]
+    if carry:
+        yield from text_splitter.split_text(carry)
+
+def _iter_source_chunks(filename, text_splitter):
+    """Tek bir kaynak dosyanın (.txt veya .json) parçalarını tembel olarak üretir."""
+    file_path = os.path.join(DATA_PATH, filename)
+    if filename.endswith(".json"):
+        for doc in _load_json_file(file_path, filename):
+            yield from text_splitter.split_documents([doc])
+        return
+    for text in _iter_text_chunks(file_path, text_splitter):
+        yield Document(page_content=text, metadata={"source": file_path})
+
+def _file_sha256(file_path):
+    """Dosya içeriğinin SHA-256 özetini hesaplar."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _chunk_id(filename, chunk, seen):
+    """
+    Parça için içerik tabanlı, kararlı bir kimlik üretir.
+    Aynı dosyada tekrar eden aynı metin sıra numarasıyla ayrıştırılır
+    (`seen` dosya başına tutulan sayaçtır).
+    """
+    base = hashlib.sha256(f"{filename}\0{chunk.page_content}".encode('utf-8')).hexdigest()
+    seen[base] = seen.get(base, 0) + 1
+    return base if seen[base] == 1 else f"{base}-{seen[base]}"
+
+def _list_source_files():
+    """Veri klasöründeki .txt ve .json dosyalarını listeler."""
+    return sorted(f for f in os.listdir(DATA_PATH) if f.endswith((".txt", ".json")))
+
+def _load_manifest():
+    """Önceki ingest manifestini okur; yoksa veya uyumsuzsa None döner."""
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        return manifest
+    except Exception as e:
+        print(f" Manifest okunamadı: {e}")
+        return None
+
+def _chunk_ids_path(filename, file_hash):
+    """Bir dosyanın belirli bir sürümüne ait parça kimliklerinin dosyası."""
+    key = hashlib.sha256(f"{filename}\0{file_hash}".encode('utf-8')).hexdigest()[:32]
+    return os.path.join(CHUNK_IDS_DIR, key + ".ids")
+
+def _save_chunk_ids(filename, file_hash, ids):
+    """Parça kimliklerini satır başına bir kimlik olarak yazar; kimlik sayısını döndürür."""
+    os.makedirs(CHUNK_IDS_DIR, exist_ok=True)
+    path = _chunk_ids_path(filename, file_hash)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        for chunk_id in ids:
+            f.write(chunk_id + "\n")
+    os.replace(path + ".tmp", path)
+    return len(ids)
+
+def _iter_chunk_ids(filename, file_hash):
+    """Dosyanın önceki ingest'te yazılan parça kimliklerini satır satır okur."""
+    try:
+        with open(_chunk_ids_path(filename, file_hash), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+    except FileNotFoundError:
+        print(f"  {filename} için parça kimlikleri bulunamadı; eski parçaları silinemeyecek.")
+
+def _prune_chunk_ids(files):
+    """Manifestte artık geçmeyen (eski sürüm veya silinmiş dosya) kimlik dosyalarını siler."""
+    keep = {os.path.basename(_chunk_ids_path(name, entry["sha256"])) for name, entry in files.items()}
+    if not os.path.isdir(CHUNK_IDS_DIR):
+        return
+    for name in os.listdir(CHUNK_IDS_DIR):
+        if name not in keep:
+            os.remove(os.path.join(CHUNK_IDS_DIR, name))
+
+def _save_manifest(files, models):
+    """
+    Dosya özetlerini ve koleksiyonu olan modelleri manifeste yazar. Parça
+    kimlikleri manifestte değil, dosya sürümü başına ayrı bir dosyada durur
+    (bkz. _save_chunk_ids); artımlı ingest yalnızca değişen dosyaların
+    kimliklerini okur, böylece bellek korpusla değil en büyük dosyayla büyür.
+    """
+    os.makedirs(DB_PATH, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "models": list(models), "files": files},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+    _prune_chunk_ids(files)
+
+def _get_text_splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                                          separators=SPLIT_SEPARATORS)
+
+def _get_embedding_models(models, workers=1, embed_batch_size=EMBED_BATCH_SIZE):
+    # 4. Embedding: her model kendi koleksiyonuna yazar (bkz. vector_collections.py).
+    # Cihaz otomatik seçilir; CPU'da workers > 1 ise modeller sırayla gömüldüğü için
+    # hepsi tek bir süreç havuzunu paylaşır. Modeller ilk yazmada yüklenir.
+    pool = WorkerPool(workers) if workers > 1 else None
+    return [PooledEmbeddings(model, workers=workers, batch_size=embed_batch_size, pool=pool) for model in models]
+
+class _BatchWriter:
+    """
+    Parçaları sabit boyutlu gruplar halinde her modelin koleksiyonuna ve BM25
+    anahtar kelime dizinine yazar, ilerlemeyi (parça sayısı, parça/sn)
+    raporlar. Metin bir kez okunup bölünür, her grup tüm modellerle gömülür.
+    Veritabanı ilk yazmada açılır.
+    """
+
+    def __init__(self, embeddings, batch_size=INGEST_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.stores = None
+        self.keyword_index = None
+        self.written = 0
+        self.deleted = 0
+        self.started = time.perf_counter()
+        self._docs = []
+        self._ids = []
+
+    def add(self, chunk, chunk_id):
+        self._docs.append(chunk)
+        self._ids.append(chunk_id)
+        if len(self._ids) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._ids:
+            return
+        if self.stores is None:
+            self.open()
+            self.started = time.perf_counter()  # Model yükleme süresi hıza sayılmasın
+        for store in self.stores:
+            store.add_documents(self._docs, ids=self._ids)
+        self.keyword_index.add(self._ids, self._docs)
+        self.written += len(self._ids)
+        self._docs, self._ids = [], []
+        print(f"   {self.written} parça yazıldı ({self.rate():.1f} parça/sn)", flush=True)
+
+    def open(self):
+        """Modelleri (veya işçi süreçlerini) yükler, koleksiyonları açar ya da oluşturur."""
+        if self.stores is None:
+            stores = []
+            for embeddings in self.embeddings:
+                print(f" Yapay zeka modeli hazırlanıyor: {embeddings.describe()}...")
+                dimension = embeddings.warm_up()
+                stores.append(create_collection(embeddings.model_name, embeddings, DB_PATH, dimension))
+                print(f"   Koleksiyon: {collection_name(embeddings.model_name)} ({dimension} boyut)")
+            self.stores = stores
+            self._open_keyword_index()
+        return self.stores
+
+    def _open_keyword_index(self):
+        if self.keyword_index is None:
+            self.keyword_index = KeywordIndex(KEYWORD_INDEX_PATH)
+        return self.keyword_index
+
+    def delete(self, ids):
+        """Parçaları kimlikle siler. Modeller yüklenmez: silmek için vektör gerekmez."""
+        ids = list(ids)
+        for embeddings in self.embeddings:
+            delete_ids(embeddings.model_name, DB_PATH, ids, WRITE_BATCH_SIZE)
+        self._open_keyword_index().delete(ids)
+        self.deleted += len(ids)
+
+    def close(self):
+        if self.keyword_index is not None:
+            self.keyword_index.close()
+        for embeddings in self.embeddings:
+            embeddings.close()
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(f" Toplam {self.written} parça {len(self.embeddings)} modelle {elapsed:.1f} sn'de yazıldı "
+              f"({self.rate():.1f} parça/sn).")
+
+def create_vector_db(batch_size=INGEST_BATCH_SIZE, workers=1, embed_batch_size=EMBED_BATCH_SIZE, models=None):
+    """
+    Veritabanını sıfırdan oluşturur. Dosyalar tembel okunur, parçalar
+    üretici olarak akar ve `batch_size`'lık gruplar halinde gömülüp yazılır;
+    tepe bellek korpus boyutundan bağımsızdır. CPU'da `workers` > 1 ise
+    gömme işlemi süreçlere dağıtılır. `models` içindeki her model için
+    (varsayılan EMBEDDING_MODELS) ayrı bir koleksiyon aynı geçişte oluşturulur.
+    """
+    models = models or EMBEDDING_MODELS
     print(" Veri Yükleyicisi Başlatılıyor...")
-    
+
     # Klasör kontrolü
     if not os.path.exists(DATA_PATH):
         os.makedirs(DATA_PATH)
         print(f" '{DATA_PATH}' klasörü oluşturuldu. Lütfen içine .txt kitapları ve .json dosyalarını atıp tekrar çalıştırın.")
         return
 
-    # 1. Metin Dosyalarını Yükle (.txt)
-    print("📚 Kitaplar (.txt) taranıyor...")
-    txt_loader = DirectoryLoader(DATA_PATH, glob="./*.txt", loader_cls=TextLoader, loader_kwargs={'encoding': 'utf-8'})
-    book_docs = txt_loader.load()
-    
-    # 2. JSON Dosyalarını Yükle (.json)
-    print(" Karakter Diyalogları (.json) taranıyor...")
-    json_docs = load_json_files(DATA_PATH)
-    
-    all_docs = book_docs + json_docs
-    
-    if not all_docs:
+    source_files = _list_source_files()
+    if not source_files:
         print(" HATA: 'data' klasöründe hiç dosya bulunamadı!")
         return
 
-    print(f" Toplam {len(all_docs)} parça veri bulundu.")
-
-    # 3. Parçalama
-    print("  Veriler işleniyor...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
-    chunks = text_splitter.split_documents(all_docs)
-
-    # 4. Embedding (TÜRKÇE İÇİN KRİTİK NOKTA)
-    # ollama.py ile aynı model olmak ZORUNDA
-    print(" Yapay zeka modeli hazırlanıyor (paraphrase-multilingual-MiniLM-L12-v2)...")
-    embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    model_kwargs={'device': 'cuda'}  # <--- İŞTE BU SATIR EKLENECEK
-)
-    # 5. Veritabanını Temizle ve Oluştur
     if os.path.exists(DB_PATH):
         print("  Eski veritabanı temizleniyor...")
         shutil.rmtree(DB_PATH)
 
-    print(" Veritabanı kaydediliyor...")
-    Chroma.from_documents(documents=chunks, embedding=embedding_model, persist_directory=DB_PATH)
+    text_splitter = _get_text_splitter()
+    writer = _BatchWriter(_get_embedding_models(models, workers, embed_batch_size), batch_size)
+    files = {}
+    try:
+        for index, filename in enumerate(source_files, 1):
+            print(f"📚 [{index}/{len(source_files)}] {filename} işleniyor...")
+            file_hash = _file_sha256(os.path.join(DATA_PATH, filename))
+            ids, seen = [], {}
+            for chunk in _iter_source_chunks(filename, text_splitter):
+                chunk_id = _chunk_id(filename, chunk, seen)
+                ids.append(chunk_id)
+                writer.add(chunk, chunk_id)
+            files[filename] = {"sha256": file_hash, "chunks": _save_chunk_ids(filename, file_hash, ids)}
+        writer.flush()
+    finally:
+        writer.close()
+    writer.report()
+
+    _save_manifest(files, models)
     print(" İŞLEM TAMAM! Veritabanı hazır.")
 
+def update_vector_db(batch_size=INGEST_BATCH_SIZE, workers=1, embed_batch_size=EMBED_BATCH_SIZE, models=None):
+    """
+    Artımlı ingest: yalnızca yeni veya değişen parçaları gömer,
+    kaynağı silinen parçaları veritabanından kaldırır. Yeni parçalar
+    create_vector_db'deki gibi akış halinde, gruplar halinde yazılır.
+    Model listesi değiştiyse tam yeniden oluşturma yapılır.
+    """
+    models = models or EMBEDDING_MODELS
+    print(" Artımlı Veri Yükleyicisi Başlatılıyor...")
+
+    if not os.path.exists(DATA_PATH):
+        create_vector_db(batch_size, workers, embed_batch_size, models)
+        return
+
+    manifest = _load_manifest()
+    if manifest is None or not os.path.exists(DB_PATH):
+        print(" Manifest bulunamadı, tam yeniden oluşturma yapılıyor...")
+        create_vector_db(batch_size, workers, embed_batch_size, models)
+        return
+    if manifest.get("models") != list(models):
+        print(" Gömme modelleri değişmiş, tam yeniden oluşturma yapılıyor...")
+        create_vector_db(batch_size, workers, embed_batch_size, models)
+        return
+
+    old_files = manifest["files"]
+    new_files = {}
+    text_splitter = _get_text_splitter()
+    writer = _BatchWriter(_get_embedding_models(models, workers, embed_batch_size), batch_size)
+
+    try:
+        for filename in _list_source_files():
+            file_hash = _file_sha256(os.path.join(DATA_PATH, filename))
+            previous = old_files.get(filename)
+            if previous and previous["sha256"] == file_hash:
+                new_files[filename] = previous
+                continue
+
+            print(f"  Değişiklik algılandı: {filename}")
+            old_ids = set(_iter_chunk_ids(filename, previous["sha256"])) if previous else set()
+            ids, seen = [], {}
+            for chunk in _iter_source_chunks(filename, text_splitter):
+                chunk_id = _chunk_id(filename, chunk, seen)
+                ids.append(chunk_id)
+                if chunk_id not in old_ids:
+                    writer.add(chunk, chunk_id)
+            stale = old_ids.difference(ids)
+            if stale:
+                writer.delete(stale)
+            new_files[filename] = {"sha256": file_hash, "chunks": _save_chunk_ids(filename, file_hash, ids)}
+
+        for filename, previous in old_files.items():
+            if filename not in new_files:
+                print(f"  Kaynak silinmiş: {filename}")
+                writer.delete(_iter_chunk_ids(filename, previous["sha256"]))
+
+        writer.flush()
+        if new_files == old_files:
+            print(" Değişiklik yok, veritabanı güncel.")
+            return
+        if writer.deleted:
+            print(f" {writer.deleted} parça silindi.")
+    finally:
+        writer.close()
+    if writer.written:
+        writer.report()
+
+    _save_manifest(new_files, models)
+    print(" İŞLEM TAMAM! Veritabanı güncellendi.")
+
+def _sample_texts(limit):
+    """Kıyaslama için veri klasöründen (gerekirse tekrar ederek) `limit` parça metni."""
+    text_splitter = _get_text_splitter()
+    texts = []
+    for filename in _list_source_files():
+        for chunk in _iter_source_chunks(filename, text_splitter):
+            texts.append(chunk.page_content)
+            if len(texts) >= limit:
+                return texts
+    if not texts:
+        return texts
+    return [texts[i % len(texts)] for i in range(limit)]
+
+def benchmark_workers(worker_counts, limit=2000, embed_batch_size=EMBED_BATCH_SIZE, model_name=BOOK_EMBEDDING_MODEL):
+    """
+    Aynı parçaları farklı işçi sayılarıyla gömer; her biri için parça/sn ve
+    vektörlerin tek süreçli sonuçla birebir aynı olup olmadığını raporlar.
+    Model yükleme süresi ölçüme dahil değildir.
+    """
+    texts = _sample_texts(limit)
+    if not texts:
+        print(" HATA: 'data' klasöründe hiç dosya bulunamadı!")
+        return []
+    print(f" {len(texts)} parça ile kıyaslama (batch {embed_batch_size})")
+    results, reference = [], None
+    for workers in [1] + [w for w in worker_counts if w != 1]:
+        with PooledEmbeddings(model_name, workers=workers, batch_size=embed_batch_size) as embeddings:
+            embeddings.warm_up()
+            started = time.perf_counter()
+            vectors = embeddings.embed_documents(texts)
+            elapsed = time.perf_counter() - started
+        if reference is None:
+            reference = vectors
+        row = {
+            "workers": embeddings.workers,
+            "device": embeddings.device,
+            "chunks_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+            "identical": vectors == reference,
+        }
+        results.append(row)
+        print(f"   {row['workers']} işçi ({row['device']}): {row['chunks_per_second']} parça/sn, "
+              f"sonuç {'aynı' if row['identical'] else 'FARKLI'}")
+    return results
+
 if __name__ == "__main__":
-    create_vector_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SherlockAI vektör veritabanı yükleyicisi")
+    parser.add_argument("--full", action="store_true", help="Veritabanını sıfırdan yeniden oluştur")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                        help="Tek seferde gömülüp yazılan parça sayısı")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="CPU'da gömme için işçi süreç sayısı (GPU'da yok sayılır)")
+    parser.add_argument("--embed-batch-size", type=int, default=EMBED_BATCH_SIZE,
+                        help="Tek bir encode çağrısındaki metin sayısı")
+    parser.add_argument("--models", default=",".join(EMBEDDING_MODELS),
+                        help="Koleksiyonu oluşturulacak gömme modelleri (virgülle ayrılmış)")
+    parser.add_argument("--benchmark-workers", metavar="N,N,...",
+                        help="Veritabanına yazmadan, verilen işçi sayıları için gömme hızını ölç (örn. 1,2,4)")
+    parser.add_argument("--benchmark-chunks", type=int, default=2000, help="Kıyaslamada kullanılacak parça sayısı")
+    args = parser.parse_args()
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+
+    if args.benchmark_workers:
+        counts = [int(n) for n in args.benchmark_workers.split(",") if n.strip()]
+        benchmark_workers(counts, args.benchmark_chunks, args.embed_batch_size, models[0])
+    elif args.full:
+        create_vector_db(args.batch_size, args.workers, args.embed_batch_size, models)
+    else:
+        update_vector_db(args.batch_size, args.workers, args.embed_batch_size, models)
@@ -0,0 +1,264 @@
+"""
+Streaming JSON Validator
+Checks LLM JSON output against a (subset of) JSON Schema while it is still
+being generated, so a bad completion can be abandoned at the first wrong
+token instead of after the whole generation.
+
+Supported schema keywords: type, properties, required, additionalProperties
+(False only), items, minItems, maxItems, minLength, maxLength, enum. The same
+schema dict can be passed to Ollama's `format` option.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+_OPENERS = {"object": "{", "array": "["}
+_LITERAL_CHARS = set("-0123456789.eE+truefalsn")
+
+
+class SchemaViolation(ValueError):
+    """Raised as soon as the partial output can no longer match the schema."""
+
+
+class _Frame:
+    """An open object or array."""
+
+    __slots__ = ("schema", "kind", "state", "keys", "key", "count")
+
+    def __init__(self, schema: Dict, kind: str):
+        self.schema = schema
+        self.kind = kind
+        self.state = "key" if kind == "object" else "value"
+        self.keys = set()
+        self.key = None
+        self.count = 0
+
+
+def _types(schema: Dict) -> List[str]:
+    allowed = schema.get("type")
+    if allowed is None:
+        return []
+    return [allowed] if isinstance(allowed, str) else list(allowed)
+
+
+class StreamingJSONValidator:
+    """
+    Incremental JSON tokenizer with schema checks.
+
+        validator = StreamingJSONValidator(schema)
+        for chunk in stream:
+            validator.feed(chunk)      # raises SchemaViolation early
+            if validator.done:
+                break
+        data = validator.close()       # parsed object
+
+    Text before the root value (e.g. "İşte JSON:") is skipped, up to
+    `max_preamble` non-blank characters; anything after it is ignored.
+    """
+
+    def __init__(self, schema: Dict, max_preamble: int = 200):
+        self.schema = schema
+        self.max_preamble = max_preamble
+        self.done = False
+        self.consumed = 0  # Characters fed so far (how far we got before aborting)
+        self._root_opener = _OPENERS.get((_types(schema) or ["object"])[0], "{")
+        self._text: List[str] = []
+        self._stack: List[_Frame] = []
+        self._preamble = 0
+        self._started = False
+        self._string: Optional[List[str]] = None  # Raw characters of the open string
+        self._string_is_key = False
+        self._escape = False
+        self._literal: Optional[List[str]] = None
+        self._value_schema: Dict = {}
+
+    # ---- Public API ----
+
+    def feed(self, chunk: str):
+        for ch in chunk:
+            if self.done:
+                return
+            self.consumed += 1
+            self._feed_char(ch)
+
+    def close(self) -> Any:
+        """Returns the parsed value; raises SchemaViolation if the JSON is incomplete."""
+        if not self.done:
+            raise SchemaViolation("JSON tamamlanmadı")
+        try:
+            return json.loads("".join(self._text))
+        except json.JSONDecodeError as e:
+            raise SchemaViolation(f"geçersiz JSON: {e}")
+
+    # ---- Tokenizer ----
+
+    def _path(self) -> str:
+        parts = []
+        for frame in self._stack:
+            if frame.kind == "object" and frame.key is not None:
+                parts.append(f".{frame.key}")
+            elif frame.kind == "array" and frame.count:
+                parts.append(f"[{frame.count - 1}]")
+        return "".join(parts).lstrip(".") or "$"
+
+    def _fail(self, message: str):
+        raise SchemaViolation(f"{self._path()}: {message}")
+
+    def _feed_char(self, ch: str):
+        if not self._started:
+            if ch == self._root_opener:
+                self._started = True
+                self._text.append(ch)
+                self._open(self.schema, ch)
+            elif not ch.isspace():
+                self._preamble += 1
+                if self._preamble > self.max_preamble:
+                    raise SchemaViolation("JSON başlamadan önce çok fazla metin")
+            return
+
+        self._text.append(ch)
+
+        if self._string is not None:
+            self._string_char(ch)
+            return
+
+        if self._literal is not None:
+            if ch in _LITERAL_CHARS:
+                self._literal.append(ch)
+                return
+            self._end_literal()
+
+        if ch.isspace():
+            return
+        self._structural(ch)
+
+    def _string_char(self, ch: str):
+        if self._escape:
+            self._escape = False
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            raw, self._string = "".join(self._string), None
+            try:
+                value = json.loads(f'"{raw}"')
+            except json.JSONDecodeError:
+                self._fail("geçersiz metin kaçışı")
+            if self._string_is_key:
+                self._end_key(value)
+            else:
+                self._check_string(value)
+                self._end_value()
+            return
+        self._string.append(ch)
+
+    def _structural(self, ch: str):
+        frame = self._stack[-1]
+        if frame.kind == "object":
+            if frame.state == "key" and ch == '"':
+                self._string, self._string_is_key = [], True
+            elif frame.state == "key" and ch == "}" and not frame.keys:
+                self._close(frame)
+            elif frame.state == "colon" and ch == ":":
+                frame.state = "value"
+            elif frame.state == "value":
+                properties = frame.schema.get("properties", {})
+                self._begin_value(properties.get(frame.key, {}), ch)
+            elif frame.state == "next" and ch == ",":
+                frame.state = "key"
+            elif frame.state == "next" and ch == "}":
+                self._close(frame)
+            else:
+                self._fail(f"beklenmeyen karakter {ch!r}")
+        else:
+            if frame.state == "value" and ch == "]" and frame.count == 0:
+                self._close(frame)
+            elif frame.state == "value":
+                frame.count += 1
+                max_items = frame.schema.get("maxItems")
+                if max_items is not None and frame.count > max_items:
+                    self._fail(f"en fazla {max_items} öğe olabilir")
+                self._begin_value(frame.schema.get("items", {}), ch)
+            elif frame.state == "next" and ch == ",":
+                frame.state = "value"
+            elif frame.state == "next" and ch == "]":
+                self._close(frame)
+            else:
+                self._fail(f"beklenmeyen karakter {ch!r}")
+
+    def _begin_value(self, schema: Dict, ch: str):
+        if ch == "{":
+            kind = "object"
+        elif ch == "[":
+            kind = "array"
+        elif ch == '"':
+            kind = "string"
+        elif ch in "tf":
+            kind = "boolean"
+        elif ch == "n":
+            kind = "null"
+        elif ch == "-" or ch.isdigit():
+            kind = "number"
+        else:
+            self._fail(f"beklenmeyen karakter {ch!r}")
+
+        allowed = _types(schema)
+        if allowed and kind not in allowed and not (kind == "number" and "integer" in allowed):
+            self._fail(f"{'/'.join(allowed)} bekleniyordu, {kind} geldi")
+
+        if kind in ("object", "array"):
+            self._open(schema, ch)
+        elif kind == "string":
+            self._string, self._string_is_key = [], False
+            self._value_schema = schema
+        else:
+            self._literal = [ch]
+            self._value_schema = schema
+
+    def _open(self, schema: Dict, ch: str):
+        self._stack.append(_Frame(schema, "object" if ch == "{" else "array"))
+
+    def _close(self, frame: _Frame):
+        if frame.kind == "object":
+            frame.key = None
+            missing = [key for key in frame.schema.get("required", []) if key not in frame.keys]
+            if missing:
+                self._fail(f"eksik alan(lar): {', '.join(missing)}")
+        else:
+            min_items = frame.schema.get("minItems")
+            if min_items is not None and frame.count < min_items:
+                self._fail(f"en az {min_items} öğe olmalı")
+        self._stack.pop()
+        self._end_value()
+
+    def _end_key(self, key: str):
+        frame = self._stack[-1]
+        frame.key = key
+        if frame.schema.get("additionalProperties") is False and key not in frame.schema.get("properties", {}):
+            self._fail(f"beklenmeyen alan '{key}'")
+        frame.keys.add(key)
+        frame.state = "colon"
+
+    def _end_literal(self):
+        raw, self._literal = "".join(self._literal), None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self._fail(f"geçersiz değer {raw!r}")
+        allowed = _types(self._value_schema)
+        if "integer" in allowed and "number" not in allowed and isinstance(value, float):
+            self._fail("tam sayı bekleniyordu")
+        self._end_value()
+
+    def _check_string(self, value: str):
+        schema = self._value_schema
+        if "enum" in schema and value not in schema["enum"]:
+            self._fail(f"'{value}' izin verilen değerlerden biri değil")
+        if len(value.strip()) < schema.get("minLength", 0):
+            self._fail("boş metin")
+        if "maxLength" in schema and len(value) > schema["maxLength"]:
+            self._fail(f"metin {schema['maxLength']} karakterden uzun")
+
+    def _end_value(self):
+        if not self._stack:
+            self.done = True
+            return
+        self._stack[-1].state = "next"
@@ -0,0 +1,231 @@
+"""
+Keyword Index & Hybrid Retrieval
+Persistent BM25 inverted index (SQLite) over the chunks written by ingest.py,
+and a retriever that fuses it with the Chroma vector search.
+
+Dense retrieval is good at paraphrases but often misses exact names and
+objects ("hançer", "mektup", a suspect's name); BM25 catches those. Results of
+both are merged with reciprocal-rank fusion. Short keyword queries ("Feride
+Hanım", "kanlı mendil") are answered from the index alone, without embedding.
+
+Tokenisation is Turkish-aware: I/İ are folded to ı/i before lower-casing, and
+words are cut to their first five letters (F5 stemming), which conflates most
+inflected forms ("mektup", "mektubu", "mektupta").
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+KEYWORD_INDEX_FILE = "keyword_index.sqlite"
+STEM_LENGTH = 5
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal-rank fusion sabiti
+KEYWORD_QUERY_MAX_TERMS = 3
+
+_WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+acaba ama ancak bana bazı belki ben beni benim bile bir biraz birkaç biz bu buna bunu bunun
+burada çok çünkü da daha de defa diye en gibi hem hep hepsi her hiç için ile ise işte kadar
+ki kim kime kimi kimin mi mı mu mü nasıl ne neden nerede nereye niçin niye o olan olarak
+oldu olduğu onu onun orada sen seni siz şey şu tüm ve veya ya yani zaman
+a an and are as at be but by did do does for from had has have he her his how i in is it
+its me my no not of on or she so that the their them there they this to was were what when
+where which who whom why will with you your
+""".split())
+
+
+def turkish_fold(text: str) -> str:
+    """Lower-cases with Turkish rules: I -> ı, İ -> i (str.lower gets both wrong)."""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Content-word stems of `text` (stop words removed)."""
+    return [word[:STEM_LENGTH] for word in _WORD.findall(turkish_fold(text))
+            if word not in STOPWORDS and not word.isdigit()]
+
+
+class KeywordIndex:
+    """
+    BM25 over an SQLite inverted index. Chunks are keyed by the same stable
+    ids ingest.py gives Chroma, so incremental ingest can add and delete them
+    in step with the vector store.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk);
+        """)
+        self._conn.commit()
+        self._corpus: Optional[Tuple[int, float]] = None  # (chunk count, mean length), cached
+
+    def add(self, chunk_ids: Sequence[str], documents: Sequence[Document]):
+        """Indexes the chunks; ids that are already present are skipped (ids are content hashes)."""
+        with self._lock:
+            for chunk_id, doc in zip(chunk_ids, documents):
+                terms = Counter(tokenize(doc.page_content))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO chunks (chunk_id, content, metadata, length) VALUES (?, ?, ?, ?)",
+                    (chunk_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False),
+                     sum(terms.values())))
+                if not cursor.rowcount:
+                    continue
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()])
+            self._conn.commit()
+            self._corpus = None
+
+    def delete(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                row = self._conn.execute("SELECT id FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if row:
+                    self._conn.execute("DELETE FROM postings WHERE chunk = ?", row)
+                    self._conn.execute("DELETE FROM chunks WHERE id = ?", row)
+            self._conn.commit()
+            self._corpus = None
+
+    def _corpus_stats(self) -> Tuple[int, float]:
+        """Caller holds the lock."""
+        if self._corpus is None:
+            count, mean = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            self._corpus = (count, mean or 1.0)
+        return self._corpus
+
+    def document_frequency(self, term: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()
+        return row[0]
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """Top-k chunks by BM25 score for the query's content words."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            count, mean_length = self._corpus_stats()
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.chunk, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk "
+                    "WHERE p.term = ?", (term,)).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for chunk, tf, length in rows:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / mean_length)
+                    scores[chunk] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            results = []
+            for chunk, score in top:
+                content, metadata = self._conn.execute(
+                    "SELECT content, metadata FROM chunks WHERE id = ?", (chunk,)).fetchone()
+                results.append((Document(page_content=content, metadata=json.loads(metadata)), score))
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._corpus_stats()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_keyword_index(persist_directory: str) -> Optional[KeywordIndex]:
+    """The index next to a Chroma directory, or None if ingest has not built one yet."""
+    path = os.path.join(persist_directory, KEYWORD_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    return KeywordIndex(path)
+
+
+class HybridRetriever:
+    """
+    Vector store + keyword index behind the vector store's similarity_search
+    signature, so existing callers keep working. Without an index it is a
+    plain pass-through to the vector store.
+    """
+
+    def __init__(self, vector_store, keyword_index: Optional[KeywordIndex], rrf_k: int = RRF_K):
+        self.vector_store = vector_store
+        self.keyword_index = keyword_index
+        self.rrf_k = rrf_k
+        self._lock = threading.Lock()
+        self.counts = {"keyword": 0, "hybrid": 0, "vector": 0}
+
+    def _count(self, mode: str):
+        with self._lock:
+            self.counts[mode] += 1
+
+    def is_keyword_query(self, query: str) -> bool:
+        """
+        A few content words and nothing else (no question or filler words),
+        each of which occurs in the index: BM25 alone answers it.
+        """
+        words = _WORD.findall(turkish_fold(query))
+        terms = tokenize(query)
+        if not terms or len(terms) != len(words) or len(terms) > KEYWORD_QUERY_MAX_TERMS:
+            return False
+        return all(self.keyword_index.document_frequency(term) for term in terms)
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        if self.keyword_index is None:
+            self._count("vector")
+            return self.vector_store.similarity_search(query, k=k)
+
+        if self.is_keyword_query(query):
+            self._count("keyword")
+            return [doc for doc, _ in self.keyword_index.search(query, k)]
+
+        self._count("hybrid")
+        candidates = max(k * 4, 10)
+        rankings = [
+            [doc for doc, _ in self.keyword_index.search(query, candidates)],
+            self.vector_store.similarity_search(query, k=candidates),
+        ]
+        return self.fuse(rankings, k)
+
+    def fuse(self, rankings: List[List[Document]], k: int) -> List[Document]:
+        """Reciprocal-rank fusion; the same chunk text from both lists counts once."""
+        scores: Dict[str, float] = defaultdict(float)
+        docs: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking, 1):
+                scores[doc.page_content] += 1.0 / (self.rrf_k + rank)
+                docs.setdefault(doc.page_content, doc)
+        ordered = sorted(scores, key=scores.get, reverse=True)
+        return [docs[content] for content in ordered[:k]]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counts)
+        stats["indexed_chunks"] = len(self.keyword_index) if self.keyword_index else 0
+        return stats
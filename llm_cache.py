@@ -0,0 +1,111 @@
+"""
+LLM Response Cache
+Persistent, size-bounded SQLite cache for deterministic-enough LLM calls.
+Entries are keyed on model, generation options and prompt hash, and are
+evicted least-recently-used first once the entry or byte budget is exceeded.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+CACHE_PATH = "./llm_cache.sqlite"
+
+
+class LLMResponseCache:
+    """Thread-safe on-disk cache of LLM replies with LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = 5000,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, options: Dict, prompt: str) -> str:
+        """Stable cache key for a (model, options, prompt) triple."""
+        payload = json.dumps({"model": model, "options": options}, sort_keys=True)
+        digest = hashlib.sha256(payload.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached reply for key, or None. A hit refreshes the entry's LRU position."""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+            except sqlite3.Error as e:
+                print(f" LLM önbellek okuma hatası: {e}")
+                self.misses += 1
+                return None
+
+    def put(self, key: str, response: str):
+        """Store a reply and evict old entries if the cache is over budget."""
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, size, time.time()))
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f" LLM önbellek yazma hatası: {e}")
+
+    def _evict(self):
+        """Delete least-recently-used entries until both budgets are met."""
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        """Remove every cached reply."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Entry count, stored bytes and hit/miss counters."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
@@ -2,12 +2,19 @@
 SherlockAI - İnteraktif Dedektif Oyunu
 Agatha Christie ve Sherlock Holmes tarzında sürükleyici dedektif deneyimi
 """
+import os
 import sys
 import io
 import time
+from contextlib import nullcontext
 from game_engine import DetectiveGame
 from ollama import DetectiveAgent
 from story_generator import MysteryGenerator
+from mystery_pool import MysteryPool
+from resources import registry, BOOK_EMBEDDING_MODEL, DIALOGUE_EMBEDDING_MODEL
+from session_state import SnapshotError
+from telemetry import telemetry
+from warmup import WarmupTracker, PENDING, READY
 from visualize_falkor_graph import visualize_graph_data
 
 # ----------------------------------------------------------------
@@ -17,17 +24,66 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
 # ----------------------------------------------------------------
 
+# Yarım kalan soruşturma her komuttan sonra buraya kaydedilir
+SAVE_PATH = os.getenv("SHERLOCK_SAVE_PATH", "./saves/autosave.snap")
+# Soğuk başlangıçta havuzun yarıdaki üretimi en fazla bu kadar beklenir
+POOL_WAIT_SECONDS = float(os.getenv("SHERLOCK_POOL_WAIT_SECONDS", "300"))
+
 class GameCLI:
     """Dedektif oyunu için sade CLI arayüzü."""
     
-    def __init__(self):
-        self.game = DetectiveGame(time_limit_minutes=30)
-        self.agent = DetectiveAgent(model_name="gemma2")
-        self.generator = MysteryGenerator(model_name="gemma2")
+    def __init__(self, game: DetectiveGame = None, agent: DetectiveAgent = None,
+                 generator: MysteryGenerator = None, use_pool: bool = True, warm_up: bool = True):
+        self.game = game or DetectiveGame(time_limit_minutes=30)
+        self.agent = agent or DetectiveAgent(model_name="gemma2")
+        self.generator = generator or MysteryGenerator(model_name="gemma2")
+        # Hazır vakalar arka planda üretilir; oyun açılışı beklemez (use_pool=False: havuz hiç kurulmaz)
+        self.pool = None
+        if use_pool:
+            self.pool = MysteryPool(self.generator, depth=3)
+            self.pool.start()
+        # Model/embedding/veritabanı yüklemeleri oyuncu girişi okurken arka planda yapılır
+        self.warmup = WarmupTracker()
+        if warm_up:
+            self.start_warmup()
+        
+        # İzleme: havuz ve önbellek sayaçları da /metrics üzerinden yayınlanır
+        if self.pool is not None:
+            telemetry.add_collector("mystery_pool", self.pool.stats)
+        telemetry.add_collector("case_cache", self.game.case_cache_stats)
+        telemetry.add_collector("dialogue_memory", self.agent.memory.stats)
+        telemetry.add_collector("warmup", self.warmup.stats)
+        if self.agent.cache:
+            telemetry.add_collector("llm_cache", self.agent.cache.stats)
+        if os.getenv("SHERLOCK_METRICS_PORT"):
+            telemetry.serve_metrics(int(os.getenv("SHERLOCK_METRICS_PORT")))
         self.running = True
         self.mystery_data = None
         self.current_character = None
         
+    def start_warmup(self):
+        """LLM ağırlıklarını, embedding modellerini, Chroma'yı ve FalkorDB bağlantısını paralel hazırla."""
+        self.warmup.add(f"llm:{self.agent.model_name}", self.agent.warm_up)
+        if self.generator.model_name != self.agent.model_name:
+            self.warmup.add(f"llm:{self.generator.model_name}", self.generator.warm_up)
+        self.warmup.add("embeddings:diyalog", lambda: registry.warm_up(DIALOGUE_EMBEDDING_MODEL))
+        self.warmup.add("embeddings:kitaplar", lambda: registry.warm_up(BOOK_EMBEDDING_MODEL))
+        self.warmup.add("graf", self._warm_up_graph)
+
+    def _warm_up_graph(self):
+        # Ortak graf nesnesi ilk erişimde oluşturulur; bağlantı burada, arka planda kurulur
+        if not self.game.db.is_active:
+            raise ConnectionError("Graf veritabanına bağlanılamadı "
+                                  "(sunucusuz oynamak için SHERLOCK_GRAPH_BACKEND=memory)")
+
+    def print_readiness(self):
+        """Arka plan hazırlıklarının durumunu tek satırda göster."""
+        status = self.warmup.status()
+        if not status:
+            return
+        labels = {PENDING: "yükleniyor", READY: "hazır"}
+        print("Sistem: " + ", ".join(f"{name} {labels.get(state, 'hata')}" for name, state in status.items()))
+
     def print_header(self):
         """Oyun başlığını göster."""
         print("\n------------------------------------------------------")
@@ -47,6 +103,21 @@ class GameCLI:
         else:
             print(f"\nKalan Süre: {mins:02d}:{secs:02d}")
         
+    def pool_paused(self):
+        """Ön planda LLM kullanılırken havuz yeni üretime başlamasın."""
+        return self.pool.paused() if self.pool is not None else nullcontext()
+
+    def print_stream(self, stream) -> str:
+        """AI cevabını parça parça, geldikçe yazdır."""
+        print('"', end="", flush=True)
+        parts = []
+        with self.pool_paused():
+            for chunk in stream:
+                parts.append(chunk)
+                print(chunk, end="", flush=True)
+        print('"\n')
+        return "".join(parts)
+        
     def print_commands(self):
         """Mevcut komutları göster."""
         print("\nKOMUTLAR:")
@@ -74,10 +145,7 @@ class GameCLI:
         input("[Devam etmek için ENTER'a basın...]")
         
         print("\nVaka dosyası oluşturuluyor...")
-        print("(AI benzersiz bir cinayet senaryosu üretiyor...)")
-        print("Lütfen bekleyin, bu işlem biraz sürebilir...\n")
-        
-        self.mystery_data = self.generator.create_full_mystery()
+        self.mystery_data = self.load_mystery()
         
         case = self.mystery_data['case']
         
@@ -102,7 +170,71 @@ class GameCLI:
         print(' Sherlock Holmes\'ün dediği gibi: Olasızı elemek gerek,')
         print(' geriye ne kalırsa - ne kadar inanılmaz olsa da - gerçektir."\n')
         
+        self.print_readiness()
         input("[Soruşturmaya başlamak için ENTER...]")
+        self.wait_for_warmup()
+
+    def load_mystery(self):
+        """
+        Havuzdan hazır vaka al. Havuz boşsa ama işçi zaten bir vaka üretiyorsa
+        (soğuk başlangıç) ikinci bir üretim başlatmak yerine onu bekle; aynı
+        Ollama'yı paylaşan iki üretim ikisini de yavaşlatır.
+        """
+        with self.pool_paused():
+            mystery = self.pool.take(timeout=POOL_WAIT_SECONDS) if self.pool is not None else None
+            if mystery:
+                self.generator.save_debug_copy(mystery)
+                return mystery
+            print("(AI benzersiz bir cinayet senaryosu üretiyor...)")
+            print("Lütfen bekleyin, bu işlem biraz sürebilir...\n")
+            return self.generator.create_full_mystery(concept_candidates=3)
+
+    def wait_for_warmup(self):
+        """İlk gerçek istek soğuk başlamasın: süren hazırlıkları bekle."""
+        if PENDING in self.warmup.status().values():
+            print("\nSon hazırlıklar tamamlanıyor...")
+            self.warmup.wait(timeout=120)
+
+    def try_resume(self) -> bool:
+        """Kayıtlı yarım bir soruşturma varsa oyuncuya sorup kaldığı yerden yükler."""
+        if not os.path.exists(SAVE_PATH):
+            return False
+        answer = input("\nYarım kalan bir soruşturma bulundu. Devam etmek ister misiniz? (evet/hayır) > ")
+        if answer.strip().lower() not in ["evet", "e", "yes", "y"]:
+            self.clear_save()
+            return False
+        try:
+            with open(SAVE_PATH, "rb") as f:
+                self.mystery_data = self.game.restore(f.read())
+        except (OSError, SnapshotError, ConnectionError) as e:
+            print(f"Kayıt yüklenemedi: {e}")
+            return False
+        if not self.mystery_data:
+            return False
+        print(f"\n'{self.game.case_title}' soruşturmasına kaldığınız yerden devam ediyorsunuz.")
+        print(f"Toplanan kanıt: {len(self.game.discovered_evidence)} | Görüşülen: {len(self.game.interviewed_people)}")
+        self.wait_for_warmup()
+        return True
+
+    def autosave(self):
+        """Soruşturma sürüyorsa durumu kaydet; bittiyse kaydı sil."""
+        if not self.game.game_active:
+            self.clear_save()
+            return
+        try:
+            os.makedirs(os.path.dirname(SAVE_PATH) or ".", exist_ok=True)
+            tmp_path = SAVE_PATH + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self.game.snapshot(self.mystery_data))
+            os.replace(tmp_path, SAVE_PATH)
+        except OSError as e:
+            print(f"(Oyun kaydedilemedi: {e})")
+
+    def clear_save(self):
+        try:
+            os.remove(SAVE_PATH)
+        except FileNotFoundError:
+            pass
         
     def get_all_suspects(self):
         """Tüm şüphelileri listele."""
@@ -139,8 +271,7 @@ class GameCLI:
                 print(f"  Açıklama: {item['description']}\n")
                 
             print("Dedektif Asistanı:")
-            comment = self.agent.comment_on_evidence(item['name'], item['description'])
-            print(f'"{comment}"\n')
+            self.print_stream(self.agent.stream_comment_on_evidence(item['name'], item['description']))
         else:
             print(f"\n{target_location} içinde önemli bir şey bulunamadı.")
             print("Belki başka bir yer daha verimli olabilir?\n")
@@ -174,37 +305,42 @@ class GameCLI:
         print(f"Rolü: {character['role']} | Karakter: {character['trait']}")
         print("------------------------------------------------------")
         
-        print(f"\n{character['name']}:")
-        intro = self.agent.character_introduction(
-            character['name'], 
-            character['trait'],
-            character['role'],
-            victim['name']
-        )
-        print(f'"{intro}"\n')
+        # Sorgu boyunca özetler ve havuz üretimi modeli meşgul etmesin; karakter
+        # kartının KV önbelleği bir sonraki soruya kadar korunur
+        with self.agent.interrogation(), self.pool_paused():
+            print(f"\n{character['name']}:")
+            self.print_stream(self.agent.stream_character_introduction(
+                character['name'], 
+                character['trait'],
+                character['role'],
+                victim['name'],
+                relationships=relationships,
+                is_killer=character.get('is_killer', False)
+            ))
         
-        print("Sorunuzu yazın (veya 'çık' yazın):")
+            print("Sorunuzu yazın (veya 'çık' yazın):")
         
-        while True:
-            question = input(f"\n[{character['name']}] > ").strip()
+            while True:
+                question = input(f"\n[{character['name']}] > ").strip()
             
-            if question.lower() in ['çık', 'cik', 'exit', 'bitti']:
-                print(f"\nGörüşme sona erdi.\n")
-                self.current_character = None
-                break
+                if question.lower() in ['çık', 'cik', 'exit', 'bitti']:
+                    print(f"\nGörüşme sona erdi.\n")
+                    self.current_character = None
+                    break
             
-            if not question:
-                continue
+                if not question:
+                    continue
             
-            print(f"\n{character['name']}:")
-            response = self.agent.character_response(
-                character_name=character['name'],
-                character_trait=character['trait'],
-                question=question,
-                relationships=relationships,
-                is_killer=character.get('is_killer', False)
-            )
-            print(f'"{response}"\n')
+                print(f"\n{character['name']}:")
+                self.print_stream(self.agent.stream_character_response(
+                    character_name=character['name'],
+                    character_trait=character['trait'],
+                    question=question,
+                    relationships=relationships,
+                    is_killer=character.get('is_killer', False),
+                    role=character['role'],
+                    victim_name=victim['name']
+                ))
             
     def handle_ask(self, args):
         """Dedektif asistanına soru sor."""
@@ -219,10 +355,8 @@ class GameCLI:
         time.sleep(1)
         
         state = self.game.get_game_summary()
-        answer = self.agent.answer_question(question, state)
-        
         print(f"Dedektif Asistanı:")
-        print(f'"{answer}"\n')
+        self.print_stream(self.agent.stream_answer_question(question, state))
         
     def handle_evidence(self):
         """Kanıtları göster."""
@@ -243,8 +377,7 @@ class GameCLI:
             print(f"   Açıklama: {item['description']}\n")
         
         print("Dedektif Asistanı - Analiz:")
-        analysis = self.agent.analyze_evidence(evidence)
-        print(f'"{analysis}"\n')
+        self.print_stream(self.agent.stream_analyze_evidence(evidence))
         
     def handle_suspects(self):
         """Şüphelileri listele."""
@@ -367,6 +500,11 @@ class GameCLI:
         cmd = parts[0].lower()
         args = parts[1:]
         
+        with telemetry.span(f"command.{cmd}"):
+            self._dispatch_command(cmd, args)
+            
+    def _dispatch_command(self, cmd: str, args: list):
+        """Komutu ilgili işleyiciye yönlendir."""
         if cmd in ["ara", "search"]:
             self.handle_search(args)
         elif cmd in ["konuş", "konus", "talk"]:
@@ -397,12 +535,17 @@ class GameCLI:
     def run(self):
         """Ana oyun döngüsü."""
         try:
-            self.display_intro()
-            
-            # AI hikayeyi yükle
-            self.generator.load_mystery_to_database(self.mystery_data)
-            self.game.initialize_mystery(use_ai_generator=True, mystery_data=self.mystery_data)
-            self.game.start_game()
+            if not self.try_resume():
+                self.display_intro()
+                
+                # AI hikayeyi yükle
+                self.generator.load_mystery_to_database(self.mystery_data)
+                self.game.initialize_mystery(use_ai_generator=True, mystery_data=self.mystery_data)
+                self.game.start_game()
+                self.autosave()
+            if self.pool is not None:
+                # Oyun boyunca havuz yalnızca bir sonraki oyunu hazır tutar
+                self.pool.playing = True
             
             print("\n------------------------------------------------------")
             print("SORUŞTURMA BAŞLADI")
@@ -417,6 +560,7 @@ class GameCLI:
                     suspect = input("\nKatil kimdir? > ").strip()
                     if suspect:
                         self.handle_accuse([suspect])
+                    self.clear_save()
                     break
                 
                 self.print_timer()
@@ -427,6 +571,7 @@ class GameCLI:
                     if command:
                         print()
                         self.process_command(command)
+                        self.autosave()
                         
                 except KeyboardInterrupt:
                     print("\n\nOyun kesildi.")
@@ -0,0 +1,178 @@
+"""
+In-Process Graph Backend
+A dependency-free stand-in for DetectiveDatabase that keeps the case graph in
+Python dictionaries. It implements the same write API and the handful of read
+shapes the game uses, so single-player sessions and tests run fully offline.
+
+Person, Location and Item names are hash-indexed and every relationship is
+stored in adjacency lists, so each lookup is a dictionary access.
+"""
+import threading
+from typing import Dict, List, Optional
+
+from graph_rows import case_rows, relationship_type
+
+
+class InMemoryDetectiveDatabase:
+    """
+    Manages the Knowledge Graph for the detective game, in memory.
+    """
+
+    def __init__(self, graph_name: str = "SherlockCase"):
+        self.graph_name = graph_name
+        self.graph = None  # No Cypher endpoint; use the query methods below
+        self.is_active = True
+        self.version = 0  # Bumped on every write, like DetectiveDatabase.version
+        self._lock = threading.RLock()
+        self._clear()
+        print(f"Using in-process graph backend (Graph: {graph_name})")
+
+    def _clear(self):
+        # Node indexes
+        self.people: Dict[str, Dict] = {}            # name -> {'role', 'trait'}
+        self.people_by_role: Dict[str, List[str]] = {}
+        self.locations: Dict[str, None] = {}        # insertion-ordered set
+        self.items: Dict[tuple, None] = {}          # (name, description), insertion-ordered set
+        # Adjacency lists
+        self.items_in: Dict[str, List[tuple]] = {}            # location -> [(item, description)]
+        self.seen_at: Dict[str, List[tuple]] = {}             # location -> [(person, time)]
+        self.relationships: Dict[str, List[tuple]] = {}       # person -> [(type, target, detail)]
+
+    def reset_game(self):
+        """
+        Clears the entire graph to start a new game/scenario.
+        """
+        with self._lock:
+            self._clear()
+            self.version += 1
+        print(" Game board cleared. Ready for a new mystery.")
+
+    def drop_graph(self):
+        """Releases the whole graph (used when a session ends)."""
+        with self._lock:
+            self._clear()
+            self.version += 1
+
+    def ensure_indexes(self):
+        """Name and role lookups are always hash-indexed here; nothing to create."""
+
+    def missing_indexes(self) -> list:
+        """Every index from SCHEMA_INDEXES is built in, so none is ever missing."""
+        return []
+
+    def query_plans(self) -> dict:
+        """Describes how each indexed lookup is served, mirroring DetectiveDatabase.query_plans."""
+        return {
+            "person_by_name": "Hash lookup: people[name]",
+            "person_by_role": "Hash lookup: people_by_role[role]",
+            "location_by_name": "Hash lookup: locations[name]",
+            "item_by_name": "Adjacency lookup: items_in[location]",
+        }
+
+    def add_person(self, name: str, role: str, trait: str):
+        """
+        Adds a person (Suspect, Victim, or Killer) to the graph.
+        """
+        with self._lock:
+            previous = self.people.get(name)
+            if previous and previous['role'] != role:
+                self.people_by_role[previous['role']].remove(name)
+            if not previous or previous['role'] != role:
+                self.people_by_role.setdefault(role, []).append(name)
+            self.people[name] = {'role': role, 'trait': trait}
+            self.version += 1
+
+    def add_location_record(self, person_name: str, name: str, time: str):
+        """
+        Records a character's location at a specific time (Alibi).
+        """
+        with self._lock:
+            if person_name not in self.people:
+                return
+            self.locations[name] = None
+            records = self.seen_at.setdefault(name, [])
+            if (person_name, time) not in records:
+                records.append((person_name, time))
+            self.version += 1
+
+    def add_relationship(self, person1: str, person2: str, relation_type: str, detail: str):
+        """
+        Adds a social relationship between two characters.
+        """
+        with self._lock:
+            if person1 not in self.people or person2 not in self.people:
+                return
+            edge = (relationship_type(relation_type), person2, detail)
+            edges = self.relationships.setdefault(person1, [])
+            if edge not in edges:
+                edges.append(edge)
+            self.version += 1
+
+    def add_clue(self, item_name: str, location_name: str, description: str):
+        """
+        Places a physical clue in a location.
+        """
+        with self._lock:
+            item = (item_name, description)
+            self.items[item] = None
+            self.locations[location_name] = None
+            found = self.items_in.setdefault(location_name, [])
+            if item not in found:
+                found.append(item)
+            self.version += 1
+
+    def load_case(self, mystery: dict, reset: bool = True) -> bool:
+        """
+        Writes a whole generated mystery. The lock is held for the whole load,
+        so readers never observe a half-loaded case.
+        """
+        people, clues, alibis, relationships = case_rows(mystery)
+        with self._lock:
+            if reset:
+                self._clear()
+            for person in people:
+                self.add_person(person['name'], person['role'], person['trait'])
+            for clue in clues:
+                self.add_clue(clue['item_name'], clue['location'], clue['description'])
+            for alibi in alibis:
+                self.add_location_record(alibi['person'], alibi['location'], alibi['time'])
+            for rel in relationships:
+                self.add_relationship(rel['person1'], rel['person2'], rel['type'], rel['detail'])
+            self.version += 1
+        return True
+
+    def find_items(self, location_name: str) -> list:
+        """Items found in a location: [{'name', 'description'}]."""
+        with self._lock:
+            return [{'name': name, 'description': description}
+                    for name, description in self.items_in.get(location_name, [])]
+
+    def find_witnesses(self, location: str, time: str) -> list:
+        """People seen at a location at a given time: [{'name', 'role', 'time'}]."""
+        with self._lock:
+            return [{'name': person, 'role': self.people[person]['role'], 'time': seen_time}
+                    for person, seen_time in self.seen_at.get(location, [])
+                    if seen_time == time]
+
+    def find_relationships(self, person_name: str) -> list:
+        """Outgoing relationships to other people: [{'type', 'target', 'detail'}]."""
+        with self._lock:
+            return [{'type': rel_type, 'target': target, 'detail': detail}
+                    for rel_type, target, detail in self.relationships.get(person_name, [])]
+
+    def find_killer(self) -> Optional[str]:
+        """Name of the person with the Killer role, or None."""
+        with self._lock:
+            killers = self.people_by_role.get('Killer')
+            return killers[0] if killers else None
+
+    def list_people(self, limit: int = 5) -> list:
+        """First people in the graph: [{'name', 'role', 'trait'}]."""
+        with self._lock:
+            return [{'name': name, 'role': data['role'], 'trait': data['trait']}
+                    for name, data in list(self.people.items())[:limit]]
+
+    def list_locations(self, limit: int = 5) -> list:
+        """First location names in the graph."""
+        with self._lock:
+            return list(self.locations)[:limit]
@@ -0,0 +1,226 @@
+"""
+Mystery Pool
+Keeps a small on-disk queue of pre-generated, validated mysteries so a new
+game can start instantly instead of waiting for two full LLM generations.
+A background worker refills the queue whenever it drops below its depth.
+The worker shares the LLM with the game, so it holds off while the
+foreground generates or streams, and keeps a shallower queue during play.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+POOL_DIR = "./mystery_pool"
+
+
+def validate_mystery(mystery: Dict) -> bool:
+    """
+    Checks that a generated mystery is complete and consistent enough to be
+    served from the pool. Fallback cases are rejected so the pool only holds
+    fresh stories.
+    """
+    try:
+        case = mystery['case']
+        if case.get('is_fallback'):
+            return False
+        suspects = case['suspects']
+        killers = [s['name'] for s in suspects if s.get('is_killer')]
+        if len(killers) != 1 or case['killer']['name'] != killers[0]:
+            return False
+        if not case['victim']['name'] or len(case['locations']) < 3:
+            return False
+        if not all(s.get('name') and 'trait' in s and 'motive' in s for s in suspects):
+            return False
+        if not mystery['clues'] or not all('item_name' in c and 'location' in c for c in mystery['clues']):
+            return False
+        return bool(mystery['alibis']) and bool(mystery['relationships'])
+    except (KeyError, TypeError, AttributeError):
+        return False
+
+
+class MysteryPool:
+    """
+    On-disk queue of ready mysteries with a background refill worker.
+    Each mystery is one JSON file; files are claimed with an atomic rename,
+    so several processes can share the same pool directory.
+    """
+
+    def __init__(self, generator, pool_dir: str = POOL_DIR, depth: int = 3,
+                 refill_interval: float = 5.0, play_depth: int = 1):
+        self.generator = generator
+        self.pool_dir = pool_dir
+        self.depth = depth
+        self.refill_interval = refill_interval
+        # Oyun sürerken yalnızca bir sonraki oyun için stok tutulur
+        self.play_depth = play_depth
+        self.playing = False
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.rejected = 0
+        self.last_generation_seconds = None
+        self._generated_at = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Guards the pause count and the in-flight refill flag
+        self._state = threading.Condition()
+        self._paused = 0
+        self._refilling = False
+
+    def _ready_files(self):
+        """Ready mystery files, oldest first (none until the directory is created)."""
+        try:
+            return sorted(f for f in os.listdir(self.pool_dir) if f.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def ready_count(self) -> int:
+        """Number of mysteries waiting in the pool."""
+        return len(self._ready_files())
+
+    def start(self):
+        """Start the background refill worker (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        os.makedirs(self.pool_dir, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mystery-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ask the worker to stop after its current generation."""
+        self._stop.set()
+        with self._state:
+            self._state.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @contextmanager
+    def paused(self):
+        """
+        Holds refills while the foreground uses the same LLM (a cold-start
+        generation or a streamed reply). A refill already running finishes.
+        """
+        with self._state:
+            self._paused += 1
+        try:
+            yield
+        finally:
+            with self._state:
+                self._paused -= 1
+                self._state.notify_all()
+
+    def target_depth(self) -> int:
+        """Queue depth the worker aims for: shallower while a game is being played."""
+        return min(self.depth, self.play_depth) if self.playing else self.depth
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.ready_count() >= self.target_depth():
+                self._stop.wait(self.refill_interval)
+                continue
+            with self._state:
+                if self._paused:
+                    self._state.wait(self.refill_interval)
+                    continue
+                self._refilling = True
+            try:
+                self.refill_one()
+            except Exception as e:
+                print(f" Havuz üretim hatası: {e}")
+                self._stop.wait(self.refill_interval)
+            finally:
+                with self._state:
+                    self._refilling = False
+                    self._state.notify_all()
+
+    def refill_one(self) -> bool:
+        """Generate one mystery and add it to the pool if it validates."""
+        started = time.perf_counter()
+        mystery = self.generator.create_full_mystery(verbose=False)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.last_generation_seconds = round(elapsed, 2)
+            if not validate_mystery(mystery):
+                self.rejected += 1
+                return False
+            self.generated += 1
+            self._generated_at.append(time.time())
+
+        os.makedirs(self.pool_dir, exist_ok=True)
+        name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.pool_dir, name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(mystery, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.pool_dir, name + ".json"))
+        return True
+
+    def pop(self) -> Optional[Dict]:
+        """Take the oldest ready mystery, or None if the pool is empty."""
+        return self._count(self._claim())
+
+    def take(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Like pop(), but when the pool is empty and the worker is already
+        generating, waits up to `timeout` for that mystery instead of starting
+        a second generation that would compete for the same LLM.
+        """
+        mystery = self._claim()
+        if mystery is None:
+            with self._state:
+                self._state.wait_for(lambda: not self._refilling, timeout)
+            mystery = self._claim()
+        return self._count(mystery)
+
+    def _count(self, mystery: Optional[Dict]) -> Optional[Dict]:
+        with self._lock:
+            if mystery is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return mystery
+
+    def _claim(self) -> Optional[Dict]:
+        """Claims the oldest valid ready file, or None."""
+        for filename in self._ready_files():
+            path = os.path.join(self.pool_dir, filename)
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # Another process got it first
+            try:
+                with open(claimed, "r", encoding="utf-8") as f:
+                    mystery = json.load(f)
+            except (OSError, ValueError):
+                mystery = None
+            finally:
+                os.remove(claimed)
+
+            if mystery and validate_mystery(mystery):
+                return mystery
+        return None
+
+    def stats(self) -> Dict:
+        """Pool depth, refill rate and hit/miss counters."""
+        with self._lock:
+            hour_ago = time.time() - 3600
+            return {
+                "ready": self.ready_count(),
+                "target_depth": self.target_depth(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "generated": self.generated,
+                "rejected": self.rejected,
+                "refills_last_hour": sum(1 for t in self._generated_at if t >= hour_ago),
+                "last_generation_seconds": self.last_generation_seconds,
+                "worker_running": bool(self._thread and self._thread.is_alive()),
+                "paused": self._paused > 0,
+            }
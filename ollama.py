@@ -1,39 +1,64 @@
 import json
 import logging
+import os
+import time
+from contextlib import nullcontext
+from typing import Generator, Iterator
 from langchain_community.llms import Ollama
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from conversation_memory import ConversationMemory
 from falkor import db
+from llm_cache import LLMResponseCache, CACHE_PATH
+from resources import registry, DIALOGUE_EMBEDDING_MODEL
+from telemetry import telemetry
 
 logging.basicConfig(level=logging.INFO)
 
+# Sabit cevaplar ve İngilizce filtre ayarları
+CONFUSED_REPLY = "Kafam biraz karıştı dedektif, lütfen sorunuzu Türkçe tekrarlayın."
+ERROR_REPLY = "Şu an düşüncelerimi toparlayamıyorum."
+NO_EVIDENCE_REPLY = "Henüz kanıt yok."
+ENGLISH_MARKERS = ("Here is", "Sure")
+STREAM_PREFIX_WINDOW = 48
+# Gösterilmeye başlanmış bir cevap kesilirse uyarı cevabından önce eklenir
+STREAM_CUT_MARK = "... "
+# Karakter başına sorgu hafızası bütçesi (yaklaşık token)
+DIALOGUE_MEMORY_TOKENS = 600
+# Model (ve KV önbelleği) Ollama'da bu süre boyunca yüklü kalır; varsayılan 5 dakika çok kısa
+OLLAMA_KEEP_ALIVE = os.getenv("SHERLOCK_OLLAMA_KEEP_ALIVE", "30m")
+# Sorgu özetleri için ayrı (ör. küçük) bir model; boşsa sorgu modeli kullanılır ve
+# özetler sorgu süresince ertelenir (başka bir prompt karakter kartının KV önbelleğini siler)
+SUMMARY_MODEL = os.getenv("SHERLOCK_SUMMARY_MODEL", "")
+
 class DetectiveAgent:
     """
     Tamamen Türkçe konuşan, RAG tabanlı ve karakterlere bürünen dedektif asistanı.
     """
     
-    def __init__(self, model_name: str = "gemma2"):
+    def __init__(self, model_name: str = "gemma2", use_cache: bool = True, cache_path: str = CACHE_PATH,
+                 database=None, cache: LLMResponseCache = None):
         print(f"🤖 AI Ajanı Başlatılıyor (Model: {model_name})...")
 
-        self.llm = Ollama(
-            model=model_name, 
-            temperature=0.1,    # Gemma2 çok yaratıcıdır, 0.1 gayet iyi.
-            repeat_penalty=1.2  # Tekrarı önleyen kritik ayar
-        )
-        
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-        )
-        
-        try:
-            self.vector_db = Chroma(
-                persist_directory="./chroma_db",
-                embedding_function=self.embeddings
-            )
-            print("Vektör Veritabanı (RAG) Bağlandı.")
-        except Exception as e:
-            print(f" Vektör Veritabanı Hatası: {e}")
-            self.vector_db = None
+        # Graf bağlamı için kullanılacak veritabanı (varsayılan: ortak global örnek)
+        self.db = database or db
+
+        self.model_name = model_name
+        self.llm_options = {
+            "temperature": 0.1,    # Gemma2 çok yaratıcıdır, 0.1 gayet iyi.
+            "repeat_penalty": 1.2  # Tekrarı önleyen kritik ayar
+        }
+        # keep_alive üretimi etkilemez, bu yüzden önbellek anahtarına (llm_options) girmez
+        self.llm = Ollama(model=model_name, keep_alive=OLLAMA_KEEP_ALIVE, **self.llm_options)
+        self.summary_model = SUMMARY_MODEL or model_name
+        self._summary_llm = None
+        if self.summary_model != model_name:
+            self._summary_llm = Ollama(model=self.summary_model, keep_alive=OLLAMA_KEEP_ALIVE, **self.llm_options)
+        # Aynı model + ayar + prompt için cevaplar diskte saklanır (use_cache=False ile devre dışı).
+        # Birden çok ajan (ör. sunucu oturumları) aynı önbellek nesnesini paylaşabilir.
+        self.cache = (cache or LLMResponseCache(cache_path)) if use_cache else None
+        self._vector_db = None
+        self._vector_db_failed = False
+        # Sorgu hafızası: eski turlar arka planda özetlenir, prompt boyu sabit kalır
+        self.memory = ConversationMemory(self._summarize_dialogue, max_tokens=DIALOGUE_MEMORY_TOKENS)
         
         self.system_prompt = """SENİN GÖREVİN: Sherlock Holmes evreninde geçen bir cinayet oyununda, oyuncuya yardımcı olan yapay zekasın.
 
@@ -45,11 +70,32 @@ class DetectiveAgent:
 5. GİZLİLİK: Katilin ismini asla direkt söyleme.
 """
     
+    @property
+    def vector_db(self):
+        """Paylaşılan vektör veritabanı; ilk kullanımda açılır, hata olursa None döner."""
+        if self._vector_db is None and not self._vector_db_failed:
+            try:
+                self._vector_db = registry.get_retriever(DIALOGUE_EMBEDDING_MODEL)
+                print("Vektör Veritabanı (RAG) Bağlandı.")
+            except Exception as e:
+                print(f" Vektör Veritabanı Hatası: {e}")
+                self._vector_db_failed = True
+        return self._vector_db
+    
+    def warm_up(self):
+        """
+        Model ağırlıklarını Ollama'ya yükler ve ortak sistem prompt'unu işleyip
+        KV önbelleğine alır (tek token üretilir). Oyun açılışında arka planda çağrılır.
+        """
+        self.llm.invoke(self.system_prompt, num_predict=1)
+
     def get_rag_context(self, query: str, k: int = 3) -> str:
         if not self.vector_db:
             return ""
         try:
-            docs = self.vector_db.similarity_search(query, k=k)
+            with telemetry.span("retrieval.similarity_search", source="agent", k=k) as span:
+                docs = self.vector_db.similarity_search(query, k=k)
+                span["result_items"] = len(docs)
             if not docs:
                 return ""
             context_parts = []
@@ -60,39 +106,65 @@ class DetectiveAgent:
         except Exception:
             return ""
 
-    def character_introduction(self, name: str, trait: str, role: str, victim_name: str) -> str:
-        # Karakter konuşmalarında RAG bazen kafasını karıştırabilir, bu yüzden prompt'u basitleştirdik.
-        prompt = f"""{self.system_prompt}
+    def _character_card(self, name: str, trait: str, role: str = "", victim_name: str = "",
+                        relationships: list = None, is_killer: bool = False) -> str:
+        """
+        Karakterin sabit kimlik kartı. Sistem prompt'undan hemen sonra gelir ve
+        tanıtım ile tüm soru cevaplarında birebir aynıdır; böylece Ollama'nın
+        prompt önbelleği bu ön eki bir kez işler, sonraki turlarda yalnızca
+        yeni kısım (hafıza + soru) için prefill yapılır.
+        """
+        rel_text = "İlişkilerim:"
+        if relationships:
+            for r in relationships[:3]:
+                rel_text += f"\n- {r['target']} kişisine: {r['detail']}"
+
+        secret = "SEN KATİLSİN! Yakalanmamak için mantıklı yalanlar söyle." if is_killer else "SEN MASUMSUN. Bildiklerini anlat."
+
+        return f"""{self.system_prompt}
 
 ŞU AN BU KARAKTERİ CANLANDIRIYORSUN:
 İsim: {name}
 Rol: {role}
 Özellik: {trait}
 Kurbanla İlişki: {victim_name} tanıyordun.
+DURUMUN: {secret}
+{rel_text}
+"""
 
+    def _introduction_prompt(self, name: str, trait: str, role: str, victim_name: str,
+                             relationships: list = None, is_killer: bool = False) -> str:
+        # Karakter konuşmalarında RAG bazen kafasını karıştırabilir, bu yüzden prompt'u basitleştirdik.
+        return f"""{self._character_card(name, trait, role, victim_name, relationships, is_killer)}
 GÖREV: Dedektife kendini tanıt.
 SADECE TÜRKÇE KONUŞ. "Thing", "Invitation" gibi kelimeler kullanma.
 Kısa ve öz konuş.
 
 Cevap:"""
-        return self._invoke_llm(prompt)
-    
-    def character_response(self, character_name: str, character_trait: str, 
-                          question: str, relationships: list, is_killer: bool = False) -> str:
-        
-        rel_text = "İlişkilerim:"
-        if relationships:
-            for r in relationships[:3]:
-                rel_text += f"\n- {r['target']} kişisine: {r['detail']}"
-        
-        secret = "SEN KATİLSİN! Yakalanmamak için mantıklı yalanlar söyle." if is_killer else "SEN MASUMSUN. Bildiklerini anlat."
-        
-        prompt = f"""{self.system_prompt}
 
-KARAKTERİN: {character_name} ({character_trait})
-DURUMUN: {secret}
-{rel_text}
+    def character_introduction(self, name: str, trait: str, role: str, victim_name: str,
+                               use_cache: bool = True, relationships: list = None,
+                               is_killer: bool = False) -> str:
+        return self._invoke_llm(self._introduction_prompt(
+            name, trait, role, victim_name, relationships, is_killer), use_cache)
 
+    def stream_character_introduction(self, name: str, trait: str, role: str, victim_name: str,
+                                      use_cache: bool = True, relationships: list = None,
+                                      is_killer: bool = False) -> Iterator[str]:
+        return self._stream_llm(self._introduction_prompt(
+            name, trait, role, victim_name, relationships, is_killer), use_cache)
+    
+    def _response_prompt(self, character_name: str, character_trait: str,
+                         question: str, relationships: list, is_killer: bool = False,
+                         role: str = "", victim_name: str = "") -> str:
+        card = self._character_card(character_name, character_trait, role, victim_name, relationships, is_killer)
+
+        # Hafıza karttan sonra gelir: turlar sona eklendikçe ön ek değişmez
+        history = self.memory.context(character_name)
+        if history:
+            history = f"\n{history}\nÖnceki cevaplarınla çelişme.\n"
+        
+        return f"""{card}{history}
 SORU: "{question}"
 
 GÖREV:
@@ -101,12 +173,77 @@ ASLA İNGİLİZCE KELİME KULLANMA.
 Saçma kelimeler türetme. Düzgün Türkçe cümle kur.
 
 Cevap:"""
-        return self._invoke_llm(prompt)
+
+    def character_response(self, character_name: str, character_trait: str, 
+                          question: str, relationships: list, is_killer: bool = False,
+                          use_cache: bool = True, role: str = "", victim_name: str = "") -> str:
+        reply = self._invoke_llm(self._response_prompt(
+            character_name, character_trait, question, relationships, is_killer, role, victim_name), use_cache)
+        self._remember_turn(character_name, question, reply)
+        return reply
+
+    def stream_character_response(self, character_name: str, character_trait: str,
+                                  question: str, relationships: list, is_killer: bool = False,
+                                  use_cache: bool = True, role: str = "",
+                                  victim_name: str = "") -> Iterator[str]:
+        stream = self._stream_llm(self._response_prompt(
+            character_name, character_trait, question, relationships, is_killer, role, victim_name), use_cache)
+        # Yalnızca sonuna kadar okunan turlar hatırlanır; yarıda bırakılan akışta buraya gelinmez
+        reply = yield from stream
+        self._remember_turn(character_name, question, reply)
+
+    def _remember_turn(self, character_name: str, question: str, reply: str):
+        """Başarılı cevapları karakterin hafızasına ekler (hata/uyarı cevapları hariç)."""
+        if reply and reply not in (CONFUSED_REPLY, ERROR_REPLY):
+            self.memory.add_turn(character_name, question, reply)
+
+    @property
+    def summary_llm(self):
+        """Özet modeli; ayrı bir model ayarlanmadıysa sorgu modelinin kendisi."""
+        return self._summary_llm or self.llm
+
+    def interrogation(self):
+        """
+        Bir sorgu boyunca (cevaplar ve oyuncunun yazdığı süre) özetleri ertele.
+        Özetler sorgu modelini kullanıyorsa araya giren özet prompt'u, karakter
+        kartıyla başlayan önbelleğe alınmış ön eki silip sonraki cevabı yavaşlatır.
+        """
+        return self.memory.hold() if self._summary_llm is None else nullcontext()
+
+    def _summarize_dialogue(self, character_name: str, summary: str, turns: list) -> str:
+        """Eski sorgu turlarını önceki özetle birleştirip kısa bir özet çıkarır (arka planda çalışır)."""
+        lines = "\n".join(f"Dedektif: {q}\n{character_name}: {a}" for q, a in turns)
+        prompt = f"""Aşağıda dedektifin {character_name} ile yaptığı sorgunun bir bölümü var.
+
+ÖNCEKİ ÖZET: {summary or "Yok"}
+
+YENİ KONUŞMALAR:
+{lines}
+
+GÖREV:
+Önceki özeti ve yeni konuşmaları birleştirerek en fazla 80 kelimelik tek bir özet yaz.
+{character_name} kişisinin iddialarını, verdiği saat ve yer bilgilerini mutlaka koru.
+SADECE TÜRKÇE yaz.
+
+Özet:"""
+        with telemetry.span("llm.summarize", model=self.summary_model) as span:
+            generation = self.summary_llm.generate([prompt]).generations[0][0]
+            info = generation.generation_info or {}
+            span["prompt_tokens"] = info.get("prompt_eval_count")
+            span["completion_tokens"] = info.get("eval_count")
+        clean = self._clean_reply(generation.text)
+        if self._is_english_reply(clean):
+            raise ValueError("özet Türkçe değil")
+        return clean
+
+    def reset_memory(self):
+        """Yeni vaka: tüm karakterlerin sorgu hafızasını siler."""
+        self.memory.clear()
     
-    def answer_question(self, question: str, game_state: dict = None) -> str:
+    def _question_prompt(self, question: str) -> str:
         graph_context = self._get_graph_context(question)
         
-        prompt = f"""{self.system_prompt}
+        return f"""{self.system_prompt}
 
 BİLGİLER:
 {graph_context}
@@ -116,59 +253,184 @@ SORU: "{question}"
 GÖREV: Dedektif asistanı olarak Türkçe cevap ver. İngilizce terim kullanma.
 
 Cevap:"""
-        return self._invoke_llm(prompt)
+
+    def answer_question(self, question: str, game_state: dict = None, use_cache: bool = True) -> str:
+        return self._invoke_llm(self._question_prompt(question), use_cache)
+
+    def stream_answer_question(self, question: str, game_state: dict = None,
+                               use_cache: bool = True) -> Iterator[str]:
+        return self._stream_llm(self._question_prompt(question), use_cache)
     
-    def suggest_next_action(self, game_state: dict) -> str:
+    def suggest_next_action(self, game_state: dict, use_cache: bool = True) -> str:
         prompt = f"""{self.system_prompt}
 Oyuncu şimdi ne yapmalı? Ona Sherlock tarzı kısa bir tavsiye ver.
 Cevap:"""
-        return self._invoke_llm(prompt)
+        return self._invoke_llm(prompt, use_cache)
 
-    def analyze_evidence(self, evidence_list: list) -> str:
-        if not evidence_list: return "Henüz kanıt yok."
+    def _evidence_prompt(self, evidence_list: list) -> str:
         evidence_text = "\n".join([f"- {e['name']}: {e['description']}" for e in evidence_list])
         
-        prompt = f"""{self.system_prompt}
+        return f"""{self.system_prompt}
 KANITLAR:
 {evidence_text}
 
 Bu kanıtları yorumla. Türkçe konuş.
 Analiz:"""
-        return self._invoke_llm(prompt)
+
+    def analyze_evidence(self, evidence_list: list, use_cache: bool = True) -> str:
+        if not evidence_list: return NO_EVIDENCE_REPLY
+        return self._invoke_llm(self._evidence_prompt(evidence_list), use_cache)
+
+    def stream_analyze_evidence(self, evidence_list: list, use_cache: bool = True) -> Iterator[str]:
+        if not evidence_list: return iter([NO_EVIDENCE_REPLY])
+        return self._stream_llm(self._evidence_prompt(evidence_list), use_cache)
     
-    def comment_on_evidence(self, item_name: str, description: str) -> str:
-        prompt = f"""{self.system_prompt}
+    def _comment_prompt(self, item_name: str, description: str) -> str:
+        return f"""{self.system_prompt}
 Yeni Kanıt: {item_name} ({description})
 Buna kısa, gizemli bir tepki ver.
 Cevap:"""
-        return self._invoke_llm(prompt)
+
+    def comment_on_evidence(self, item_name: str, description: str, use_cache: bool = True) -> str:
+        return self._invoke_llm(self._comment_prompt(item_name, description), use_cache)
+
+    def stream_comment_on_evidence(self, item_name: str, description: str,
+                                    use_cache: bool = True) -> Iterator[str]:
+        return self._stream_llm(self._comment_prompt(item_name, description), use_cache)
     
     def _get_graph_context(self, query: str) -> str:
-        if not db or not db.is_active: return ""
+        if not self.db or not self.db.is_active: return ""
         context = []
         try:
             query_lower = query.lower()
             if any(x in query_lower for x in ['kim', 'kişi', 'şüpheli']):
-                q = "MATCH (p:Person) RETURN p.name, p.role, p.trait LIMIT 5"
-                res = db.graph.query(q)
-                if res.result_set:
-                    for r in res.result_set: context.append(f"{r[0]} ({r[1]}) - {r[2]}")
+                with telemetry.span("graph.list_people") as span:
+                    people = self.db.list_people(5)
+                    span["result_items"] = len(people)
+                for p in people:
+                    context.append(f"{p['name']} ({p['role']}) - {p['trait']}")
             
             if any(x in query_lower for x in ['nerede', 'mekan', 'yer']):
-                q = "MATCH (l:Location) RETURN l.name LIMIT 5"
-                res = db.graph.query(q)
-                if res.result_set:
-                    context.append("Mekanlar: " + ", ".join([r[0] for r in res.result_set]))
+                with telemetry.span("graph.list_locations") as span:
+                    locations = self.db.list_locations(5)
+                    span["result_items"] = len(locations)
+                if locations:
+                    context.append("Mekanlar: " + ", ".join(locations))
         except: pass
         return "\n".join(context)
 
-    def _invoke_llm(self, prompt: str) -> str:
+    @staticmethod
+    def _clean_reply(response: str) -> str:
+        """Baştaki/sondaki boşlukları ve tırnakları temizler."""
+        return response.strip().strip('"').strip("'")
+
+    @staticmethod
+    def _is_english_reply(clean: str) -> bool:
+        """LLM İngilizce cevap vermeye kalkarsa True döner."""
+        return any(marker in clean for marker in ENGLISH_MARKERS)
+
+    def _cache_key(self, prompt: str) -> str:
+        return LLMResponseCache.make_key(self.model_name, self.llm_options, prompt)
+
+    def _invoke_llm(self, prompt: str, use_cache: bool = True) -> str:
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            with telemetry.span("llm.cache_lookup") as span:
+                cached = self.cache.get(self._cache_key(prompt))
+                span["result_items"] = int(cached is not None)
+            if cached is not None:
+                return cached
         try:
-            response = self.llm.invoke(prompt)
+            with telemetry.span("llm.invoke", model=self.model_name) as span:
+                # invoke() yerine generate(): token sayıları generation_info içinde gelir
+                generation = self.llm.generate([prompt]).generations[0][0]
+                info = generation.generation_info or {}
+                span["prompt_tokens"] = info.get("prompt_eval_count")
+                span["completion_tokens"] = info.get("eval_count")
+                # Önbellekten gelen ön ek prefill'e dahil edilmez; düşük değer = ön ek yeniden kullanıldı
+                if info.get("prompt_eval_duration") is not None:
+                    span["prefill_ms"] = round(info["prompt_eval_duration"] / 1e6, 3)
+            response = generation.text
             # İngilizce kaçamakları temizlemeye çalış
-            clean = response.strip().strip('"').strip("'")
-            if "Here is" in clean or "Sure" in clean: # LLM İngilizce cevap vermeye kalkarsa
-                 return "Kafam biraz karıştı dedektif, lütfen sorunuzu Türkçe tekrarlayın."
+            clean = self._clean_reply(response)
+            if self._is_english_reply(clean):
+                 return CONFUSED_REPLY
+            if use_cache:
+                self.cache.put(self._cache_key(prompt), clean)
             return clean
         except Exception as e:
-            return "Şu an düşüncelerimi toparlayamıyorum."
\ No newline at end of file
+            return ERROR_REPLY
+
+    def _timed_stream(self, prompt: str, started: float, trace: dict) -> Iterator[str]:
+        """LLM akışını sarar; ilk token süresini ve parça sayısını trace'e yazar."""
+        for chunk in self.llm.stream(prompt):
+            if trace["ttft_ms"] is None:
+                trace["ttft_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            trace["completion_tokens"] += 1
+            yield chunk
+
+    def _stream_llm(self, prompt: str, use_cache: bool = True) -> Generator[str, None, str]:
+        """
+        _invoke_llm'in akış (streaming) versiyonu: parçaları geldikçe verir.
+
+        İngilizce filtresi akışa da uygulanır. İlk STREAM_PREFIX_WINDOW karakter
+        gelene kadar hiçbir şey gösterilmez (İngilizce girişler genelde burada
+        yakalanır ve yerine uyarı cevabı verilir). Sonrasında her zaman bir
+        işaretçi boyu kadar kuyruk geride tutulur; işaretçi yine de görünürse
+        akış orada kesilir ve gösterilen kısmın ardından "... " ile uyarı
+        cevabı verilir; ilk parçadan sonra gelen hatalar da aynı şekilde hata
+        cevabıyla bildirilir. Her iki durum da telemetride hata olarak
+        kaydedilir. Sondaki tırnak/boşluklar kuyrukta kalıp _clean_reply ile
+        aynı şekilde temizlenir. Önbellekteki cevaplar tek parça olarak
+        verilir; yalnızca tamamlanan temiz cevaplar önbelleğe yazılır.
+        Üreteç bittiğinde tam cevabı (ya da yerine verilen uyarı cevabını) döndürür.
+        """
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            with telemetry.span("llm.cache_lookup") as span:
+                cached = self.cache.get(self._cache_key(prompt))
+                span["result_items"] = int(cached is not None)
+            if cached is not None:
+                yield cached
+                return cached
+
+        holdback = max(len(marker) for marker in ENGLISH_MARKERS) - 1
+        text = ""
+        emitted = 0
+        # Akış süresi tüketiciye yayıldığı için span elle kaydedilir; her parça ~1 token
+        started = time.perf_counter()
+        trace = {"model": self.model_name, "completion_tokens": 0, "ttft_ms": None}
+        error = None
+        try:
+            for chunk in self._timed_stream(prompt, started, trace):
+                text += chunk
+                clean = text.lstrip().lstrip('"').lstrip("'")
+                if self._is_english_reply(clean):
+                    break
+                if not emitted and len(clean) < STREAM_PREFIX_WINDOW:
+                    continue
+                safe_end = min(len(clean) - holdback, len(clean.rstrip(" \t\r\n\"'")))
+                if safe_end > emitted:
+                    yield clean[emitted:safe_end]
+                    emitted = safe_end
+        except GeneratorExit:
+            # Tüketici akışı yarıda bıraktı
+            telemetry.record("llm.stream", time.perf_counter() - started, None, trace)
+            raise
+        except Exception as e:
+            error = type(e).__name__
+        clean = self._clean_reply(text)
+        if error is None and self._is_english_reply(clean):
+            error = "EnglishReply"
+        telemetry.record("llm.stream", time.perf_counter() - started, error, trace)
+
+        if error is not None:
+            # Gösterilen kısım geri alınamaz; kesildiğini belli edip _invoke_llm'deki uyarı cevabını ver
+            replacement = CONFUSED_REPLY if error == "EnglishReply" else ERROR_REPLY
+            yield (STREAM_CUT_MARK + replacement) if emitted else replacement
+            return replacement
+        if use_cache:
+            self.cache.put(self._cache_key(prompt), clean)
+        if len(clean) > emitted:
+            yield clean[emitted:]
+        return clean
@@ -0,0 +1,144 @@
+"""
+ONNX Embedding Backend
+Runs the sentence-transformers models through onnxruntime with int8 weights
+instead of a PyTorch forward pass, for faster CPU query encoding and a much
+smaller resident model.
+
+On first use the model is exported to ONNX (optimum) and dynamically quantised
+to int8 (onnxruntime.quantization); both files are kept under ONNX_MODEL_DIR.
+Pooling, normalisation and max sequence length are read from the model's
+sentence-transformers config, so vectors stay in the same space as the
+PyTorch model that built the Chroma collections.
+
+Optional dependencies: onnxruntime, optimum[exporters], transformers.
+Select it with SHERLOCK_EMBEDDING_BACKEND=onnx (see resources.py).
+"""
+import json
+import os
+import shutil
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+ONNX_MODEL_DIR = os.getenv("SHERLOCK_ONNX_DIR", "./onnx_models")
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+
+
+def _model_dir(model_name: str, model_dir: str = ONNX_MODEL_DIR) -> str:
+    return os.path.join(model_dir, model_name.replace("/", "__"))
+
+
+def export_model(model_name: str, model_dir: str = ONNX_MODEL_DIR, quantize: bool = True) -> str:
+    """
+    Exports (once) the model to ONNX, quantises it to int8 and returns the path
+    of the file to load. Both steps write to a temporary path first, so an
+    interrupted export is redone on the next start instead of loading a
+    half-written model.
+    """
+    target = _model_dir(model_name, model_dir)
+    fp32_path = os.path.join(target, FP32_FILE)
+    int8_path = os.path.join(target, INT8_FILE)
+
+    if not os.path.exists(fp32_path):
+        from optimum.exporters.onnx import main_export
+        print(f" ONNX dışa aktarımı: {model_name} (ilk kullanım, bir kez yapılır)...")
+        tmp_dir = target + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        main_export(model_name, output=tmp_dir, task="feature-extraction")
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+
+    if quantize and not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f" int8 nicemleme: {model_name}...")
+        tmp_path = int8_path + ".tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+
+    return int8_path if quantize else fp32_path
+
+
+def model_file_sizes(model_name: str, model_dir: str = ONNX_MODEL_DIR) -> Dict[str, float]:
+    """On-disk size in MB of the exported fp32 and int8 files (missing files are skipped)."""
+    target = _model_dir(model_name, model_dir)
+    sizes = {}
+    for label, filename in (("fp32", FP32_FILE), ("int8", INT8_FILE)):
+        path = os.path.join(target, filename)
+        if os.path.exists(path):
+            sizes[label] = round(os.path.getsize(path) / (1024 * 1024), 1)
+    return sizes
+
+
+def _sentence_config(model_name: str) -> Tuple[str, bool, int]:
+    """(pooling mode, normalize, max_seq_length) from the sentence-transformers repo files."""
+    from huggingface_hub import hf_hub_download
+
+    def load(filename):
+        try:
+            with open(hf_hub_download(model_name, filename), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    modules = load("modules.json") or []
+    normalize = any(module.get("type", "").endswith("Normalize") for module in modules)
+    pooling = load("1_Pooling/config.json") or {}
+    mode = "cls" if pooling.get("pooling_mode_cls_token") else "mean"
+    max_length = (load("sentence_bert_config.json") or {}).get("max_seq_length", 256)
+    return mode, normalize, max_length
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Drop-in replacement for HuggingFaceEmbeddings backed by onnxruntime.
+    `quantize=False` runs the fp32 export (useful as a reference).
+    """
+
+    def __init__(self, model_name: str, model_dir: str = ONNX_MODEL_DIR, quantize: bool = True,
+                 batch_size: int = 32, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.backend = "onnx-int8" if quantize else "onnx-fp32"  # Sorgu önbelleği anahtarında kullanılır
+        self.batch_size = batch_size
+        self.path = export_model(model_name, model_dir, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(self.path))
+        self.pooling, self.normalize, self.max_length = _sentence_config(model_name)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self._inputs = [item.name for item in self.session.get_inputs()]
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+        feeds = {}
+        for name in self._inputs:
+            if name in encoded:
+                feeds[name] = encoded[name].astype(np.int64)
+            elif name == "token_type_ids":
+                feeds[name] = np.zeros_like(encoded["input_ids"], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]  # last_hidden_state: (batch, seq, dim)
+
+        if self.pooling == "cls":
+            vectors = hidden[:, 0]
+        else:
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(list(texts[start:start + self.batch_size])).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
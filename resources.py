@@ -0,0 +1,176 @@
+"""
+Shared Resource Registry
+Process-wide, lazily initialised embedding models, Chroma vector stores and
+the hybrid (BM25 + vector) retrievers on top of them.
+
+DetectiveGame, DetectiveAgent and MysteryGenerator all pull from this registry
+so each sentence-transformers model and each persisted collection is loaded
+exactly once per process, no matter how many game objects are created. Each
+model reads its own collection (see vector_collections.py).
+"""
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+from langchain_chroma import Chroma
+from langchain_huggingface import HuggingFaceEmbeddings
+
+try:
+    import psutil
+except ImportError:  # Optional: only used for load-time memory reporting
+    psutil = None
+
+from embedding_cache import CachedQueryEmbeddings
+from keyword_index import HybridRetriever, open_keyword_index
+from telemetry import telemetry
+from vector_collections import open_collection
+
+# Varsayılan yollar / modeller
+DEFAULT_PERSIST_DIRECTORY = "./chroma_db"
+BOOK_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DIALOGUE_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# Sorgu vektörü önbelleği: boyut ve (isteğe bağlı) kalıcı dosya
+QUERY_CACHE_SIZE = int(os.getenv("SHERLOCK_QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_PATH = os.getenv("SHERLOCK_QUERY_CACHE_PATH")
+# "torch" (sentence-transformers) veya "onnx" (int8 onnxruntime, bkz. onnx_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("SHERLOCK_EMBEDDING_BACKEND", "torch").lower()
+
+
+def _rss_kb() -> int:
+    """
+    Current resident set size of this process in kilobytes, via psutil if it
+    is installed, else /proc on Linux; 0 where neither is available.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss // 1024
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _load_embedding_model(model_name: str):
+    """Base embedding model for the configured backend; falls back to PyTorch if ONNX is unavailable."""
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            from onnx_embeddings import OnnxEmbeddings
+            return OnnxEmbeddings(model_name)
+        except Exception as e:
+            print(f"  ONNX embedding backend unavailable for {model_name} ({e}); using PyTorch.")
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+class ResourceRegistry:
+    """
+    Lazily creates and caches heavy, shareable resources.
+    Every resource is created on first use and reused afterwards. Loads run
+    outside the registry lock, under a lock of their own per resource, so
+    different models and collections warm up in parallel while concurrent
+    first uses of the same one still load it only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Guards the dicts below, never held during a load
+        self._load_locks: Dict[tuple, threading.Lock] = {}
+        self._embeddings: Dict[str, CachedQueryEmbeddings] = {}
+        self._vector_stores: Dict[Tuple[str, str], Chroma] = {}
+        self._retrievers: Dict[Tuple[str, str], HybridRetriever] = {}
+        self.load_stats: Dict[str, Dict] = {}
+
+    def _load_once(self, cache: Dict, key, create: Callable[[], object]):
+        """Returns cache[key], calling create() under the per-key lock if it is missing."""
+        with self._lock:
+            if key in cache:
+                return cache[key]
+            load_lock = self._load_locks.setdefault((id(cache), key), threading.Lock())
+        with load_lock:
+            with self._lock:
+                if key in cache:
+                    return cache[key]
+            value = create()
+            with self._lock:
+                cache[key] = value
+            return value
+
+    def _record(self, key: str, started: float, rss_before: int):
+        """Store load time and memory growth for a freshly created resource."""
+        stats = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "rss_growth_kb": max(0, _rss_kb() - rss_before),
+        }
+        with self._lock:
+            self.load_stats[key] = stats
+        print(f" Kaynak yüklendi: {key} ({stats['seconds']}s, +{stats['rss_growth_kb'] // 1024} MB)")
+
+    def get_embeddings(self, model_name: str = BOOK_EMBEDDING_MODEL) -> CachedQueryEmbeddings:
+        """
+        Return the shared embedding model, loading it on first use.
+        The model is wrapped with a query-vector cache so repeated searches
+        skip the forward pass.
+        """
+        def create():
+            started, rss_before = time.perf_counter(), _rss_kb()
+            base = _load_embedding_model(model_name)
+            self._record(f"embeddings:{model_name}", started, rss_before)
+            cached = CachedQueryEmbeddings(base, model_name, QUERY_CACHE_SIZE, QUERY_CACHE_PATH,
+                                           backend=getattr(base, "backend", "torch"))
+            telemetry.add_collector("query_cache_" + re.sub(r"\W", "_", model_name.split("/")[-1]), cached.stats)
+            return cached
+
+        return self._load_once(self._embeddings, model_name, create)
+
+    def get_vector_store(self, model_name: str = BOOK_EMBEDDING_MODEL,
+                         persist_directory: str = DEFAULT_PERSIST_DIRECTORY) -> Chroma:
+        """
+        Return the shared Chroma collection built for the given embedding model.
+        Raises CollectionMismatch if ingest has not built it, or built it with a
+        different model, vector dimension or ingest version.
+        """
+        def create():
+            embeddings = self.get_embeddings(model_name)
+            started, rss_before = time.perf_counter(), _rss_kb()
+            store = open_collection(model_name, embeddings, persist_directory)
+            self._record(f"chroma:{persist_directory}:{model_name}", started, rss_before)
+            return store
+
+        return self._load_once(self._vector_stores, (model_name, persist_directory), create)
+
+    def get_retriever(self, model_name: str = BOOK_EMBEDDING_MODEL,
+                      persist_directory: str = DEFAULT_PERSIST_DIRECTORY) -> HybridRetriever:
+        """
+        Shared hybrid (BM25 + vector) retriever over the store. Falls back to
+        plain vector search if ingest has not built a keyword index yet.
+        """
+        def create():
+            keyword_index = None
+            try:
+                keyword_index = open_keyword_index(persist_directory)
+            except Exception as e:
+                print(f" Anahtar kelime dizini açılamadı: {e}")
+            if keyword_index is None:
+                print(" Anahtar kelime dizini yok (ingest.py ile oluşturun); yalnızca vektör araması.")
+            retriever = HybridRetriever(self.get_vector_store(model_name, persist_directory), keyword_index)
+            telemetry.add_collector("retrieval_" + re.sub(r"\W", "_", model_name.split("/")[-1]), retriever.stats)
+            return retriever
+
+        return self._load_once(self._retrievers, (model_name, persist_directory), create)
+
+    def warm_up(self, model_name: str = BOOK_EMBEDDING_MODEL,
+                persist_directory: str = DEFAULT_PERSIST_DIRECTORY):
+        """
+        Loads the model and store and runs one throwaway search, so the first
+        forward pass and the on-disk index load happen before a real query.
+        """
+        self.get_vector_store(model_name, persist_directory).similarity_search("warm-up", k=1)
+
+    def report(self) -> Dict[str, Dict]:
+        """Load time (seconds) and RSS growth (KB) per loaded resource."""
+        with self._lock:
+            return dict(self.load_stats)
+
+
+# Create a global instance
+registry = ResourceRegistry()
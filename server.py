@@ -0,0 +1,534 @@
+"""
+SherlockAI Game Server
+Hosts many concurrent DetectiveGame sessions over an asyncio HTTP/WebSocket API.
+
+Each session gets its own graph key ("SherlockCase:<session id>") so players
+never touch each other's cases, while embedding models, vector stores, the
+LLM response cache, the FalkorDB connection pool and the mystery pool are
+shared by every session in the process.
+
+HTTP:
+    POST   /sessions                      -> new game (case file + session id)
+    GET    /sessions/{id}                 -> game summary
+    POST   /sessions/{id}/search          {"location": "..."}
+    POST   /sessions/{id}/talk            {"person": "...", "question": "..."?}
+    POST   /sessions/{id}/ask             {"question": "..."}
+    GET    /sessions/{id}/evidence
+    GET    /sessions/{id}/suspects
+    GET    /sessions/{id}/locations
+    POST   /sessions/{id}/hint
+    POST   /sessions/{id}/accuse          {"suspect": "..."}
+    DELETE /sessions/{id}
+WebSocket:
+    GET    /sessions/{id}/ws              send {"action": "talk"|"ask"|"search"|"evidence", ...}
+                                          receive {"type": "token"} chunks, then {"type": "done"}
+
+Sessions idle for longer than --idle-timeout are snapshotted to --snapshot-dir
+and dropped from memory (graph included); the next request for that id
+rehydrates them transparently. Shutdown snapshots every open session too.
+"""
+import argparse
+import asyncio
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional
+
+from aiohttp import web, WSMsgType
+
+from falkor import create_database, get_connection_manager
+from game_engine import DetectiveGame
+from llm_cache import LLMResponseCache
+from mystery_pool import MysteryPool
+from ollama import DetectiveAgent
+from session_state import SnapshotError
+from story_generator import MysteryGenerator
+from telemetry import telemetry
+
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class SessionError(Exception):
+    """Client-facing error (unknown person, missing argument, ...)."""
+
+
+class GameSession:
+    """One player's game: private graph, game state and agent."""
+
+    def __init__(self, session_id: str, mystery: Optional[Dict], cache: LLMResponseCache,
+                 model_name: str, time_limit_minutes: int, snapshot: Optional[bytes] = None):
+        self.session_id = session_id
+        self.database = create_database(graph_name=f"SherlockCase:{session_id}")
+        self.game = DetectiveGame(time_limit_minutes=time_limit_minutes, database=self.database)
+        self.agent = DetectiveAgent(model_name=model_name, database=self.database, cache=cache)
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.sockets = 0  # Open WebSocket connections; such sessions are never reaped
+
+        if snapshot is not None:
+            # Rehydrate an evicted session: state, timer and case graph come from the snapshot
+            self.mystery = self.game.restore(snapshot)
+        else:
+            self.mystery = mystery
+            if not self.database.load_case(mystery):
+                # Graf olmadan aramalar ve sorgular boş döner; oturumu hiç açmamak daha iyi
+                raise ConnectionError("Vaka graf veritabanına yüklenemedi.")
+            self.game.initialize_mystery(use_ai_generator=True, mystery_data=mystery)
+            self.game.start_game()
+
+    @property
+    def finished(self) -> bool:
+        return not self.game.game_active
+
+    def case_file(self) -> Dict:
+        """Public view of the case (no killer flags)."""
+        case = self.mystery['case']
+        return {
+            "session_id": self.session_id,
+            "title": case['title'],
+            "victim": case['victim'],
+            "locations": case['locations'],
+            "suspects": [{k: s[k] for k in ('name', 'role', 'trait', 'motive') if k in s}
+                         for s in case['suspects']],
+            "time_limit": self.game.time_limit,
+        }
+
+    def _find_location(self, term: str) -> str:
+        term_lower = term.lower().strip()
+        for loc in self.mystery['case']['locations']:
+            if term_lower in loc.lower():
+                return loc
+        return term
+
+    def _find_suspect(self, term: str) -> Dict:
+        term_lower = term.lower().strip()
+        for suspect in self.mystery['case']['suspects']:
+            if term_lower and term_lower in suspect['name'].lower():
+                return suspect
+        raise SessionError(f"'{term}' isimli biri bulunamadı.")
+
+    def search(self, location: str, stream: bool = False):
+        """Search a location; the assistant comments on the last item found."""
+        target = self._find_location(location)
+        items = self.game.search_location(target)
+        comment = None
+        if items:
+            last = items[-1]
+            comment = (self.agent.stream_comment_on_evidence(last['name'], last['description']) if stream
+                       else self.agent.comment_on_evidence(last['name'], last['description']))
+        return {"location": target, "items": items}, comment
+
+    def talk(self, person: str, question: Optional[str] = None, stream: bool = False):
+        """Introduction when no question is given, otherwise an in-character answer."""
+        character = self._find_suspect(person)
+        self.game.mark_as_interviewed(character['name'])
+        meta = {"person": character['name']}
+        victim = self.mystery['case']['victim']['name']
+        relationships = self.game.get_relationships(character['name'])
+        is_killer = character.get('is_killer', False)
+        if not question:
+            args = (character['name'], character['trait'], character['role'], victim)
+            kwargs = dict(relationships=relationships, is_killer=is_killer)
+            reply = (self.agent.stream_character_introduction(*args, **kwargs) if stream
+                     else self.agent.character_introduction(*args, **kwargs))
+            return meta, reply
+
+        kwargs = dict(character_name=character['name'], character_trait=character['trait'],
+                      question=question, relationships=relationships, is_killer=is_killer,
+                      role=character['role'], victim_name=victim)
+        reply = (self.agent.stream_character_response(**kwargs) if stream
+                 else self.agent.character_response(**kwargs))
+        return meta, reply
+
+    def ask(self, question: str, stream: bool = False):
+        state = self.game.get_game_summary()
+        reply = (self.agent.stream_answer_question(question, state) if stream
+                 else self.agent.answer_question(question, state))
+        return {"question": question}, reply
+
+    def evidence(self, stream: bool = False):
+        evidence = list(self.game.discovered_evidence)
+        analysis = (self.agent.stream_analyze_evidence(evidence) if stream
+                    else self.agent.analyze_evidence(evidence))
+        return {"evidence": evidence}, analysis
+
+    def hint(self) -> Dict:
+        return {"hint": self.agent.suggest_next_action(self.game.get_game_summary())}
+
+    def accuse(self, suspect: str) -> Dict:
+        return self.game.make_accusation(suspect)
+
+    def summary(self) -> Dict:
+        summary = self.game.get_game_summary()
+        summary["time_up"] = self.game.is_time_up()
+        summary["finished"] = self.finished
+        return summary
+
+    def snapshot(self) -> bytes:
+        return self.game.snapshot(self.mystery)
+
+    def close(self):
+        """Drop the session's private graph."""
+        self.database.drop_graph()
+
+
+class GameServer:
+    """Session registry plus the aiohttp application."""
+
+    def __init__(self, model_name: str = "gemma2", pool_depth: int = 5, max_sessions: int = 500,
+                 idle_timeout: float = 1800.0, workers: int = 32, time_limit_minutes: int = 30,
+                 snapshot_dir: str = "./sessions"):
+        self.model_name = model_name
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.time_limit_minutes = time_limit_minutes
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.sessions: Dict[str, GameSession] = {}
+        self._rehydrating: Dict[str, asyncio.Future] = {}
+        # Sessions being evicted or deleted; their id is not rehydrated until the graph is dropped
+        self._closing: Dict[str, asyncio.Future] = {}
+        self.evicted = 0
+        self.rehydrated = 0
+        # Blocking work (LLM, graph, embeddings) runs here, off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session")
+        # Her işçi aynı anda bir sorgu çalıştırabilir; havuz daha küçükse yük altında bağlantı beklenir
+        get_connection_manager(max_connections=workers)
+        self.cache = LLMResponseCache()
+        self.generator = MysteryGenerator(model_name=model_name)
+        self.pool = MysteryPool(self.generator, depth=pool_depth)
+        telemetry.add_collector("mystery_pool", self.pool.stats)
+        telemetry.add_collector("llm_cache", self.cache.stats)
+        telemetry.add_collector("server", lambda: {"sessions": len(self.sessions), "evicted": self.evicted,
+                                                   "rehydrated": self.rehydrated})
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    def _new_mystery(self) -> Dict:
+        mystery = self.pool.pop()
+        if mystery is None:
+            mystery = self.generator.create_full_mystery(verbose=False, concept_candidates=3)
+        return mystery
+
+    def _create_session(self) -> GameSession:
+        session_id = uuid.uuid4().hex
+        return GameSession(session_id, self._new_mystery(), self.cache,
+                           self.model_name, self.time_limit_minutes)
+
+    def _snapshot_path(self, session_id: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{session_id}.snap")
+
+    def _evict(self, session: GameSession):
+        """Writes an unfinished session to disk and releases its graph (blocking)."""
+        path = self._snapshot_path(session.session_id)
+        try:
+            if session.finished:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                with open(path + ".tmp", "wb") as f:
+                    f.write(session.snapshot())
+                os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Oturum kaydedilemedi ({session.session_id}): {e}")
+        session.close()
+
+    def _delete(self, session: GameSession):
+        """Forgets a session for good: snapshot first, so it cannot be rehydrated, then the graph (blocking)."""
+        try:
+            os.remove(self._snapshot_path(session.session_id))
+        except FileNotFoundError:
+            pass
+        session.close()
+
+    async def _retire(self, session: GameSession, fn):
+        """
+        Removes a session from the registry and runs `fn` (_evict or _delete)
+        on it. Until `fn` returns, requests for the same id wait instead of
+        rehydrating into the SherlockCase graph that is about to be dropped.
+        """
+        session_id = session.session_id
+        closing = asyncio.ensure_future(self._run(fn, session))
+        self._closing[session_id] = closing
+        self.sessions.pop(session_id, None)
+        try:
+            await closing
+        finally:
+            if self._closing.get(session_id) is closing:
+                del self._closing[session_id]
+
+    def _rehydrate(self, session_id: str) -> Optional[GameSession]:
+        """Rebuilds an evicted session from its snapshot, or None if there is none (blocking)."""
+        try:
+            with open(self._snapshot_path(session_id), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with telemetry.span("server.rehydrate"):
+            try:
+                return GameSession(session_id, None, self.cache, self.model_name,
+                                   self.time_limit_minutes, snapshot=data)
+            except (SnapshotError, ConnectionError) as e:
+                print(f"Oturum geri yüklenemedi ({session_id}): {e}")
+                return None
+
+    async def _session(self, request: web.Request) -> GameSession:
+        session_id = request.match_info['session_id']
+        closing = self._closing.get(session_id)
+        if closing is not None:
+            await asyncio.wait({closing})
+        session = self.sessions.get(session_id)
+        if session is None and SESSION_ID_PATTERN.fullmatch(session_id):
+            # Concurrent requests for the same evicted session share one rehydration
+            pending = self._rehydrating.get(session_id)
+            if pending is None:
+                pending = asyncio.ensure_future(self._run(self._rehydrate, session_id))
+                self._rehydrating[session_id] = pending
+            try:
+                restored = await pending
+            finally:
+                self._rehydrating.pop(session_id, None)
+            if restored is not None:
+                if session_id not in self.sessions:
+                    self.rehydrated += 1
+                session = self.sessions.setdefault(session_id, restored)
+        if session is None:
+            raise web.HTTPNotFound(text="Oturum bulunamadı.")
+        session.last_active = time.monotonic()
+        return session
+
+    @staticmethod
+    async def _json_body(request: web.Request) -> Dict:
+        if not request.can_read_body:
+            return {}
+        try:
+            return await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Geçersiz JSON.")
+
+    @staticmethod
+    def _require(body: Dict, key: str) -> str:
+        value = (body.get(key) or "").strip()
+        if not value:
+            raise web.HTTPBadRequest(text=f"'{key}' alanı gerekli.")
+        return value
+
+    async def _call(self, session: GameSession, fn, *args) -> web.Response:
+        """Runs a session method in the executor, one command at a time per session."""
+        async with session.lock:
+            try:
+                result = await self._run(fn, *args)
+            except SessionError as e:
+                raise web.HTTPBadRequest(text=str(e))
+        if isinstance(result, tuple):
+            data, reply = result
+            result = {**data, "reply": reply}
+        return web.json_response(result)
+
+    # ---- HTTP handlers ----
+
+    async def create_session(self, request: web.Request) -> web.Response:
+        if len(self.sessions) >= self.max_sessions:
+            raise web.HTTPServiceUnavailable(text="Sunucu dolu, lütfen daha sonra deneyin.")
+        with telemetry.span("server.create_session"):
+            try:
+                session = await self._run(self._create_session)
+            except ConnectionError as e:
+                raise web.HTTPServiceUnavailable(text=str(e))
+        self.sessions[session.session_id] = session
+        return web.json_response(session.case_file(), status=201)
+
+    async def get_session(self, request: web.Request) -> web.Response:
+        return web.json_response((await self._session(request)).summary())
+
+    async def search(self, request: web.Request) -> web.Response:
+        body = await self._json_body(request)
+        session = await self._session(request)
+        return await self._call(session, session.search, self._require(body, "location"))
+
+    async def talk(self, request: web.Request) -> web.Response:
+        body = await self._json_body(request)
+        session = await self._session(request)
+        return await self._call(session, session.talk, self._require(body, "person"), body.get("question"))
+
+    async def ask(self, request: web.Request) -> web.Response:
+        body = await self._json_body(request)
+        session = await self._session(request)
+        return await self._call(session, session.ask, self._require(body, "question"))
+
+    async def evidence(self, request: web.Request) -> web.Response:
+        session = await self._session(request)
+        return await self._call(session, session.evidence)
+
+    async def suspects(self, request: web.Request) -> web.Response:
+        session = await self._session(request)
+        interviewed = set(session.game.interviewed_people)
+        return web.json_response([{**s, "interviewed": s['name'] in interviewed}
+                                  for s in session.case_file()["suspects"]])
+
+    async def locations(self, request: web.Request) -> web.Response:
+        session = await self._session(request)
+        visited = set(session.game.visited_locations)
+        return web.json_response([{"name": loc, "searched": loc in visited}
+                                  for loc in session.mystery['case']['locations']])
+
+    async def hint(self, request: web.Request) -> web.Response:
+        session = await self._session(request)
+        return await self._call(session, session.hint)
+
+    async def accuse(self, request: web.Request) -> web.Response:
+        body = await self._json_body(request)
+        session = await self._session(request)
+        return await self._call(session, session.accuse, self._require(body, "suspect"))
+
+    async def delete_session(self, request: web.Request) -> web.Response:
+        session = await self._session(request)
+        await self._retire(session, self._delete)
+        return web.json_response({"closed": session.session_id})
+
+    # ---- WebSocket streaming ----
+
+    async def _pump(self, ws: web.WebSocketResponse, stream: Iterator[str]):
+        """Forwards a blocking token iterator to the socket as chunks arrive."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in stream:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        parts = []
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            parts.append(chunk)
+            await ws.send_json({"type": "token", "text": chunk})
+        await producer
+        return "".join(parts)
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        session = await self._session(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+
+        actions = {
+            "talk": lambda m: session.talk(m.get("person", ""), m.get("question"), stream=True),
+            "ask": lambda m: session.ask(m.get("question", ""), stream=True),
+            "search": lambda m: session.search(m.get("location", ""), stream=True),
+            "evidence": lambda m: session.evidence(stream=True),
+        }
+
+        # Açık bir bağlantının oturumu sessiz kalsa da diske atılmaz
+        session.sockets += 1
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    message = msg.json()
+                except ValueError:
+                    await ws.send_json({"type": "error", "message": "Geçersiz JSON."})
+                    continue
+                try:
+                    action = actions.get(message.get("action"))
+                    if action is None:
+                        await ws.send_json({"type": "error", "message": "Bilinmeyen işlem."})
+                        continue
+                    session.last_active = time.monotonic()
+                    async with session.lock:
+                        data, reply = await self._run(action, message)
+                        await ws.send_json({"type": "meta", **data})
+                        text = await self._pump(ws, reply) if reply is not None else ""
+                    await ws.send_json({"type": "done", "text": text})
+                except SessionError as e:
+                    await ws.send_json({"type": "error", "message": str(e)})
+                except Exception as e:
+                    # Tek bir bozuk işlem bağlantıyı koparmasın; oyuncu yeni komut gönderebilir
+                    print(f"WebSocket işlemi başarısız ({session.session_id}): {e}")
+                    await ws.send_json({"type": "error", "message": "İşlem tamamlanamadı, lütfen tekrar deneyin."})
+        finally:
+            session.sockets -= 1
+            session.last_active = time.monotonic()
+        return ws
+
+    # ---- Housekeeping ----
+
+    async def _evict_idle_sessions(self):
+        """
+        Evicts sessions that have been idle longer than idle_timeout to disk.
+        Sessions that are busy or have a WebSocket attached are kept.
+        """
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if self.sessions.get(session_id) is not session:
+                continue  # Deleted while an earlier session was being written out
+            if now - session.last_active <= self.idle_timeout or session.lock.locked() or session.sockets:
+                continue
+            await self._retire(session, self._evict)
+            self.evicted += 1
+
+    async def _reap_idle_sessions(self):
+        while True:
+            await asyncio.sleep(60)
+            await self._evict_idle_sessions()
+
+    async def _on_startup(self, app: web.Application):
+        self.pool.start()
+        app['reaper'] = asyncio.create_task(self._reap_idle_sessions())
+
+    async def _on_cleanup(self, app: web.Application):
+        app['reaper'].cancel()
+        self.pool.stop(timeout=1)
+        # Open games survive a restart: they are rehydrated on their next request
+        for session in list(self.sessions.values()):
+            await self._retire(session, self._evict)
+        self.executor.shutdown(wait=False)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=telemetry.render_prometheus(), content_type="text/plain")
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/sessions", self.create_session)
+        app.router.add_get("/sessions/{session_id}", self.get_session)
+        app.router.add_delete("/sessions/{session_id}", self.delete_session)
+        app.router.add_post("/sessions/{session_id}/search", self.search)
+        app.router.add_post("/sessions/{session_id}/talk", self.talk)
+        app.router.add_post("/sessions/{session_id}/ask", self.ask)
+        app.router.add_get("/sessions/{session_id}/evidence", self.evidence)
+        app.router.add_get("/sessions/{session_id}/suspects", self.suspects)
+        app.router.add_get("/sessions/{session_id}/locations", self.locations)
+        app.router.add_post("/sessions/{session_id}/hint", self.hint)
+        app.router.add_post("/sessions/{session_id}/accuse", self.accuse)
+        app.router.add_get("/sessions/{session_id}/ws", self.websocket)
+        app.router.add_get("/metrics", self.metrics)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SherlockAI çok oyunculu oyun sunucusu")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="gemma2")
+    parser.add_argument("--pool-depth", type=int, default=5)
+    parser.add_argument("--max-sessions", type=int, default=500)
+    parser.add_argument("--idle-timeout", type=float, default=1800.0, help="Saniye")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--snapshot-dir", default="./sessions", help="Boştaki oturumların kaydedildiği klasör")
+    args = parser.parse_args()
+
+    server = GameServer(model_name=args.model, pool_depth=args.pool_depth, max_sessions=args.max_sessions,
+                        idle_timeout=args.idle_timeout, workers=args.workers, snapshot_dir=args.snapshot_dir)
+    web.run_app(server.build_app(), host=args.host, port=args.port)
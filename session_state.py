@@ -0,0 +1,165 @@
+"""
+Session State & Snapshots
+Compact, slot-based per-game state and a versioned binary snapshot format
+for saving and resuming an investigation (CLI autosave, server eviction).
+
+Snapshot layout (little endian):
+    magic     4s   b"SHRK"
+    version   B    SNAPSHOT_VERSION
+    flags     B    bit 0: payload is zlib-compressed
+    reserved  H
+    length    I    payload length in bytes
+    crc32     I    CRC-32 of the payload
+    payload        JSON {"state": ..., "mystery": ...}
+"""
+import json
+import struct
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+SNAPSHOT_MAGIC = b"SHRK"
+SNAPSHOT_VERSION = 1
+FLAG_ZLIB = 0x01
+_HEADER = struct.Struct("<4sBBHII")
+
+
+class SnapshotError(ValueError):
+    """The data is not a snapshot this version can read (bad magic, version or checksum)."""
+
+
+class OrderedSet:
+    """
+    Insertion-ordered collection with O(1) membership, backed by a dict.
+    `key` maps items to a hashable identity, so unhashable items (e.g. the
+    evidence dicts) can be stored too.
+    """
+
+    __slots__ = ("_items", "_key")
+
+    def __init__(self, items: Iterable = (), key: Optional[Callable] = None):
+        self._items: Dict = {}
+        self._key = key
+        for item in items:
+            self.add(item)
+
+    def _identity(self, item):
+        return self._key(item) if self._key else item
+
+    def add(self, item) -> bool:
+        """Adds the item; returns True if it was not present yet."""
+        identity = self._identity(item)
+        if identity in self._items:
+            return False
+        self._items[identity] = item
+        return True
+
+    def __contains__(self, item) -> bool:
+        try:
+            return self._identity(item) in self._items
+        except (TypeError, KeyError):
+            return False
+
+    def __iter__(self) -> Iterator:
+        return iter(self._items.values())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return list(self._items.values())[index]
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"OrderedSet({list(self)!r})"
+
+    def to_list(self) -> list:
+        return list(self._items.values())
+
+
+def _evidence_key(item: Dict) -> Tuple:
+    return item["name"], item["description"], item["location"]
+
+
+class SessionState:
+    """Everything that changes while a single investigation is played."""
+
+    __slots__ = ("time_limit", "start_time", "game_active", "current_location", "case_title",
+                 "victim_name", "discovered_evidence", "visited_locations", "interviewed_people")
+
+    def __init__(self, time_limit: int = 30 * 60):
+        self.time_limit = time_limit
+        self.start_time: Optional[float] = None
+        self.game_active = False
+        self.current_location = "Crime Scene"
+        self.case_title = "Unknown Case"
+        self.victim_name = "Unknown Victim"
+        self.discovered_evidence = OrderedSet(key=_evidence_key)
+        self.visited_locations = OrderedSet()
+        self.interviewed_people = OrderedSet()
+
+    def to_dict(self) -> Dict:
+        """
+        Plain representation. The timer is stored as elapsed seconds, so time
+        spent while the game was saved does not count against the player.
+        """
+        return {
+            "time_limit": self.time_limit,
+            "elapsed": None if self.start_time is None else time.time() - self.start_time,
+            "game_active": self.game_active,
+            "current_location": self.current_location,
+            "case_title": self.case_title,
+            "victim_name": self.victim_name,
+            "discovered_evidence": self.discovered_evidence.to_list(),
+            "visited_locations": self.visited_locations.to_list(),
+            "interviewed_people": self.interviewed_people.to_list(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SessionState":
+        state = cls(data["time_limit"])
+        if data.get("elapsed") is not None:
+            state.start_time = time.time() - data["elapsed"]
+        state.game_active = data["game_active"]
+        state.current_location = data["current_location"]
+        state.case_title = data["case_title"]
+        state.victim_name = data["victim_name"]
+        state.discovered_evidence = OrderedSet(data["discovered_evidence"], key=_evidence_key)
+        state.visited_locations = OrderedSet(data["visited_locations"])
+        state.interviewed_people = OrderedSet(data["interviewed_people"])
+        return state
+
+
+def encode_snapshot(state: SessionState, mystery: Optional[Dict] = None, compress: bool = True) -> bytes:
+    """Serializes the state (and the mystery it belongs to) into snapshot bytes."""
+    payload = json.dumps({"state": state.to_dict(), "mystery": mystery},
+                         ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_ZLIB
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, 0, len(payload), zlib.crc32(payload))
+    return header + payload
+
+
+def decode_snapshot(data: bytes) -> Tuple[SessionState, Optional[Dict]]:
+    """Parses snapshot bytes back into (state, mystery). Raises SnapshotError on bad input."""
+    if len(data) < _HEADER.size:
+        raise SnapshotError("snapshot is truncated")
+    magic, version, flags, _, length, crc = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("not a SherlockAI snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    payload = data[_HEADER.size:_HEADER.size + length]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise SnapshotError("snapshot is corrupted")
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    try:
+        body = json.loads(payload.decode("utf-8"))
+        return SessionState.from_dict(body["state"]), body.get("mystery")
+    except (ValueError, KeyError, TypeError) as e:
+        raise SnapshotError(f"invalid snapshot payload: {e}")
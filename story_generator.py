@@ -4,11 +4,91 @@ Ollama kullanarak her seferinde farklı cinayet senaryoları oluşturur
 """
 import json
 import random
-from typing import Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from typing import Dict, List, Optional
 from langchain_community.llms import Ollama
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from falkor import db
+from json_stream import StreamingJSONValidator, SchemaViolation
+from resources import registry, BOOK_EMBEDDING_MODEL
+from telemetry import telemetry
+
+# Genişletilmiş Türkçe Temalar
+CASE_THEMES = [
+    "eski bir konakta cinayet", "akşam yemeğinde zehirlenme", "kilitli oda gizemi",
+    "miras kavgası cinayeti", "şantaj mektupları ve ölüm", "intikam planı",
+    "gece treninde cinayet", "tiyatro kulisinde ölüm", "aşk üçgeni cinayeti",
+    "çalınan mücevher ve cinayet", "ıssız bir adada cinayet", "boğaz vapurunda şüpheli ölüm",
+    "tarihi hamamda cinayet", "kapalıçarşı'da gizemli ölüm"
+]
+
+# Şema ihlalinde erken kesilen üretimler bu kadar tekrar denenir
+JSON_ATTEMPTS = 3
+
+_TEXT = {"type": "string", "minLength": 1}
+
+# Ollama'nın format (yapılandırılmış çıktı) seçeneğine ve akış doğrulayıcısına verilen şemalar
+CASE_SCHEMA = {
+    "type": "object",
+    "required": ["title", "victim", "suspects", "killer", "locations", "crime_summary"],
+    "additionalProperties": False,
+    "properties": {
+        "title": _TEXT,
+        "victim": {
+            "type": "object",
+            "required": ["name", "background", "killed_when", "killed_where"],
+            "additionalProperties": False,
+            "properties": {"name": _TEXT, "background": _TEXT, "killed_when": _TEXT, "killed_where": _TEXT},
+        },
+        "suspects": {
+            "type": "array",
+            "minItems": 3,
+            "maxItems": 6,
+            "items": {
+                "type": "object",
+                "required": ["name", "role", "trait", "motive", "is_killer"],
+                "additionalProperties": False,
+                "properties": {"name": _TEXT, "role": _TEXT, "trait": _TEXT, "motive": _TEXT,
+                               "is_killer": {"type": "boolean"}},
+            },
+        },
+        "killer": {
+            "type": "object",
+            "required": ["name", "true_motive"],
+            "additionalProperties": False,
+            "properties": {"name": _TEXT, "true_motive": _TEXT},
+        },
+        "locations": {"type": "array", "minItems": 3, "maxItems": 6, "items": _TEXT},
+        "crime_summary": _TEXT,
+    },
+}
+
+
+def clues_schema(locations: List[str]) -> Dict:
+    """Kanıt şeması; mekanlar vakadaki mekanlarla sınırlıdır."""
+    return {
+        "type": "object",
+        "required": ["clues"],
+        "additionalProperties": False,
+        "properties": {
+            "clues": {
+                "type": "array",
+                "minItems": 3,
+                "maxItems": 8,
+                "items": {
+                    "type": "object",
+                    "required": ["item_name", "location", "description", "points_to_killer"],
+                    "additionalProperties": False,
+                    "properties": {
+                        "item_name": _TEXT,
+                        "location": {"type": "string", "enum": list(locations)},
+                        "description": _TEXT,
+                        "points_to_killer": {"type": "boolean"},
+                    },
+                },
+            },
+        },
+    }
 
 
 class MysteryGenerator:
@@ -17,16 +97,14 @@ class MysteryGenerator:
     def __init__(self, model_name: str = "llama3.2"):
         """Ollama modelini başlat."""
         # Temperature düşürüldü, repeat_penalty eklendi (Daha tutarlı olması için)
+        self.model_name = model_name
         self.llm = Ollama(model=model_name, temperature=0.3, repeat_penalty=1.1)
         
-        # RAG - Sherlock kitaplarından ilham al
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        self.vector_db = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=self.embeddings
-        )
+        # Konsept üretim sayaçları (yedek hikaye oranını izlemek için).
+        # Havuz iş parçacığı ve ön plan aynı anda güncelleyebilir, bu yüzden kilitli.
+        self._stats_lock = threading.Lock()
+        self.concept_stats = {"requests": 0, "candidates": 0, "valid_candidates": 0, "fallbacks": 0,
+                              "json_attempts": 0, "schema_aborts": 0}
         
         # TÜRKÇE karakter isimleri havuzu
         self.turkish_names = [
@@ -43,32 +121,35 @@ class MysteryGenerator:
             "Mutfak", "Yatak Odası", "Sera", "Kiler", "Salon", "Balkon",
             "Misafir Odası", "Avlu", "Teras", "Koridor"
         ]
+    
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.concept_stats[key] += 1
+
+    def warm_up(self):
+        """Model ağırlıklarını Ollama'ya yükler (tek token üretir); ilk hikaye soğuk başlamaz."""
+        self.llm.invoke("Merhaba", num_predict=1)
+
+    @property
+    def vector_db(self):
+        """RAG - Sherlock kitaplarından ilham al (paylaşılan kayıt defterinden)."""
+        return registry.get_retriever(BOOK_EMBEDDING_MODEL)
         
     def get_inspiration_from_books(self, theme: str) -> str:
         """Sherlock kitaplarından tema ile ilgili pasajlar çek."""
         query = f"mystery investigation {theme} clues suspects"
-        docs = self.vector_db.similarity_search(query, k=2)
+        with telemetry.span("retrieval.similarity_search", source="inspiration", k=2) as span:
+            docs = self.vector_db.similarity_search(query, k=2)
+            span["result_items"] = len(docs)
         
         if docs:
             return docs[0].page_content[:500]
         return ""
     
-    def generate_case_concept(self) -> Dict:
-        """Ana hikaye konseptini üret - TAM TÜRKÇE."""
-        
-        # Genişletilmiş Türkçe Temalar
-        themes = [
-            "eski bir konakta cinayet", "akşam yemeğinde zehirlenme", "kilitli oda gizemi",
-            "miras kavgası cinayeti", "şantaj mektupları ve ölüm", "intikam planı",
-            "gece treninde cinayet", "tiyatro kulisinde ölüm", "aşk üçgeni cinayeti",
-            "çalınan mücevher ve cinayet", "ıssız bir adada cinayet", "boğaz vapurunda şüpheli ölüm",
-            "tarihi hamamda cinayet", "kapalıçarşı'da gizemli ölüm"
-        ]
-        
-        theme = random.choice(themes)
-        
+    def _case_concept_prompt(self, theme: str) -> str:
+        """Verilen tema için hikaye konsepti prompt'unu oluştur."""
         # DÜZELTME: Prompt içindeki özel isim örnekleri kaldırıldı (Soyutlaştırıldı)
-        prompt = f"""SEN BİR TÜRK POLİSİYE ROMAN YAZARISIN.
+        return f"""SEN BİR TÜRK POLİSİYE ROMAN YAZARISIN.
 GÖREVİN: Aşağıdaki temaya uygun, tutarlı bir cinayet kurgusu oluşturmak.
 
 HİKAYE TEMASI: {theme}
@@ -128,34 +209,114 @@ KURALLAR:
 
 SADECE JSON DÖNDÜR.
 JSON:"""
-        
-        response = self.llm.invoke(prompt)
-        
+
+    def _generate_json(self, prompt: str, schema: Dict, cancel: Optional[threading.Event] = None,
+                       attempts: int = JSON_ATTEMPTS, verbose: bool = True) -> Optional[Dict]:
+        """
+        Şemaya bağlı JSON üretimi. Şema Ollama'ya `format` olarak verilir (model
+        çıktısı bu şemayla sınırlanır) ve akış StreamingJSONValidator ile parça
+        parça doğrulanır. İlk ihlalde akış kapatılır ve yeniden denenir; böylece
+        bozuk bir cevap tam üretim süresine mal olmaz. Başarısızsa None döner.
+        """
+        for attempt in range(1, attempts + 1):
+            if cancel is not None and cancel.is_set():
+                return None
+            self._count("json_attempts")
+            validator = StreamingJSONValidator(schema)
+            with telemetry.span("llm.json", attempt=attempt) as span:
+                stream = self.llm.stream(prompt, format=schema)
+                try:
+                    for chunk in stream:
+                        if cancel is not None and cancel.is_set():
+                            return None
+                        validator.feed(chunk)
+                        if validator.done:
+                            break
+                    return validator.close()
+                except SchemaViolation as e:
+                    self._count("schema_aborts")
+                    span["aborted_at_chars"] = validator.consumed
+                    if verbose:
+                        print(f" Şema ihlali ({attempt}/{attempts}, {validator.consumed}. karakter): {e}")
+                finally:
+                    stream.close()
+        return None
+
+    def _finalize_case_concept(self, case_data: Optional[Dict], verbose: bool = True) -> Optional[Dict]:
+        """Şemaya uyan konsepti Türkçeleştir ve mantık kontrolünden geçir. Geçersizse None döner."""
+        if case_data is None:
+            return None
         try:
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
+            # 1. Türkçeleştirme
+            case_data = self._turkishify_data(case_data)
             
-            if json_start != -1 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                case_data = json.loads(json_str)
-                
-                # 1. Türkçeleştirme
-                case_data = self._turkishify_data(case_data)
-                
-                # 2. YENİ DÜZELTME: Mantık ve İsim Kontrolü
-                case_data = self._sanitize_story_data(case_data)
-                
-                return case_data
-            else:
-                print(" JSON bulunamadı, varsayılan hikaye kullanılıyor")
-                return self._get_fallback_case()
-                
-        except json.JSONDecodeError as e:
-            print(f" JSON parse hatası: {e}")
-            print("Response:", response[:200])
-            return self._get_fallback_case()
+            # 2. YENİ DÜZELTME: Mantık ve İsim Kontrolü
+            return self._sanitize_story_data(case_data, verbose)
+        except (KeyError, TypeError, IndexError, AttributeError, ValueError) as e:
+            # JSON geçerli ama beklenen yapıda değil (eksik alan vb.)
+            if verbose:
+                print(f" Hikaye yapısı hatalı: {e}")
+            return None
+
+    def generate_case_concept(self, theme: Optional[str] = None, verbose: bool = True) -> Dict:
+        """Ana hikaye konseptini üret - TAM TÜRKÇE. verbose=False iken uyarı yazdırılmaz."""
+        
+        theme = theme or random.choice(CASE_THEMES)
+        
+        self._count("requests")
+        self._count("candidates")
+        case_data = self._finalize_case_concept(
+            self._generate_json(self._case_concept_prompt(theme), CASE_SCHEMA, verbose=verbose), verbose)
+        if case_data is None:
+            self._count("fallbacks")
+            return self._get_fallback_case(verbose)
+        self._count("valid_candidates")
+        return case_data
+
+    def _generate_concept_candidate(self, theme: str, cancel: threading.Event) -> Optional[Dict]:
+        """
+        Tek bir aday konsepti akış halinde üretir. cancel işaretlenirse akış
+        kapatılır; Ollama bağlantı kapanınca üretimi durdurur.
+        """
+        case_data = self._generate_json(self._case_concept_prompt(theme), CASE_SCHEMA, cancel, verbose=False)
+        return self._finalize_case_concept(case_data, verbose=False)
+
+    def generate_case_concept_speculative(self, candidates: int = 3, timeout: Optional[float] = None,
+                                          verbose: bool = True) -> Dict:
+        """
+        Farklı temalarla aynı anda `candidates` adet konsept üretimi başlatır;
+        ayrıştırılıp doğrulanan ilk aday kullanılır, diğerleri iptal edilir.
+        Yedek hikayeye yalnızca tüm adaylar başarısız olursa düşülür.
+        (Gerçek paralellik için Ollama OLLAMA_NUM_PARALLEL >= candidates olmalı.)
+        """
+        themes = random.sample(CASE_THEMES, min(candidates, len(CASE_THEMES)))
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(themes), thread_name_prefix="case-concept")
+        self._count("requests")
+        try:
+            futures = [executor.submit(self._generate_concept_candidate, theme, cancel) for theme in themes]
+            for future in as_completed(futures, timeout=timeout):
+                self._count("candidates")
+                try:
+                    case_data = future.result()
+                except Exception as e:
+                    if verbose:
+                        print(f" Aday üretim hatası: {e}")
+                    continue
+                if case_data is not None:
+                    self._count("valid_candidates")
+                    return case_data
+        except FuturesTimeoutError:
+            if verbose:
+                print(" Konsept üretimi zaman aşımına uğradı")
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        self._count("fallbacks")
+        return self._get_fallback_case(verbose)
 
-    def _sanitize_story_data(self, case_data: Dict) -> Dict:
+    def _sanitize_story_data(self, case_data: Dict, verbose: bool = True) -> Dict:
         """YENİ: AI hatalarını (çift isim, eksik katil) düzeltir."""
         
         # 1. İsim Çakışmalarını Önle
@@ -169,7 +330,8 @@ JSON:"""
             if name in seen_names:
                 # Havuzdan kullanılmamış bir isim bul
                 new_name = next((n for n in self.turkish_names if n not in seen_names), f"Şüpheli {i+1}")
-                print(f" İsim çakışması düzeltildi: {name} -> {new_name}")
+                if verbose:
+                    print(f" İsim çakışması düzeltildi: {name} -> {new_name}")
                 case_data['suspects'][i]['name'] = new_name
                 name = new_name
             
@@ -187,7 +349,8 @@ JSON:"""
             target_index = random.randint(0, len(case_data['suspects'])-1)
             case_data['suspects'][target_index]['is_killer'] = True
             killer_in_suspects = case_data['suspects'][target_index]
-            print(f" Katil eksikti, atandı: {killer_in_suspects['name']}")
+            if verbose:
+                print(f" Katil eksikti, atandı: {killer_in_suspects['name']}")
 
         # 'killer' objesindeki ismin, şüpheliler listesindeki katille aynı olduğundan emin ol
         case_data['killer']['name'] = killer_in_suspects['name']
@@ -228,8 +391,8 @@ JSON:"""
         
         return case_data
     
-    def generate_clues(self, case_data: Dict) -> List[Dict]:
-        """Kanıtları üret - TÜRKÇE."""
+    def generate_clues(self, case_data: Dict, verbose: bool = True) -> List[Dict]:
+        """Kanıtları üret - TÜRKÇE. verbose=False iken uyarı yazdırılmaz."""
         victim = case_data['victim']['name']
         killer_name = case_data['killer']['name']
         locations = case_data['locations']
@@ -248,54 +411,34 @@ KURALLAR:
 3. Diğer kanıtlar yanıltıcı olabilir
 4. TÜM KANIT İSİMLERİ TÜRKÇE OLMALIDIR
 
-ÇOK ÖNEMLİ: MUTLAKA TAM OLARAK ŞU FORMATTA JSON OLUŞTUR:
-[
-  {{
-    "item_name": "Kanıt İsmi",
-    "location": "Mekan İsmi",
-    "description": "Detaylı açıklama",
-    "points_to_killer": true
-  }},
-  {{
-    "item_name": "Başka Bir Kanıt",
-    "location": "Mekan İsmi",
-    "description": "Detaylı açıklama",
-    "points_to_killer": false
-  }}
-]
+ÇOK ÖNEMLİ: MUTLAKA TAM OLARAK ŞU FORMATTA JSON OLUŞTUR ("location" yukarıdaki mekanlardan biri olmalı):
+{{
+  "clues": [
+    {{
+      "item_name": "Kanıt İsmi",
+      "location": "Mekan İsmi",
+      "description": "Detaylı açıklama",
+      "points_to_killer": true
+    }},
+    {{
+      "item_name": "Başka Bir Kanıt",
+      "location": "Mekan İsmi",
+      "description": "Detaylı açıklama",
+      "points_to_killer": false
+    }}
+  ]
+}}
 
-SADECE JSON ARRAY VER, BAŞKA HİÇBİR ŞEY YAZMA!
+SADECE JSON VER, BAŞKA HİÇBİR ŞEY YAZMA!
 """
         
-        response = self.llm.invoke(prompt)
-        
-        try:
-            json_start = response.find('[')
-            json_end = response.rfind(']') + 1
-            
-            if json_start != -1 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                clues = json.loads(json_str)
-                
-                # Kanıt formatını normalize et
-                normalized_clues = []
-                for clue in clues:
-                    normalized_clues.append({
-                        'item_name': clue.get('item_name') or clue.get('name') or clue.get('item') or "Bilinmeyen Kanıt",
-                        'location': clue.get('location') or clue.get('location_name') or locations[0],
-                        'description': clue.get('description') or clue.get('desc') or "Detay yok",
-                        'points_to_killer': clue.get('points_to_killer', False)
-                    })
-                
-                return normalized_clues if normalized_clues else self._get_fallback_clues(locations)
-            else:
-                print(" JSON bulunamadı, varsayılan kanıtlar kullanılıyor")
-                return self._get_fallback_clues(locations)
-                
-        except json.JSONDecodeError as e:
-            print(f" JSON parse hatası: {e}")
-            print(f"Response: {response[:200]}")
+        # Alanlar şemayla doğrulandığı için ek normalizasyon gerekmez
+        result = self._generate_json(prompt, clues_schema(locations), verbose=verbose)
+        if result is None:
+            if verbose:
+                print(" Geçerli kanıt JSON'u üretilemedi, varsayılan kanıtlar kullanılıyor")
             return self._get_fallback_clues(locations)
+        return result['clues']
     
     def generate_alibis(self, case_data: Dict) -> List[Dict]:
         """Şüphelilerin nerede olduklarını üret."""
@@ -358,32 +501,44 @@ SADECE JSON ARRAY VER, BAŞKA HİÇBİR ŞEY YAZMA!
         
         return relationships
     
-    def create_full_mystery(self) -> Dict:
-        """Tüm bileşenleri birleştirerek hikaye oluştur."""
-        print("\n🎭 AI yeni bir cinayet hikayesi üretiyor...")
+    def create_full_mystery(self, verbose: bool = True, concept_candidates: int = 1) -> Dict:
+        """
+        Tüm bileşenleri birleştirerek hikaye oluştur.
+        verbose=False iken (ör. arka plan havuzu) ilerleme yazdırılmaz ve debug kaydı yapılmaz.
+        concept_candidates > 1 ise konsept spekülatif paralel üretimle seçilir.
+        """
+        if verbose:
+            print("\n🎭 AI yeni bir cinayet hikayesi üretiyor...")
         
         # 1. Ana konsept
-        case_data = self.generate_case_concept()
-        print(f"   Hikaye: {case_data.get('title', 'İsimsiz Gizem')}")
-        print(f"   Kurban: {case_data['victim']['name']}")
-        print(f"   Şüpheli Sayısı: {len(case_data['suspects'])}")
+        if concept_candidates > 1:
+            case_data = self.generate_case_concept_speculative(concept_candidates, verbose=verbose)
+        else:
+            case_data = self.generate_case_concept(verbose=verbose)
+        if verbose:
+            print(f"   Hikaye: {case_data.get('title', 'İsimsiz Gizem')}")
+            print(f"   Kurban: {case_data['victim']['name']}")
+            print(f"   Şüpheli Sayısı: {len(case_data['suspects'])}")
         
         # 2. Kanıtlar
-        clues = self.generate_clues(case_data)
-        print(f" {len(clues)} kanıt üretildi")
+        clues = self.generate_clues(case_data, verbose)
+        if verbose:
+            print(f" {len(clues)} kanıt üretildi")
         
-        # Debug: Kanıt formatını kontrol et
-        if clues:
-            first_clue = clues[0]
-            print(f"   Örnek kanıt: {first_clue.get('item_name', 'KEY HATASI!')}")
+            # Debug: Kanıt formatını kontrol et
+            if clues:
+                first_clue = clues[0]
+                print(f"   Örnek kanıt: {first_clue.get('item_name', 'KEY HATASI!')}")
         
         # 3. Alibiler
         alibis = self.generate_alibis(case_data)
-        print(f" {len(alibis)} alibi oluşturuldu")
+        if verbose:
+            print(f" {len(alibis)} alibi oluşturuldu")
         
         # 4. İlişkiler
         relationships = self.generate_relationships(case_data)
-        print(f" {len(relationships)} ilişki tanımlandı")
+        if verbose:
+            print(f" {len(relationships)} ilişki tanımlandı")
         
         mystery_data = {
             "case": case_data,
@@ -392,89 +547,47 @@ SADECE JSON ARRAY VER, BAŞKA HİÇBİR ŞEY YAZMA!
             "relationships": relationships
         }
         
-        # DEBUG: Tüm veriyi JSON dosyasına kaydet
+        if verbose:
+            self.save_debug_copy(mystery_data)
+        
+        return mystery_data
+    
+    def save_debug_copy(self, mystery_data: Dict):
+        """DEBUG: Tüm veriyi JSON dosyasına kaydet."""
         try:
             with open("debug_mystery.json", "w", encoding="utf-8") as f:
                 json.dump(mystery_data, f, ensure_ascii=False, indent=2)
             print(" Debug: Hikaye 'debug_mystery.json' dosyasına kaydedildi")
         except Exception as e:
             print(f" Debug kayıt hatası: {e}")
-        
-        return mystery_data
     
-    def load_mystery_to_database(self, mystery: Dict):
-        """Üretilen hikayeyi FalkorDB'ye yükle."""
-        if not db.is_active:
+    def load_mystery_to_database(self, mystery: Dict, database=None):
+        """Üretilen hikayeyi graf veritabanına yükle (varsayılan: ortak global örnek)."""
+        database = database or db
+        if not database.is_active:
             print("FalkorDB bağlantısı yok!")
             return
         
         print("\n Hikaye FalkorDB'ye yükleniyor...")
         
-        db.reset_game()
-        
         case = mystery['case']
         
-        # 1. Kurbanı ekle
-        db.add_person(
-            case['victim']['name'],
-            'Victim',
-            case['victim']['background']
-        )
-        
-        # 2. Şüphelileri ekle
-        for suspect in case['suspects']:
-            role = 'Killer' if suspect.get('is_killer') else 'Suspect'
-            db.add_person(suspect['name'], role, suspect['trait'])
-        
-        # 3. Kanıtları ekle (HATA GÜVENLİĞİ)
-        for clue in mystery['clues']:
-            try:
-                # Farklı key isimlerini dene
-                item_name = clue.get('item_name') or clue.get('name') or clue.get('item') or "Bilinmeyen Kanıt"
-                location = clue.get('location') or clue.get('location_name') or "Bilinmeyen Yer"
-                description = clue.get('description') or clue.get('desc') or "Detay yok"
-                
-                db.add_clue(item_name, location, description)
-                print(f"  ✓ Kanıt eklendi: {item_name}")
-            except Exception as e:
-                print(f"  Kanıt eklenirken hata: {e}")
-                print(f"     Clue data: {clue}")
-                continue
-        
-        # 4. Alibileri ekle
-        for alibi in mystery['alibis']:
-            try:
-                person = alibi.get('person') or alibi.get('name') or "Bilinmeyen"
-                location = alibi.get('location') or "Bilinmeyen Yer"
-                time = alibi.get('time') or "Bilinmeyen Saat"
-                
-                db.add_location_record(person, location, time)
-            except Exception as e:
-                print(f"   Alibi eklenirken hata: {e}")
-                continue
-        
-        # 5. İlişkileri ekle
-        for rel in mystery['relationships']:
-            try:
-                person1 = rel.get('person1') or rel.get('from') or "Bilinmeyen1"
-                person2 = rel.get('person2') or rel.get('to') or "Bilinmeyen2"
-                rel_type = rel.get('type') or "KNOWS"
-                detail = rel.get('detail') or "İlişki detayı yok"
-                
-                db.add_relationship(person1, person2, rel_type, detail)
-            except Exception as e:
-                print(f"   İlişki eklenirken hata: {e}")
-                continue
+        # Kişiler, kanıtlar, alibiler ve ilişkiler tek seferde, atomik olarak yazılır
+        if not database.load_case(mystery):
+            print(" Hikaye veritabanına yüklenemedi!")
+            return case
         
         print(" Hikaye veritabanına yüklendi!")
         
         return case
     
-    def _get_fallback_case(self) -> Dict:
+    def _get_fallback_case(self, verbose: bool = True) -> Dict:
         """Hata durumunda varsayılan TÜRKÇE hikaye."""
         # DÜZELTME: Kullanıcıya yedek hikayenin devreye girdiği bildiriliyor
-        print("\n DİKKAT: AI bozuk veri ürettiği için 'YEDEK HİKAYE' (Köşk) devreye girdi!\n")
+        if verbose:
+            print("\n DİKKAT: AI bozuk veri ürettiği için 'YEDEK HİKAYE' (Köşk) devreye girdi!\n")
         return {
+            "is_fallback": True,
             "title": "Köşkte Gizem",
             "victim": {
                 "name": "Hasan Efendi",
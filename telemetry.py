@@ -0,0 +1,184 @@
+"""
+Telemetry
+Lightweight tracing and metrics for the hot paths: LLM calls, vector
+retrieval and graph lookups. Every span records its duration, error state and
+optional counters (prompt/completion tokens, result sizes).
+
+The data is available three ways:
+  - telemetry.stats():             in-process summary per span name
+  - SHERLOCK_TRACE_FILE=path:      one JSON line per finished span
+  - telemetry.serve_metrics(port): Prometheus text format on /metrics
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# Span attributes that are summed into counters
+COUNTER_ATTRS = ("prompt_tokens", "completion_tokens", "result_items")
+
+
+class _SpanStats:
+    """Running aggregate for one span name."""
+
+    __slots__ = ("count", "errors", "total", "max", "samples", "counters")
+
+    def __init__(self, max_samples: int):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=max_samples)
+        self.counters = {attr: 0 for attr in COUNTER_ATTRS}
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Telemetry:
+    """Thread-safe span recorder with JSON-lines and Prometheus exporters."""
+
+    def __init__(self, trace_path: Optional[str] = None, max_samples: int = 1024):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._spans: Dict[str, _SpanStats] = {}
+        self._collectors: Dict[str, Callable[[], Dict]] = {}
+        self._trace_file = open(trace_path, "a", encoding="utf-8", buffering=1) if trace_path else None
+        self._server = None
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Times the enclosed block. The yielded dict can be filled with extra
+        attributes (e.g. span["result_items"] = len(docs)) before it closes.
+        Exceptions are recorded and re-raised.
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, error, attrs)
+
+    def record(self, name: str, duration: float, error: Optional[str] = None, attrs: Optional[Dict] = None):
+        """Adds one finished span to the aggregates and the trace file."""
+        attrs = attrs or {}
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = _SpanStats(self.max_samples)
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            stats.samples.append(duration)
+            if error:
+                stats.errors += 1
+            for attr in COUNTER_ATTRS:
+                value = attrs.get(attr)
+                if isinstance(value, (int, float)):
+                    stats.counters[attr] += value
+
+            if self._trace_file:
+                self._trace_file.write(json.dumps({
+                    "ts": round(time.time(), 6),
+                    "span": name,
+                    "duration_ms": round(duration * 1000, 3),
+                    "error": error,
+                    "attrs": attrs,
+                }, ensure_ascii=False, default=str) + "\n")
+
+    def add_collector(self, prefix: str, collector: Callable[[], Dict]):
+        """Registers a callable whose numeric values are exported as gauges (e.g. pool stats)."""
+        with self._lock:
+            self._collectors[prefix] = collector
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-span summary: count, errors, latency quantiles and summed counters."""
+        with self._lock:
+            return {
+                name: {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "total_s": round(s.total, 6),
+                    "p50_ms": round(s.quantile(0.5) * 1000, 3),
+                    "p95_ms": round(s.quantile(0.95) * 1000, 3),
+                    "max_ms": round(s.max * 1000, 3),
+                    **s.counters,
+                }
+                for name, s in self._spans.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Current metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP sherlock_span_duration_seconds Duration of instrumented calls.",
+            "# TYPE sherlock_span_duration_seconds summary",
+        ]
+        with self._lock:
+            spans = list(self._spans.items())
+            for name, s in spans:
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'sherlock_span_duration_seconds{{span="{name}",quantile="{q}"}} {s.quantile(q):.6f}')
+                lines.append(f'sherlock_span_duration_seconds_sum{{span="{name}"}} {s.total:.6f}')
+                lines.append(f'sherlock_span_duration_seconds_count{{span="{name}"}} {s.count}')
+            lines.append("# TYPE sherlock_span_errors_total counter")
+            for name, s in spans:
+                lines.append(f'sherlock_span_errors_total{{span="{name}"}} {s.errors}')
+            for attr in COUNTER_ATTRS:
+                lines.append(f"# TYPE sherlock_{attr}_total counter")
+                for name, s in spans:
+                    lines.append(f'sherlock_{attr}_total{{span="{name}"}} {s.counters[attr]}')
+            collectors = list(self._collectors.items())
+
+        for prefix, collector in collectors:
+            try:
+                values = collector()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE sherlock_{prefix}_{key} gauge")
+                    lines.append(f"sherlock_{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "0.0.0.0"):
+        """Starts a background HTTP server exposing /metrics for Prometheus scraping."""
+        if self._server:
+            return self._server
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        print(f" Metrics endpoint: http://{host}:{port}/metrics")
+        return self._server
+
+
+# Create a global instance
+telemetry = Telemetry(trace_path=os.getenv("SHERLOCK_TRACE_FILE"))
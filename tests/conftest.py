@@ -0,0 +1,27 @@
+"""Test setup: the modules live at the repository root, not in a package."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def sample_mystery():
+    """Small generated-mystery dict in the shape story_generator produces."""
+    return {
+        "case": {
+            "title": "Zehirli Şerbet",
+            "victim": {"name": "Emine Hanım", "background": "Zengin bir tüccar",
+                       "killed_when": "20:30", "killed_where": "Yemek Salonu"},
+            "suspects": [
+                {"name": "Feride Hanım", "trait": "Kıskanç", "is_killer": False},
+                {"name": "Şevket Usta", "trait": "Ketum", "is_killer": True},
+            ],
+            "locations": ["Kütüphane", "Yemek Salonu"],
+        },
+        "clues": [{"item_name": "Hançer", "location": "Kütüphane", "description": "Kanlı"}],
+        "alibis": [{"person": "Feride Hanım", "location": "Kütüphane", "time": "20:00"}],
+        "relationships": [{"person1": "Feride Hanım", "person2": "Şevket Usta",
+                           "type": "suspects of", "detail": "Ona güvenmiyor"}],
+    }
@@ -0,0 +1,80 @@
+"""ConversationMemory: token budget, background summaries and clear()."""
+import threading
+
+from conversation_memory import ConversationMemory, estimate_tokens
+
+
+def drain(memory):
+    """Waits for the single summary worker to finish what was queued."""
+    memory._executor.submit(lambda: None).result(timeout=5)
+
+
+def test_short_dialogue_is_kept_verbatim():
+    memory = ConversationMemory(lambda *args: "özet", max_tokens=600)
+    memory.add_turn("Feride", "Neredeydiniz?", "Kütüphanede.")
+    assert memory.context("Feride") == "SON KONUŞMALAR:\nDedektif: Neredeydiniz?\nSen: Kütüphanede."
+    assert memory.context("Şevket") == ""
+
+
+def test_old_turns_are_summarized_within_budget():
+    calls = []
+
+    def summarize(character, summary, turns):
+        calls.append((character, summary, list(turns)))
+        return "Feride kütüphanede olduğunu söyledi."
+
+    memory = ConversationMemory(summarize, max_tokens=60, keep_recent=2)
+    for index in range(6):
+        memory.add_turn("Feride", f"Soru {index} " + "x" * 40, f"Cevap {index} " + "y" * 40)
+        drain(memory)
+
+    context = memory.context("Feride")
+    assert context.startswith("ÖNCEKİ KONUŞMALARIN ÖZETİ: Feride kütüphanede")
+    assert "Cevap 5" in context and "Cevap 0" not in context
+    assert estimate_tokens(context) <= 60 + 20
+    assert calls[0][0] == "Feride" and calls[0][1] == ""
+    assert memory.stats()["summaries"] == len(calls)
+
+
+def test_failed_summary_drops_the_turns():
+    def summarize(character, summary, turns):
+        raise RuntimeError("ollama kapalı")
+
+    memory = ConversationMemory(summarize, max_tokens=30, keep_recent=1)
+    for index in range(3):
+        memory.add_turn("Şevket", f"Soru {index} " + "x" * 40, f"Cevap {index}")
+        drain(memory)
+    assert memory.stats()["failures"] >= 1
+    assert memory.stats()["turns"] <= 2
+
+
+def test_clear_discards_summaries_in_flight():
+    release = threading.Event()
+
+    def summarize(character, summary, turns):
+        release.wait(timeout=5)
+        return "eski vaka"
+
+    memory = ConversationMemory(summarize, max_tokens=10, keep_recent=0)
+    memory.add_turn("Feride", "Soru " + "x" * 40, "Cevap " + "y" * 40)
+    memory.clear()
+    release.set()
+    drain(memory)
+    assert memory.context("Feride") == ""
+    assert memory.stats() == {"characters": 0, "turns": 0, "pending": 0, "summaries": 0, "failures": 0}
+
+
+def test_summaries_wait_for_the_interrogation_to_end():
+    calls = []
+    memory = ConversationMemory(lambda character, summary, turns: calls.append(character) or "özet",
+                                max_tokens=30, keep_recent=1)
+    with memory.hold():
+        for index in range(4):
+            memory.add_turn("Feride", f"Soru {index} " + "x" * 40, f"Cevap {index}")
+        drain(memory)
+        assert calls == [] and memory.stats()["pending"] == 0
+        # The prompt stays bounded while summaries are deferred
+        assert estimate_tokens(memory.context("Feride")) <= 30 + 10
+    drain(memory)
+    assert calls == ["Feride"]
+    assert memory.context("Feride").startswith("ÖNCEKİ KONUŞMALARIN ÖZETİ: özet")
@@ -0,0 +1,62 @@
+"""CachedQueryEmbeddings: LRU behaviour, key/text consistency and the on-disk table."""
+import pytest
+
+pytest.importorskip("langchain_core.embeddings")
+
+from embedding_cache import CachedQueryEmbeddings
+
+
+class RecordingEmbeddings:
+    """Vector depends on the exact text, so case or spacing changes are visible."""
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(sum(map(ord, text))) + self.offset, float(len(text))]
+
+
+def test_repeated_query_hits_memory():
+    base = RecordingEmbeddings()
+    cache = CachedQueryEmbeddings(base, "model")
+    first = cache.embed_query("kanlı  mendil ")
+    assert cache.embed_query("kanlı mendil") == first
+    assert base.queries == ["kanlı mendil"]
+    assert cache.stats() == {"entries": 1, "hits": 1, "disk_hits": 0, "misses": 1}
+
+
+def test_cached_vector_is_the_vector_of_its_key():
+    base = RecordingEmbeddings()
+    cache = CachedQueryEmbeddings(base, "model")
+    upper = cache.embed_query("Feride Hanım")
+    lower = cache.embed_query("feride hanım")
+    assert upper == base.embed_query("Feride Hanım")
+    assert lower == base.embed_query("feride hanım")
+    assert upper != lower
+
+
+def test_lru_evicts_oldest():
+    base = RecordingEmbeddings()
+    cache = CachedQueryEmbeddings(base, "model", max_entries=2)
+    for text in ("a", "b", "a", "c", "b"):
+        cache.embed_query(text)
+    assert base.queries == ["a", "b", "c", "b"]
+
+
+def test_disk_cache_survives_restart_and_is_per_backend(tmp_path):
+    path = str(tmp_path / "vectors.sqlite")
+    torch_vector = CachedQueryEmbeddings(RecordingEmbeddings(), "model", persist_path=path).embed_query("hançer")
+
+    reopened = CachedQueryEmbeddings(RecordingEmbeddings(), "model", persist_path=path)
+    assert reopened.embed_query("hançer") == pytest.approx(torch_vector)
+    assert reopened.stats()["disk_hits"] == 1
+
+    onnx_base = RecordingEmbeddings(offset=0.5)
+    onnx = CachedQueryEmbeddings(onnx_base, "model", persist_path=path, backend="onnx-int8")
+    assert onnx.embed_query("hançer") == onnx_base.embed_query("hançer")
+    assert onnx.stats()["disk_hits"] == 0
@@ -0,0 +1,68 @@
+"""PooledEmbeddings: several models share one CPU worker pool."""
+import pytest
+
+pytest.importorskip("langchain_huggingface")
+
+import embedding_pool
+from embedding_pool import PooledEmbeddings, WorkerPool
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+    def embed_documents(self, texts):
+        return [[float(len(self.name)), float(len(text))] for text in texts]
+
+
+class InlinePool:
+    """multiprocessing Pool stand-in that runs tasks in this process."""
+    created = []
+
+    def __init__(self, processes, initializer, initargs):
+        self.processes = processes
+        self.closed = False
+        initializer(*initargs)
+        InlinePool.created.append(self)
+
+    def map(self, fn, items, chunksize=1):
+        return [fn(item) for item in items]
+
+    def close(self):
+        self.closed = True
+
+    def join(self):
+        pass
+
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    InlinePool.created = []
+    context = type("Context", (), {"Pool": InlinePool})()
+    monkeypatch.setattr(embedding_pool.multiprocessing, "get_context", lambda method: context)
+    monkeypatch.setattr(embedding_pool, "_load_model", lambda name, device, batch_size: FakeModel(name))
+    monkeypatch.setattr(embedding_pool, "_worker_models", {})
+    return InlinePool.created
+
+
+def test_models_share_one_pool(inline_pool):
+    shared = WorkerPool(4)
+    books = PooledEmbeddings("kitap-modeli", device="cpu", workers=4, batch_size=2, pool=shared)
+    dialogue = PooledEmbeddings("diyalog", device="cpu", workers=4, batch_size=2, pool=shared)
+
+    assert books.embed_documents(["a", "bb", "ccc"]) == [[12.0, 1.0], [12.0, 2.0], [12.0, 3.0]]
+    assert dialogue.embed_documents(["dddd"]) == [[7.0, 4.0]]
+    assert len(inline_pool) == 1 and inline_pool[0].processes == 4
+    assert set(embedding_pool._worker_models) == {("kitap-modeli", 2), ("diyalog", 2)}
+
+    books.close()
+    assert not inline_pool[0].closed  # Still used by the dialogue model
+    dialogue.close()
+    assert inline_pool[0].closed
+
+
+def test_gpu_ignores_the_worker_pool(inline_pool):
+    embeddings = PooledEmbeddings("kitap-modeli", device="cuda", workers=4, pool=WorkerPool(4))
+    assert embeddings.workers == 1 and embeddings._pool is None
+    embeddings.close()
+    assert inline_pool == []
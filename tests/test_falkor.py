@@ -0,0 +1,122 @@
+"""FalkorDB connection handling: reconnect backoff and error routing (no server needed)."""
+import pytest
+
+pytest.importorskip("falkordb")
+pytest.importorskip("redis")
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import falkor
+from falkor import DetectiveDatabase, FalkorConnectionManager, PoolExhausted, _release_pool
+
+
+@pytest.fixture
+def attempts(monkeypatch):
+    calls = []
+
+    def unreachable(**kwargs):
+        calls.append(kwargs["host"])
+        raise RedisConnectionError("down")
+
+    monkeypatch.setattr(falkor, "_BoundedConnectionPool", unreachable)
+    return calls
+
+
+def test_new_databases_respect_the_backoff(attempts):
+    manager = FalkorConnectionManager(host="falkor.invalid", backoff_initial=60)
+    DetectiveDatabase("first", manager=manager)
+    second = DetectiveDatabase("second", manager=manager)
+    assert attempts == ["falkor.invalid"]
+    assert not second.is_active
+
+
+class FailingGraph:
+    def explain(self, query, params=None):
+        raise RedisConnectionError("connection reset")
+
+
+class BusyGraph:
+    def query(self, query, params=None, timeout=None):
+        raise PoolExhausted("No connection available.")
+
+
+def connected_manager(monkeypatch, graph):
+    manager = FalkorConnectionManager(host="falkor.invalid", backoff_initial=60)
+    manager.connected = True
+    manager._last_check = float("inf")
+    monkeypatch.setattr(manager, "select_graph", lambda name: graph)
+    return manager
+
+
+def test_explain_connection_error_marks_the_pool_failed(attempts, monkeypatch):
+    manager = connected_manager(monkeypatch, FailingGraph())
+    database = DetectiveDatabase("case", manager=manager)
+    monkeypatch.setattr(database, "ensure_indexes", lambda: None)
+
+    with pytest.raises(RedisConnectionError):
+        database.explain("MATCH (n) RETURN n")
+    assert not manager.connected
+    assert attempts == []
+
+
+def test_exhausted_pool_does_not_mark_the_server_down(attempts, monkeypatch):
+    manager = connected_manager(monkeypatch, BusyGraph())
+    database = DetectiveDatabase("case", manager=manager)
+    for _ in range(3):
+        with pytest.raises(PoolExhausted):
+            database.find_killer()
+    assert manager.connected
+    assert attempts == []
+
+
+def test_busy_health_check_counts_as_alive(attempts):
+    class BusyConnection:
+        def ping(self):
+            raise PoolExhausted("No connection available.")
+
+    manager = FalkorConnectionManager(host="falkor.invalid")
+    manager.connected = True
+    manager.client = type("Client", (), {"connection": BusyConnection()})()
+    assert manager.is_available()
+    assert manager.connected and attempts == []
+
+
+def test_replaced_pool_keeps_checked_out_connections():
+    calls = []
+
+    class OldPool:
+        def disconnect(self, inuse_connections=True):
+            calls.append(inuse_connections)
+
+    _release_pool(OldPool())
+    assert calls == [False]
+
+
+def test_empty_pool_raises_pool_exhausted():
+    redis = pytest.importorskip("redis")
+    if not hasattr(redis.BlockingConnectionPool, "get_connection"):
+        pytest.skip("needs the real redis-py pool")
+    pool = falkor._BoundedConnectionPool(max_connections=1, timeout=0.05)
+    pool.pool.get_nowait()  # The only connection is checked out by another query
+    with pytest.raises(PoolExhausted):
+        pool.get_connection()
+
+
+def test_pool_size_follows_the_caller(monkeypatch):
+    monkeypatch.setattr(falkor, "_manager", None)
+    assert falkor.get_connection_manager(max_connections=32).max_connections == 32
+    assert falkor.get_connection_manager(max_connections=8).max_connections == 32
+
+
+def test_default_backend_waits_for_falkordb(attempts, monkeypatch):
+    monkeypatch.delenv("SHERLOCK_GRAPH_BACKEND", raising=False)
+    monkeypatch.setattr(falkor, "_manager", FalkorConnectionManager(host="falkor.invalid", backoff_initial=60))
+    database = falkor.create_database(graph_name="case")
+    assert isinstance(database, DetectiveDatabase) and not database.is_active
+
+
+def test_auto_backend_falls_back_loudly(attempts, monkeypatch, capsys):
+    monkeypatch.setattr(falkor, "_manager", FalkorConnectionManager(host="falkor.invalid", backoff_initial=60))
+    database = falkor.create_database("auto", graph_name="case")
+    assert not isinstance(database, DetectiveDatabase)
+    assert "WARNING: FalkorDB at falkor.invalid:" in capsys.readouterr().out
@@ -0,0 +1,41 @@
+"""Block-wise text chunking in ingest: same chunks as splitting the whole file."""
+import random
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+import ingest
+
+WORDS = ["kâhya", "mektup", "bahçe", "Feride", "hançer", "gece", "kütüphane", "ve", "bir", "sessizce"]
+
+
+def novel(paragraphs, max_words, separator="\n\n", seed=7):
+    rng = random.Random(seed)
+
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, max_words))) + "."
+
+    return separator.join(sentence() + ("\n" + sentence() if rng.random() < 0.3 else "")
+                          for _ in range(paragraphs))
+
+
+def chunks(tmp_path, monkeypatch, text, block):
+    path = tmp_path / "kitap.txt"
+    path.write_text(text, encoding="utf-8")
+    monkeypatch.setattr(ingest, "READ_BLOCK_CHARS", block)
+    return list(ingest._iter_text_chunks(str(path), ingest._get_text_splitter()))
+
+
+@pytest.mark.parametrize("separator", ["\n\n", "\n"])
+@pytest.mark.parametrize("block", [3000, 7777])
+def test_blocks_chunk_like_the_whole_text(tmp_path, monkeypatch, separator, block):
+    text = novel(200, 150, separator)
+    assert chunks(tmp_path, monkeypatch, text, block) == ingest._get_text_splitter().split_text(text)
+
+
+def test_paragraph_longer_than_a_block_keeps_word_boundaries(tmp_path, monkeypatch):
+    text = novel(20, 2000)
+    streamed = chunks(tmp_path, monkeypatch, text, 2000)
+    assert all(chunk in text for chunk in streamed)
+    assert " ".join(streamed).split()[-3:] == text.split()[-3:]
@@ -0,0 +1,85 @@
+"""StreamingJSONValidator: incremental parsing and early schema aborts."""
+import json
+
+import pytest
+
+from json_stream import SchemaViolation, StreamingJSONValidator
+
+_TEXT = {"type": "string", "minLength": 1}
+
+SCHEMA = {
+    "type": "object",
+    "required": ["title", "clues"],
+    "additionalProperties": False,
+    "properties": {
+        "title": _TEXT,
+        "clues": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": 2,
+            "items": {
+                "type": "object",
+                "required": ["location", "points_to_killer"],
+                "additionalProperties": False,
+                "properties": {
+                    "location": {"type": "string", "enum": ["Kütüphane", "Bahçe"]},
+                    "points_to_killer": {"type": "boolean"},
+                },
+            },
+        },
+    },
+}
+
+VALID = {"title": "Zehirli Şerbet", "clues": [{"location": "Kütüphane", "points_to_killer": True}]}
+
+
+def feed_in_chunks(validator, text, size=3):
+    for start in range(0, len(text), size):
+        validator.feed(text[start:start + size])
+        if validator.done:
+            break
+
+
+def test_valid_document_streamed_in_chunks():
+    validator = StreamingJSONValidator(SCHEMA)
+    feed_in_chunks(validator, "İşte JSON:\n" + json.dumps(VALID, ensure_ascii=False) + "\nBitti.")
+    assert validator.done
+    assert validator.close() == VALID
+
+
+@pytest.mark.parametrize("document, message", [
+    ({"title": "", "clues": []}, "boş metin"),
+    ({"title": "x", "extra": 1}, "beklenmeyen alan 'extra'"),
+    ({"title": "x", "clues": [{"location": "Mutfak"}]}, "izin verilen"),
+    ({"title": "x", "clues": [{"location": "Bahçe", "points_to_killer": "evet"}]}, "boolean bekleniyordu"),
+    ({"title": "x", "clues": [{"location": "Bahçe", "points_to_killer": True, "note": "x"}]}, "beklenmeyen alan"),
+    ({"title": "x", "clues": [{"location": "Bahçe", "points_to_killer": True}] * 3}, "en fazla 2"),
+    ({"title": "x", "clues": []}, "en az 1"),
+    ({"title": "x"}, r"eksik alan\(lar\): clues"),
+])
+def test_violation_aborts_before_the_end(document, message):
+    text = json.dumps(document, ensure_ascii=False)
+    validator = StreamingJSONValidator(SCHEMA)
+    with pytest.raises(SchemaViolation, match=message):
+        feed_in_chunks(validator, text)
+    assert validator.consumed <= len(text)
+
+
+def test_incomplete_json_fails_on_close():
+    validator = StreamingJSONValidator(SCHEMA)
+    validator.feed('{"title": "x", "clues": [')
+    assert not validator.done
+    with pytest.raises(SchemaViolation, match="tamamlanmadı"):
+        validator.close()
+
+
+def test_long_preamble_is_rejected():
+    validator = StreamingJSONValidator(SCHEMA, max_preamble=5)
+    with pytest.raises(SchemaViolation, match="çok fazla metin"):
+        validator.feed("Tabii ki, işte istediğiniz hikaye")
+
+
+def test_escaped_strings_are_decoded():
+    validator = StreamingJSONValidator({"type": "object", "properties": {"title": _TEXT}})
+    validator.feed('{"title": "\\"Gölge\\" \\u00e7ar\\u015f\\u0131s\\u0131"}')
+    assert validator.close() == {"title": '"Gölge" çarşısı'}
@@ -0,0 +1,83 @@
+"""Turkish tokenisation, BM25 keyword index and reciprocal-rank fusion."""
+import pytest
+
+pytest.importorskip("langchain_core.documents")
+
+from langchain_core.documents import Document
+
+from keyword_index import HybridRetriever, KeywordIndex, tokenize, turkish_fold
+
+
+def test_turkish_fold_handles_dotted_and_dotless_i():
+    assert turkish_fold("IŞIK İSTANBUL") == "ışık istanbul"
+    assert turkish_fold("Iğdır") == "ığdır"
+
+
+def test_tokenize_stems_and_drops_stop_words():
+    assert tokenize("Mektubu ve MEKTUPTA bir İZ var, 1895") == ["mektu", "mektu", "iz", "var"]
+    assert tokenize("ve bu da ne") == []
+
+
+CHUNKS = {
+    "c1": "Kütüphanede kanlı bir hançer bulundu.",
+    "c2": "Feride Hanım mektubu yaktığını söyledi.",
+    "c3": "Bahçede ayak izleri vardı, mektupta ise imza yoktu.",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "kw.sqlite"))
+    index.add(list(CHUNKS), [Document(page_content=text, metadata={"id": key}) for key, text in CHUNKS.items()])
+    yield index
+    index.close()
+
+
+def test_search_matches_inflected_forms(index):
+    results = index.search("mektup", k=5)
+    assert {doc.metadata["id"] for doc, _ in results} == {"c2", "c3"}
+    assert index.search("HANÇER")[0][0].metadata["id"] == "c1"
+    assert index.search("ve") == []
+
+
+def test_add_is_idempotent_and_delete_removes(index):
+    index.add(["c1"], [Document(page_content=CHUNKS["c1"])])
+    assert len(index) == 3
+    index.delete(["c1", "unknown"])
+    assert len(index) == 2
+    assert index.search("hançer") == []
+    assert index.document_frequency("mektu") == 2
+
+
+def docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+def test_rrf_rewards_agreement_and_deduplicates():
+    retriever = HybridRetriever(vector_store=None, keyword_index=None, rrf_k=60)
+    fused = retriever.fuse([docs("a", "b", "c"), docs("c", "d", "a")], k=3)
+    # a and c both score 1/61 + 1/63; b and d both 1/62. Ties keep first-seen order.
+    assert [doc.page_content for doc in fused] == ["a", "c", "b"]
+    assert len(retriever.fuse([docs("a", "a"), docs("a")], k=5)) == 1
+
+
+class FakeVectorStore:
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def similarity_search(self, query, k=4):
+        self.queries.append(query)
+        return self.results[:k]
+
+
+def test_short_keyword_queries_skip_the_vector_store(index):
+    store = FakeVectorStore(docs(CHUNKS["c3"]))
+    retriever = HybridRetriever(store, index)
+    assert retriever.similarity_search("kanlı hançer", k=1)[0].page_content == CHUNKS["c1"]
+    assert store.queries == []
+
+    results = retriever.similarity_search("Mektupla ilgili kim ne biliyor?", k=2)
+    assert store.queries == ["Mektupla ilgili kim ne biliyor?"]
+    assert results[0].page_content == CHUNKS["c3"]
+    assert retriever.stats() == {"keyword": 1, "hybrid": 1, "vector": 0, "indexed_chunks": 3}
@@ -0,0 +1,51 @@
+"""LLMResponseCache: keys, persistence and LRU eviction."""
+import itertools
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMResponseCache
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    # Distinct, increasing access times so the LRU order is deterministic
+    ticks = itertools.count(1)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_key_depends_on_model_options_and_prompt():
+    key = LLMResponseCache.make_key("gemma2", {"temperature": 0.1, "repeat_penalty": 1.2}, "Kim?")
+    assert key == LLMResponseCache.make_key("gemma2", {"repeat_penalty": 1.2, "temperature": 0.1}, "Kim?")
+    assert key != LLMResponseCache.make_key("llama3.2", {"temperature": 0.1, "repeat_penalty": 1.2}, "Kim?")
+    assert key != LLMResponseCache.make_key("gemma2", {"temperature": 0.2, "repeat_penalty": 1.2}, "Kim?")
+    assert key != LLMResponseCache.make_key("gemma2", {"temperature": 0.1, "repeat_penalty": 1.2}, "Kim? ")
+
+
+def test_replies_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    LLMResponseCache(path).put("k", "Kâhya yalan söylüyor.")
+    cache = LLMResponseCache(path)
+    assert cache.get("k") == "Kâhya yalan söylüyor."
+    assert cache.get("yok") is None
+    assert cache.stats() == {"entries": 1, "bytes": len("Kâhya yalan söylüyor.".encode("utf-8")),
+                             "hits": 1, "misses": 1}
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_byte_budget(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+    cache.put("too-big", "x" * 11)
+    cache.put("a", "x" * 6)
+    cache.put("b", "x" * 6)
+    assert cache.get("too-big") is None and cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
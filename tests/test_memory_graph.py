@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, sample_mystery
+from memory_graph import InMemoryDetectiveDatabase
+
+
+def test_imports_without_falkor():
+    # Importing the in-process backend first must not go through falkor (circular import)
+    env = dict(os.environ, SHERLOCK_GRAPH_BACKEND="memory", PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", "import memory_graph; assert 'falkor' not in __import__('sys').modules"],
+                            env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_load_case_and_lookups():
+    db = InMemoryDetectiveDatabase("test")
+    version = db.version
+    assert db.load_case(sample_mystery())
+    assert db.version > version
+    assert db.find_killer() == "Şevket Usta"
+    assert db.find_items("Kütüphane") == [{"name": "Hançer", "description": "Kanlı"}]
+    assert db.find_witnesses("Kütüphane", "20:00")[0]["name"] == "Feride Hanım"
+    assert db.find_relationships("Feride Hanım") == [
+        {"type": "SUSPECTS_OF", "target": "Şevket Usta", "detail": "Ona güvenmiyor"}]
+
+
+def test_reset_clears_case():
+    db = InMemoryDetectiveDatabase("test")
+    db.load_case(sample_mystery())
+    db.reset_game()
+    assert db.find_killer() is None
+    assert db.list_people() == []
@@ -0,0 +1,102 @@
+"""MysteryPool: lazy directory creation, refill and claim."""
+import os
+import threading
+import time
+
+from conftest import sample_mystery
+from mystery_pool import MysteryPool, validate_mystery
+
+
+def pool_mystery():
+    mystery = sample_mystery()
+    case = mystery["case"]
+    case["locations"].append("Bahçe")
+    case["killer"] = {"name": "Şevket Usta", "true_motive": "Miras"}
+    for suspect in case["suspects"]:
+        suspect["motive"] = "Para"
+    return mystery
+
+
+class FakeGenerator:
+    def __init__(self, mystery):
+        self.mystery = mystery
+        self.calls = []
+
+    def create_full_mystery(self, verbose=True, concept_candidates=1):
+        self.calls.append(verbose)
+        return self.mystery
+
+
+def test_pool_touches_disk_only_when_used(tmp_path):
+    pool_dir = str(tmp_path / "pool")
+    pool = MysteryPool(FakeGenerator(pool_mystery()), pool_dir=pool_dir)
+    assert not os.path.exists(pool_dir)
+    assert pool.pop() is None
+    assert pool.stats()["ready"] == 0 and not pool.stats()["worker_running"]
+
+
+def test_refill_then_pop(tmp_path):
+    generator = FakeGenerator(pool_mystery())
+    pool = MysteryPool(generator, pool_dir=str(tmp_path / "pool"))
+    assert pool.refill_one()
+    assert generator.calls == [False]
+    assert pool.ready_count() == 1
+    assert pool.pop() == generator.mystery
+    assert pool.pop() is None
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_invalid_and_fallback_mysteries_are_rejected(tmp_path):
+    fallback = pool_mystery()
+    fallback["case"]["is_fallback"] = True
+    assert not validate_mystery(fallback)
+    assert not validate_mystery({"case": {}})
+
+    pool = MysteryPool(FakeGenerator(fallback), pool_dir=str(tmp_path / "pool"))
+    assert not pool.refill_one()
+    assert pool.stats()["rejected"] == 1 and pool.ready_count() == 0
+
+
+class SlowGenerator(FakeGenerator):
+    """Blocks inside create_full_mystery until released, like a long LLM generation."""
+
+    def __init__(self, mystery):
+        super().__init__(mystery)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def create_full_mystery(self, verbose=True, concept_candidates=1):
+        self.started.set()
+        self.release.wait(5)
+        return super().create_full_mystery(verbose, concept_candidates)
+
+
+def test_cold_start_takes_the_job_already_running(tmp_path):
+    generator = SlowGenerator(pool_mystery())
+    pool = MysteryPool(generator, pool_dir=str(tmp_path / "pool"), depth=1, refill_interval=0.01)
+    pool.start()
+    try:
+        assert generator.started.wait(5)
+        # The foreground pauses the pool and waits for the in-flight mystery
+        threading.Timer(0.1, generator.release.set).start()
+        with pool.paused():
+            assert pool.take(timeout=5) == generator.mystery
+            time.sleep(0.1)
+            assert generator.calls == [False]  # No second generation while paused
+    finally:
+        pool.stop(timeout=1)
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 0
+
+
+def test_take_does_not_wait_for_an_idle_worker(tmp_path):
+    pool = MysteryPool(FakeGenerator(pool_mystery()), pool_dir=str(tmp_path / "pool"))
+    started = time.perf_counter()
+    assert pool.take(timeout=5) is None
+    assert time.perf_counter() - started < 1
+
+
+def test_pool_stays_shallow_during_play(tmp_path):
+    pool = MysteryPool(FakeGenerator(pool_mystery()), pool_dir=str(tmp_path / "pool"), depth=3)
+    assert pool.target_depth() == 3
+    pool.playing = True
+    assert pool.target_depth() == 1 and pool.stats()["target_depth"] == 1
@@ -0,0 +1,110 @@
+"""DetectiveAgent._stream_llm: English filter and error handling on the streaming path."""
+import pytest
+
+pytest.importorskip("langchain_community.llms")
+pytest.importorskip("falkordb")
+
+import ollama
+from ollama import CONFUSED_REPLY, ERROR_REPLY, STREAM_CUT_MARK, DetectiveAgent
+
+TURKISH = "Evet dedektif, o gece kütüphanede yalnızdım ve kapıyı kilitlemiştim. "
+
+
+class ScriptedLLM:
+    """Streams the given chunks, then raises `error` if one is set."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def stream(self, prompt, **kwargs):
+        yield from self.chunks
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def agent():
+    return DetectiveAgent(use_cache=False, database=object())
+
+
+def run(agent, chunks, error=None):
+    agent.llm = ScriptedLLM(chunks, error)
+    return list(agent._stream_llm("prompt", use_cache=False))
+
+
+def test_clean_reply_streams_through(agent):
+    chunks = ['"', TURKISH[:20], TURKISH[20:], '"']
+    assert "".join(run(agent, chunks)) == DetectiveAgent._clean_reply("".join(chunks))
+
+
+def test_english_opening_is_replaced(agent):
+    assert run(agent, ["Sure! ", "Here is the answer"]) == [CONFUSED_REPLY]
+
+
+def test_english_marker_after_shown_text_ends_with_the_replacement(agent):
+    parts = run(agent, [TURKISH, "Here is more ", "in English."])
+    assert parts[-1] == STREAM_CUT_MARK + CONFUSED_REPLY
+    assert "Here" not in "".join(parts[:-1])
+
+
+def test_error_after_first_token_is_surfaced(agent):
+    parts = run(agent, [TURKISH, "ve sonra"], error=ConnectionError("reset"))
+    assert len(parts) > 1
+    assert parts[-1] == STREAM_CUT_MARK + ERROR_REPLY
+
+
+def test_error_before_first_token(agent):
+    assert run(agent, [], error=ConnectionError("down")) == [ERROR_REPLY]
+
+
+def test_stream_errors_are_recorded(agent, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(ollama.telemetry, "record", lambda name, duration, error=None, attrs=None:
+                        recorded.append((name, error)))
+    run(agent, [TURKISH, "Sure thing"])
+    assert recorded == [("llm.stream", "EnglishReply")]
+
+
+def interrogate(agent, chunks, error=None, read=None):
+    agent.llm = ScriptedLLM(chunks, error)
+    stream = agent.stream_character_response("Feride Hanım", "Kıskanç", "Neredeydiniz?", [], use_cache=False)
+    if read is None:
+        return list(stream)
+    parts = [next(stream) for _ in range(read)]
+    stream.close()
+    return parts
+
+
+def test_completed_turn_is_remembered(agent):
+    reply = "".join(interrogate(agent, [TURKISH]))
+    assert agent.memory.context("Feride Hanım").count(reply) == 1
+
+
+@pytest.mark.parametrize("chunks, error", [
+    ([TURKISH, "Here is the rest"], None),
+    ([TURKISH, "ve sonra"], ConnectionError("reset")),
+])
+def test_cut_off_reply_is_not_remembered(agent, chunks, error):
+    interrogate(agent, chunks, error)
+    assert "kütüphanede" not in agent.memory.context("Feride Hanım")
+
+
+def test_abandoned_stream_is_not_remembered(agent):
+    interrogate(agent, [TURKISH, TURKISH, TURKISH], read=1)
+    assert "kütüphanede" not in agent.memory.context("Feride Hanım")
+
+
+def test_interrogation_defers_summaries_on_the_shared_model(agent):
+    assert agent.summary_llm is agent.llm
+    with agent.interrogation():
+        assert agent.memory._held == 1
+    assert agent.memory._held == 0
+
+
+def test_separate_summary_model_is_not_held(monkeypatch):
+    monkeypatch.setattr(ollama, "SUMMARY_MODEL", "llama3.2:1b")
+    agent = DetectiveAgent(model_name="gemma2", use_cache=False, database=object())
+    assert agent.summary_llm is not agent.llm and agent.summary_model == "llama3.2:1b"
+    with agent.interrogation():
+        assert agent.memory._held == 0
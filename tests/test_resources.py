@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+pytest.importorskip("langchain_chroma")
+pytest.importorskip("langchain_huggingface")
+
+import resources
+from resources import ResourceRegistry
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    loads = []
+
+    def load(model_name):
+        loads.append(model_name)
+        return FakeEmbeddings()
+
+    monkeypatch.setattr(resources, "_load_embedding_model", load)
+    monkeypatch.setattr(resources, "open_collection", lambda model, embeddings, path: object())
+    registry = ResourceRegistry()
+    registry.loads = loads
+    return registry
+
+
+def test_rss_is_current_kilobytes():
+    assert resources._rss_kb() >= 0
+
+
+def test_each_model_loaded_once(registry):
+    first = registry.get_embeddings("model-a")
+    assert registry.get_embeddings("model-a") is first
+    assert registry.get_vector_store("model-a") is registry.get_vector_store("model-a")
+    assert registry.loads == ["model-a"]
+    assert "embeddings:model-a" in registry.report()
+
+
+def test_concurrent_first_use_loads_once(registry):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_embeddings("model-b")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.loads == ["model-b"]
+    assert all(result is results[0] for result in results)
+
+
+def test_different_models_load_in_parallel(monkeypatch):
+    # model-a's load only finishes once model-b's load has started: a global load lock would deadlock here
+    started_b = threading.Event()
+
+    def load(model_name):
+        if model_name == "model-a":
+            assert started_b.wait(timeout=5), "model-b did not start while model-a was loading"
+        else:
+            started_b.set()
+        return FakeEmbeddings()
+
+    monkeypatch.setattr(resources, "_load_embedding_model", load)
+    registry = ResourceRegistry()
+    threads = [threading.Thread(target=registry.get_embeddings, args=(name,)) for name in ("model-a", "model-b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(registry.report()) == {"embeddings:model-a", "embeddings:model-b"}
@@ -0,0 +1,182 @@
+"""GameServer/GameSession error handling, without a FalkorDB, Ollama or network."""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("langchain_community.llms")
+pytest.importorskip("falkordb")
+
+import server
+from server import GameServer, GameSession, SessionError
+from conftest import sample_mystery
+
+
+class FakeDatabase:
+    def __init__(self, loads=True):
+        self.loads = loads
+        self.version = 0
+
+    def load_case(self, mystery, reset=True):
+        return self.loads
+
+
+def test_session_create_fails_when_case_does_not_load(monkeypatch):
+    monkeypatch.setattr(server, "create_database", lambda graph_name: FakeDatabase(loads=False))
+    monkeypatch.setattr(server, "DetectiveAgent", lambda **kwargs: object())
+    with pytest.raises(ConnectionError):
+        GameSession("0" * 32, sample_mystery(), cache=None, model_name="m", time_limit_minutes=30)
+
+
+class Message:
+    def __init__(self, text):
+        self.type = server.WSMsgType.TEXT
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSocket:
+    messages = []
+
+    def __init__(self, **kwargs):
+        self.sent = []
+
+    async def prepare(self, request):
+        pass
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for text in self.messages:
+            yield Message(text)
+
+
+class FakeSession:
+    session_id = "s"
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.sockets = 0
+
+    def talk(self, person, question, stream=False):
+        if person == "kimse":
+            raise SessionError("'kimse' isimli biri bulunamadı.")
+        raise RuntimeError("graph exploded")
+
+    def ask(self, question, stream=False):
+        return {"question": question}, iter(["Evet ", "dedektif."])
+
+
+def bare_server(tmp_path=None, workers=2):
+    app = GameServer.__new__(GameServer)
+    app.executor = ThreadPoolExecutor(max_workers=workers)
+    app.sessions, app._rehydrating, app._closing = {}, {}, {}
+    app.snapshot_dir = str(tmp_path)
+    app.idle_timeout = 60
+    app.evicted = app.rehydrated = 0
+    return app
+
+
+def run_socket(monkeypatch, messages):
+    app = bare_server()
+    session = FakeSession()
+
+    async def find_session(request):
+        return session
+
+    monkeypatch.setattr(app, "_session", find_session)
+    monkeypatch.setattr(server.web, "WebSocketResponse", FakeSocket)
+    monkeypatch.setattr(FakeSocket, "messages", messages)
+    try:
+        return asyncio.run(app.websocket(None)).sent
+    finally:
+        app.executor.shutdown()
+
+
+def test_websocket_keeps_serving_after_failed_actions(monkeypatch):
+    sent = run_socket(monkeypatch, [
+        "{not json",
+        json.dumps({"action": "talk", "person": "kimse"}),
+        json.dumps({"action": "talk", "person": "Feride"}),
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"action": "ask", "question": "Kim?"}),
+    ])
+    assert [frame["type"] for frame in sent] == ["error", "error", "error", "error",
+                                                "meta", "token", "token", "done"]
+    assert sent[0]["message"] == "Geçersiz JSON."
+    assert "kimse" in sent[1]["message"]
+    assert "graph exploded" not in sent[2]["message"]
+    assert sent[-1] == {"type": "done", "text": "Evet dedektif."}
+
+
+SESSION_ID = "ab" * 16
+
+
+class EvictableSession(FakeSession):
+    session_id = SESSION_ID
+    finished = False
+
+    def __init__(self, events, idle=0):
+        super().__init__()
+        self.events = events
+        self.last_active -= idle
+
+    def snapshot(self):
+        return b"snapshot"
+
+    def close(self):
+        time.sleep(0.2)  # Dropping the graph takes a while
+        self.events.append("dropped")
+
+
+def test_rehydrate_waits_for_a_running_eviction(monkeypatch, tmp_path):
+    events = []
+    app = bare_server(tmp_path)
+
+    class Restored(EvictableSession):
+        def __init__(self, session_id, mystery, cache, model_name, time_limit_minutes, snapshot=None):
+            super().__init__(events)
+            events.append("loaded " + snapshot.decode())
+
+    monkeypatch.setattr(server, "GameSession", Restored)
+    app.cache = app.model_name = app.time_limit_minutes = None
+    app.sessions[SESSION_ID] = EvictableSession(events, idle=3600)
+    request = type("Request", (), {"match_info": {"session_id": SESSION_ID}})()
+
+    async def scenario():
+        eviction = asyncio.ensure_future(app._evict_idle_sessions())
+        await asyncio.sleep(0.05)  # Snapshot written, graph still being dropped
+        session = await app._session(request)
+        await eviction
+        return session
+
+    try:
+        session = asyncio.run(scenario())
+    finally:
+        app.executor.shutdown()
+    assert events == ["dropped", "loaded snapshot"]
+    assert isinstance(session, Restored) and app.sessions == {SESSION_ID: session}
+    assert app.evicted == 1 and app.rehydrated == 1 and app._closing == {}
+
+
+def test_reaper_keeps_sessions_with_an_open_socket(tmp_path):
+    events = []
+    app = bare_server(tmp_path)
+    watched = EvictableSession(events, idle=3600)
+    watched.sockets = 1
+    app.sessions[SESSION_ID] = watched
+    try:
+        asyncio.run(app._evict_idle_sessions())
+    finally:
+        app.executor.shutdown()
+    assert app.sessions == {SESSION_ID: watched} and events == []
@@ -0,0 +1,70 @@
+"""SessionState snapshots and OrderedSet."""
+import time
+
+import pytest
+
+import session_state
+from conftest import sample_mystery
+from session_state import OrderedSet, SessionState, SnapshotError, decode_snapshot, encode_snapshot
+
+
+def played_state():
+    state = SessionState(time_limit=900)
+    state.start_time = time.time() - 120
+    state.game_active = True
+    state.case_title = "Zehirli Şerbet"
+    state.victim_name = "Emine Hanım"
+    state.discovered_evidence.add({"name": "Hançer", "description": "Kanlı", "location": "Kütüphane"})
+    state.visited_locations.add("Kütüphane")
+    state.interviewed_people.add("Feride Hanım")
+    return state
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_snapshot_round_trip(compress):
+    state, mystery = played_state(), sample_mystery()
+    restored, restored_mystery = decode_snapshot(encode_snapshot(state, mystery, compress=compress))
+    assert restored_mystery == mystery
+    expected, actual = state.to_dict(), restored.to_dict()
+    assert actual.pop("elapsed") == pytest.approx(expected.pop("elapsed"), abs=1)
+    assert actual == expected
+    assert {"name": "Hançer", "description": "Kanlı", "location": "Kütüphane"} in restored.discovered_evidence
+
+
+def test_saved_time_does_not_count(monkeypatch):
+    data = encode_snapshot(played_state())
+    now = time.time()
+    monkeypatch.setattr(session_state.time, "time", lambda: now + 3600)
+    restored, _ = decode_snapshot(data)
+    assert now + 3600 - restored.start_time == pytest.approx(120, abs=1)
+
+
+def test_unstarted_game_keeps_no_timer():
+    restored, mystery = decode_snapshot(encode_snapshot(SessionState()))
+    assert restored.start_time is None and mystery is None
+
+
+@pytest.mark.parametrize("mangle, message", [
+    (lambda data: data[:10], "truncated"),
+    (lambda data: b"XXXX" + data[4:], "not a SherlockAI"),
+    (lambda data: data[:4] + bytes([99]) + data[5:], "version 99"),
+    (lambda data: data[:-1] + bytes([data[-1] ^ 0xFF]), "corrupted"),
+])
+def test_bad_snapshots_are_rejected(mangle, message):
+    with pytest.raises(SnapshotError, match=message):
+        decode_snapshot(mangle(encode_snapshot(played_state())))
+
+
+def test_ordered_set_keeps_first_insertion():
+    items = OrderedSet(["b", "a", "b", "c"])
+    assert list(items) == ["b", "a", "c"]
+    assert not items.add("a") and items.add("d")
+    assert len(items) == 4 and items[-1] == "d" and "c" in items
+
+
+def test_ordered_set_with_key_holds_unhashable_items():
+    items = OrderedSet(key=lambda item: item["name"])
+    assert items.add({"name": "Hançer", "note": 1})
+    assert not items.add({"name": "Hançer", "note": 2})
+    assert {"name": "Hançer"} in items and [] not in items
+    assert items.to_list() == [{"name": "Hançer", "note": 1}]
@@ -0,0 +1,95 @@
+"""
+Vector Collections
+One Chroma collection per embedding model, side by side in the same persist
+directory. Each collection is stamped with the model that embedded it, the
+vector dimension and the ingest version, and is only opened by a consumer
+using that same model, so vectors from different models are never compared.
+"""
+import re
+from typing import Dict, Optional
+
+import chromadb
+from langchain_chroma import Chroma
+
+INGEST_VERSION = 3  # 3: modele özel koleksiyonlar
+COLLECTION_PREFIX = "chunks_"
+
+
+class CollectionMismatch(RuntimeError):
+    """The collection is missing, or was built with another model, dimension or ingest version."""
+
+
+def collection_name(model_name: str) -> str:
+    """Chroma-safe collection name for a model ('chunks_all-MiniLM-L6-v2')."""
+    name = COLLECTION_PREFIX + re.sub(r"[^A-Za-z0-9._-]", "-", model_name.split("/")[-1])
+    return name[:63].rstrip("._-")
+
+
+def collection_metadata(model_name: str, dimension: int) -> Dict:
+    return {
+        "embedding_model": model_name,
+        "embedding_dimension": dimension,
+        "ingest_version": INGEST_VERSION,
+    }
+
+
+def check_metadata(metadata: Optional[Dict], model_name: str, dimension: int):
+    """Raises CollectionMismatch unless the stamp matches the model and its dimension."""
+    metadata = metadata or {}
+    name = collection_name(model_name)
+    if metadata.get("embedding_model") != model_name:
+        raise CollectionMismatch(
+            f"'{name}' koleksiyonu {metadata.get('embedding_model') or 'bilinmeyen bir model'} ile "
+            f"oluşturulmuş, {model_name} ile sorgulanamaz")
+    if metadata.get("embedding_dimension") != dimension:
+        raise CollectionMismatch(
+            f"'{name}' koleksiyonu {metadata.get('embedding_dimension')} boyutlu, "
+            f"{model_name} {dimension} boyutlu vektör üretiyor")
+    if metadata.get("ingest_version") != INGEST_VERSION:
+        raise CollectionMismatch(
+            f"'{name}' koleksiyonu eski bir ingest sürümüyle oluşturulmuş "
+            f"({metadata.get('ingest_version')}); 'python ingest.py --full' ile yeniden oluşturun")
+
+
+def open_collection(model_name: str, embeddings, persist_directory: str,
+                    dimension: Optional[int] = None) -> Chroma:
+    """
+    Opens the existing collection for `model_name` (consumer side) and checks
+    its stamp. `dimension` defaults to the length of a probe query vector.
+    """
+    client = chromadb.PersistentClient(path=persist_directory)
+    name = collection_name(model_name)
+    try:
+        collection = client.get_collection(name)
+    except Exception:
+        raise CollectionMismatch(
+            f"'{name}' koleksiyonu yok ({model_name} için ingest yapılmamış); 'python ingest.py' çalıştırın")
+    if dimension is None:
+        dimension = len(embeddings.embed_query("warm-up"))
+    check_metadata(collection.metadata, model_name, dimension)
+    return Chroma(client=client, collection_name=name, embedding_function=embeddings)
+
+
+def create_collection(model_name: str, embeddings, persist_directory: str, dimension: int) -> Chroma:
+    """Opens or creates the stamped collection for ingest; an existing one must match."""
+    client = chromadb.PersistentClient(path=persist_directory)
+    name = collection_name(model_name)
+    store = Chroma(client=client, collection_name=name, embedding_function=embeddings,
+                   collection_metadata=collection_metadata(model_name, dimension))
+    check_metadata(client.get_collection(name).metadata, model_name, dimension)
+    return store
+
+
+def delete_ids(model_name: str, persist_directory: str, ids, batch_size: int = 1000):
+    """
+    Removes chunks by id from the model's collection. Works on the raw Chroma
+    collection, so the embedding model is never loaded (a delete needs no
+    vectors). A missing collection has nothing to delete.
+    """
+    client = chromadb.PersistentClient(path=persist_directory)
+    try:
+        collection = client.get_collection(collection_name(model_name))
+    except Exception:
+        return
+    for start in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[start:start + batch_size])
@@ -0,0 +1,95 @@
+"""
+Startup Warm-up
+Runs slow first-use initialisation (LLM weight loading, embedding models,
+Chroma collections, FalkorDB connection) on background threads while the
+player is still reading the intro, and tracks which resources are ready.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from telemetry import telemetry
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+class WarmupTracker:
+    """Named background warm-up tasks with per-task readiness and timing."""
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup")
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._status: Dict[str, str] = {}
+        self._seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def add(self, name: str, task: Callable[[], object]):
+        """Starts `task` in the background unless a task with that name already exists."""
+        with self._lock:
+            if name in self._futures:
+                return
+            self._status[name] = PENDING
+            self._futures[name] = self._executor.submit(self._run, name, task)
+
+    def _run(self, name: str, task: Callable[[], object]):
+        started = time.perf_counter()
+        try:
+            with telemetry.span("warmup", task=name):
+                task()
+            status = READY
+        except Exception as e:
+            status = FAILED
+            with self._lock:
+                self._errors[name] = str(e)
+        with self._lock:
+            self._status[name] = status
+            self._seconds[name] = round(time.perf_counter() - started, 3)
+
+    def is_ready(self, name: str) -> bool:
+        with self._lock:
+            return self._status.get(name) == READY
+
+    def wait(self, name: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the named task (or every task) has finished, at most
+        `timeout` seconds. Returns True if they all finished successfully.
+        """
+        with self._lock:
+            futures = [self._futures[name]] if name else list(self._futures.values())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in futures:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                return False
+        with self._lock:
+            names = [name] if name else list(self._status)
+            return all(self._status[n] == READY for n in names)
+
+    def status(self) -> Dict[str, str]:
+        """Task name -> 'pending' / 'ready' / 'failed'."""
+        with self._lock:
+            return dict(self._status)
+
+    def errors(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._errors)
+
+    def stats(self) -> Dict:
+        """Counts per state and the slowest finished task (telemetry collector)."""
+        with self._lock:
+            states = list(self._status.values())
+            return {
+                "pending": states.count(PENDING),
+                "ready": states.count(READY),
+                "failed": states.count(FAILED),
+                "slowest_seconds": max(self._seconds.values(), default=0.0),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)